@@ -4,9 +4,10 @@ from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from app.config import Config
+from app.utils.database import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
 
@@ -14,21 +15,39 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Pool sizing, statement timeouts and the optional read replica
+    from app.utils.database import configure_database, init_database
+    configure_database(app)
+    
     # Initialize extensions with app
     db.init_app(app)
+    init_database(app, db)
     migrate.init_app(app, db)
     CORS(app)
     jwt.init_app(app)
     
+    # Per-route latency, SQL and commit metrics, served at /metrics
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
+    
     # Register blueprints
-    from app.routes import finance_bp, orders_bp, menu_bp
+    from app.routes import finance_bp, orders_bp, menu_bp, kitchen_bp
     from app.routes.chat import chat_bp
     
     app.register_blueprint(finance_bp, url_prefix='/api/finance')
     app.register_blueprint(orders_bp, url_prefix='/api/orders')
     app.register_blueprint(menu_bp, url_prefix='/api/menu')
+    app.register_blueprint(kitchen_bp, url_prefix='/api/kitchen')
     app.register_blueprint(chat_bp, url_prefix='/api/chat')
     
+    # Heavy chat dependencies load on a background thread, not at import time
+    from app.services.llm import ChatService
+    ChatService.schedule_warm_up(app)
+    
+    # Periodic batch assignment of ready orders to delivery people
+    from app.services.delivery_scheduler import schedule_deliveries
+    schedule_deliveries(app)
+    
     @app.route('/')
     def home():
         return {'message': 'TrueBite API is running', 'status': 'success'}
@@ -20,5 +20,10 @@ class Dish(db.Model):
     chef = db.relationship('User', backref='dishes', foreign_keys=[chef_id])
     order_items = db.relationship('OrderItem', backref='dish', lazy=True)
     
+    __table_args__ = (
+        # Serves /api/menu/popular without scanning or sorting the table
+        db.Index('ix_dishes_popular', is_available, total_orders.desc(), id),
+    )
+    
     def __repr__(self):
         return f'<Dish {self.name} ${self.price}>'
\ No newline at end of file
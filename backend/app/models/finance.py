@@ -48,5 +48,10 @@ class Transaction(db.Model):
     description = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Serves keyset-paginated history: newest first within a wallet
+        db.Index('ix_transactions_wallet_created', wallet_id, created_at.desc(), id.desc()),
+    )
+    
     def __repr__(self):
         return f'<Transaction {self.transaction_type} ${self.amount}>'
\ No newline at end of file
@@ -1,5 +1,24 @@
 from app import db
 from datetime import datetime
+from decimal import Decimal
+
+# Allowed status changes. Orders move forward one step at a time and can be
+# cancelled until a driver has picked them up; DELIVERED and CANCELLED are final
+ORDER_TRANSITIONS = {
+    'CREATED': {'IN_KITCHEN', 'CANCELLED'},
+    'IN_KITCHEN': {'READY_FOR_DELIVERY', 'CANCELLED'},
+    'READY_FOR_DELIVERY': {'ASSIGNED', 'CANCELLED'},
+    'ASSIGNED': {'OUT_FOR_DELIVERY', 'CANCELLED'},
+    'OUT_FOR_DELIVERY': {'DELIVERED'},
+    'DELIVERED': set(),
+    'CANCELLED': set()
+}
+
+# Tickets the kitchen still has to start or finish
+KITCHEN_OPEN_STATUSES = ('CREATED', 'IN_KITCHEN')
+
+# Orders a delivery person is carrying or about to pick up
+DELIVERY_ACTIVE_STATUSES = ('ASSIGNED', 'OUT_FOR_DELIVERY')
 
 class Order(db.Model):
     __tablename__ = 'orders'
@@ -25,17 +44,45 @@ class Order(db.Model):
     delivery_person = db.relationship('User', foreign_keys=[delivery_person_id], backref='delivery_orders')
     transaction = db.relationship('Transaction', backref='order', uselist=False, lazy=True)
     
+    __table_args__ = (
+        # Serves keyset-paginated order history per customer
+        db.Index('ix_orders_customer_time', customer_id, order_time),
+        # Per-chef open tickets in arrival order; finished orders stay out of the index
+        db.Index(
+            'ix_orders_chef_open', chef_id, order_time, id,
+            postgresql_where=status.in_(KITCHEN_OPEN_STATUSES),
+            sqlite_where=status.in_(KITCHEN_OPEN_STATUSES)
+        ),
+        # The delivery scheduler's inputs: orders awaiting a driver, and each driver's current load
+        db.Index(
+            'ix_orders_ready', order_time, id,
+            postgresql_where=status == 'READY_FOR_DELIVERY',
+            sqlite_where=status == 'READY_FOR_DELIVERY'
+        ),
+        db.Index(
+            'ix_orders_driver_active', delivery_person_id,
+            postgresql_where=status.in_(DELIVERY_ACTIVE_STATUSES),
+            sqlite_where=status.in_(DELIVERY_ACTIVE_STATUSES)
+        ),
+    )
+    
     def calculate_total(self, is_vip=False, vip_orders_count=0):
         """Calculate order total with VIP discounts"""
-        total = self.subtotal
+        total = Decimal(self.subtotal)
+        
+        # Column defaults are only applied on INSERT, so fill them in here
+        if self.discount_amount is None:
+            self.discount_amount = Decimal('0.00')
+        if self.delivery_fee is None:
+            self.delivery_fee = Decimal('5.00')
         
         if is_vip:
-            discount = self.subtotal * 0.05
+            discount = (total * Decimal('0.05')).quantize(Decimal('0.01'))
             self.discount_amount = discount
             total -= discount
         
         if is_vip and vip_orders_count > 0 and vip_orders_count % 3 == 0:
-            self.delivery_fee = 0.00
+            self.delivery_fee = Decimal('0.00')
         
         total += self.delivery_fee
         self.total = total
@@ -49,7 +96,7 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     dish_id = db.Column(db.Integer, db.ForeignKey('dishes.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     price_at_time = db.Column(db.Numeric(10, 2), nullable=False)
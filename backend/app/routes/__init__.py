@@ -1,5 +1,6 @@
 from app.routes.finance import finance_bp
 from app.routes.orders import orders_bp
 from app.routes.menu import menu_bp
+from app.routes.kitchen import kitchen_bp
 
-__all__ = ['finance_bp', 'orders_bp', 'menu_bp']
\ No newline at end of file
+__all__ = ['finance_bp', 'orders_bp', 'menu_bp', 'kitchen_bp']
\ No newline at end of file
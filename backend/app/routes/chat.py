@@ -1,9 +1,30 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+import queue
+import threading
+from concurrent.futures import TimeoutError
+from flask import Blueprint, Response, request, jsonify, json, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from app.services.llm import ChatService
+from app import db
+from app.models.user import User
+from app.services.chat_executor import get_chat_executor, ChatOverloaded
 
 chat_bp = Blueprint('chat', __name__)
 
+def _overloaded(e):
+    response = jsonify({'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '2'
+    return response
+
+def _caller_is_vip():
+    """VIP-only dishes are only retrieved for signed-in VIP customers"""
+    verify_jwt_in_request(optional=True)
+    user_id = get_jwt_identity()
+    if not user_id:
+        return False
+    user = db.session.get(User, user_id)
+    return bool(user and user.is_vip())
+
 @chat_bp.route('/ask', methods=['POST'])
 def ask():
     data = request.get_json()
@@ -11,12 +32,78 @@ def ask():
     
     if not message:
         return jsonify({'error': 'Message is required'}), 400
-        
-    service = ChatService.get_instance()
-    response = service.get_response(message)
+    
+    include_vip = _caller_is_vip()
+    timeout = current_app.config.get('CHAT_TIMEOUT_SECONDS', 30)
+    cancelled = threading.Event()
+    try:
+        future = get_chat_executor().submit(
+            current_app._get_current_object(),
+            lambda: ChatService.get_instance().get_response(message, include_vip, cancelled)
+        )
+        response = future.result(timeout=timeout)
+    except ChatOverloaded as e:
+        return _overloaded(e)
+    except TimeoutError:
+        # Free the slot if the chat is still queued; if it is already running,
+        # it skips generation when it gets that far
+        cancelled.set()
+        future.cancel()
+        return jsonify({'error': 'Chat timed out'}), 504
     
     return jsonify({'response': response})
 
+@chat_bp.route('/stream', methods=['POST'])
+def ask_stream():
+    """Same as /ask, but streams the answer as server-sent events"""
+    data = request.get_json()
+    message = data.get('message')
+    
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    include_vip = _caller_is_vip()
+    chunks = queue.Queue()
+    done = object()
+    cancelled = threading.Event()
+    
+    def produce():
+        try:
+            for text in ChatService.get_instance().stream_response(message, include_vip, cancelled):
+                chunks.put(text)
+        finally:
+            chunks.put(done)
+    
+    try:
+        future = get_chat_executor().submit(current_app._get_current_object(), produce)
+    except ChatOverloaded as e:
+        return _overloaded(e)
+    
+    timeout = current_app.config.get('CHAT_TIMEOUT_SECONDS', 30)
+    
+    def events():
+        try:
+            while True:
+                try:
+                    text = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    yield f"event: error\ndata: {json.dumps({'error': 'Chat timed out'})}\n\n"
+                    return
+                if text is done:
+                    yield "event: done\ndata: {}\n\n"
+                    return
+                yield f"data: {json.dumps({'text': text})}\n\n"
+        finally:
+            # Timed out or the client disconnected (GeneratorExit): stop the
+            # producer at its next chunk, or before it starts if still queued
+            cancelled.set()
+            future.cancel()
+    
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @chat_bp.route('/sync', methods=['POST'])
 @jwt_required()
 def sync_knowledge_base():
@@ -29,3 +116,30 @@ def sync_knowledge_base():
     else:
         return jsonify({'error': 'Failed to sync knowledge base'}), 500
 
+@chat_bp.route('/stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    """Chat cache hit/miss counters and executor load"""
+    service = ChatService.get_instance()
+    executor = get_chat_executor()
+    return jsonify({'success': True, 'stats': {
+        **service.cache_stats(),
+        'executor': {
+            'pending': executor.pending,
+            'queue_depth': executor.queue_depth,
+            'max_workers': executor.max_workers,
+            'max_queue': executor.max_queue
+        }
+    }})
+
+@chat_bp.route('/health', methods=['GET'])
+def health():
+    """Liveness plus details on the chat service in this worker"""
+    return jsonify({'success': True, 'chat': ChatService.status()})
+
+@chat_bp.route('/ready', methods=['GET'])
+def ready():
+    """200 once this worker's chat service is built and its index is reachable"""
+    status = ChatService.status()
+    is_ready = status['state'] == 'ready'
+    return jsonify({'success': is_ready, 'chat': status}), 200 if is_ready else 503
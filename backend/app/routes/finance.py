@@ -1,12 +1,23 @@
 # backend/app/routes/finance.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, json, stream_with_context
 from app.services.finance_service import FinanceService
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.decorators import read_only, read_only_stream, statement_timeout
 
 finance_bp = Blueprint('finance', __name__)
 
+def _serialize_transaction(t):
+    return {
+        'id': t.id,
+        'amount': float(t.amount),
+        'type': t.transaction_type,
+        'description': t.description,
+        'created_at': t.created_at.isoformat()
+    }
+
 @finance_bp.route('/balance', methods=['GET'])
 @jwt_required()
+@read_only
 def get_balance():
     """Get current wallet balance"""
     try:
@@ -57,23 +68,32 @@ def add_funds():
 
 @finance_bp.route('/transactions', methods=['GET'])
 @jwt_required()
+@read_only
+@statement_timeout('DB_HEAVY_READ_TIMEOUT_MS')
 def get_transactions():
-    """Get transaction history"""
+    """Get transaction history
+    
+    Paginate with ?limit= and the returned next_cursor passed back as
+    ?cursor=. With ?format=ndjson the whole history is streamed instead,
+    one JSON object per line.
+    """
     try:
         user_id = get_jwt_identity()
+        
+        if request.args.get('format') == 'ndjson':
+            rows = FinanceService.iter_transaction_history(user_id)
+            lines = (json.dumps(_serialize_transaction(t)) + '\n' for t in rows)
+            return Response(stream_with_context(read_only_stream(lines)), mimetype='application/x-ndjson')
+        
         limit = request.args.get('limit', 50, type=int)
+        cursor = request.args.get('cursor')
         
-        transactions = FinanceService.get_transaction_history(user_id, limit)
+        transactions, next_cursor = FinanceService.get_transaction_history(user_id, limit, cursor)
         
         return jsonify({
             'success': True,
-            'transactions': [{
-                'id': t.id,
-                'amount': float(t.amount),
-                'type': t.transaction_type,
-                'description': t.description,
-                'created_at': t.created_at.isoformat()
-            } for t in transactions]
+            'transactions': [_serialize_transaction(t) for t in transactions],
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
@@ -0,0 +1,93 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.kitchen_queue import get_kitchen_queue
+from app.services.order_service import OrderConflict
+from app import db
+from app.models.user import User
+from app.utils.pagination import clamp_limit
+
+kitchen_bp = Blueprint('kitchen', __name__)
+
+def _current_chef_id():
+    """The caller's user id if they are a chef, else None"""
+    user = db.session.get(User, get_jwt_identity())
+    return user.id if user and user.user_type == 'chef' else None
+
+def _forbidden():
+    return jsonify({'success': False, 'error': 'Only chefs have a kitchen queue'}), 403
+
+def _conflict(e):
+    return jsonify({
+        'success': False,
+        'error': str(e),
+        'order_id': e.order_id,
+        'current_status': e.current_status
+    }), 409
+
+@kitchen_bp.route('/queue', methods=['GET'])
+@jwt_required()
+def get_queue():
+    """The caller's open tickets, oldest first
+    
+    waiting holds orders not yet started (CREATED), cooking those in
+    progress (IN_KITCHEN); counts covers all of them, not just this page.
+    """
+    try:
+        chef_id = _current_chef_id()
+        if chef_id is None:
+            return _forbidden()
+        
+        limit = clamp_limit(request.args.get('limit', type=int))
+        tickets, counts = get_kitchen_queue().view(chef_id, limit)
+        
+        def serialize(entries):
+            return [{'order_id': order_id, 'order_time': order_time.isoformat()} for order_time, order_id in entries]
+        
+        return jsonify({
+            'success': True,
+            'waiting': serialize(tickets['CREATED']),
+            'cooking': serialize(tickets['IN_KITCHEN']),
+            'counts': {'waiting': counts['CREATED'], 'cooking': counts['IN_KITCHEN']}
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@kitchen_bp.route('/claim', methods=['POST'])
+@jwt_required()
+def claim_ticket():
+    """Start cooking the oldest waiting ticket, or the one given as order_id"""
+    try:
+        chef_id = _current_chef_id()
+        if chef_id is None:
+            return _forbidden()
+        
+        data = request.get_json(silent=True) or {}
+        order = get_kitchen_queue().claim(chef_id, data.get('order_id'))
+        if order is None:
+            return jsonify({'success': False, 'error': 'No tickets waiting'}), 404
+        
+        return jsonify({'success': True, 'order_id': order.id, 'status': order.status}), 200
+        
+    except OrderConflict as e:
+        return _conflict(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@kitchen_bp.route('/<int:order_id>/complete', methods=['POST'])
+@jwt_required()
+def complete_ticket(order_id):
+    """Mark a ticket the caller is cooking as ready for delivery"""
+    try:
+        chef_id = _current_chef_id()
+        if chef_id is None:
+            return _forbidden()
+        
+        order = get_kitchen_queue().complete(chef_id, order_id)
+        
+        return jsonify({'success': True, 'order_id': order.id, 'status': order.status}), 200
+        
+    except OrderConflict as e:
+        return _conflict(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
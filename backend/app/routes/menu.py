@@ -1,27 +1,104 @@
-from flask import Blueprint, jsonify
-from app.models.dish import Dish
+from flask import Blueprint, jsonify, request, current_app
+from flask_jwt_extended import jwt_required
+from app.services.menu_cache import menu_cache
+from app.services.row_cache import get_row_cache
+from app.services.dish_stats import DishStatsService
+from app.services.menu_search import menu_search, SORTS
+from app.utils.pagination import clamp_limit
+from app.utils.decorators import read_only, statement_timeout
 
 menu_bp = Blueprint('menu', __name__)
 
 @menu_bp.route('/dishes', methods=['GET'])
+@read_only
 def get_menu():
     """Get all available dishes"""
     try:
-        dishes = Dish.query.filter_by(is_available=True).all()
+        snapshot = menu_cache.get_snapshot()
+        
+        response = current_app.response_class(snapshot.body, status=200, mimetype='application/json')
+        response.set_etag(snapshot.etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@menu_bp.route('/search', methods=['GET'])
+@statement_timeout('DB_HEAVY_READ_TIMEOUT_MS')
+def search_menu():
+    """Search available dishes
+    
+    ?q= matches names and descriptions by word, prefix or a one-letter typo.
+    Filter with min_price, max_price, min_rating, max_rating, vip_only and
+    chef_id; order with sort=relevance|price|-price|rating; page with limit
+    and offset. Chef facet counts ignore the chef_id filter.
+    """
+    try:
+        args = request.args
+        sort = args.get('sort', 'relevance')
+        if sort not in SORTS:
+            return jsonify({'success': False, 'error': f"sort must be one of {', '.join(SORTS)}"}), 400
+        
+        vip_only = args.get('vip_only')
+        limit = clamp_limit(args.get('limit', type=int), default=20, maximum=100)
+        offset = max(0, args.get('offset', 0, type=int))
+        
+        dishes, total, chef_counts = menu_search.search(
+            query=args.get('q', ''),
+            min_price=args.get('min_price', type=float),
+            max_price=args.get('max_price', type=float),
+            min_rating=args.get('min_rating', type=float),
+            max_rating=args.get('max_rating', type=float),
+            vip_only=None if vip_only is None else vip_only.lower() in ('1', 'true', 'yes'),
+            chef_id=args.get('chef_id', type=int),
+            sort=sort,
+            limit=limit,
+            offset=offset
+        )
+        
+        return jsonify({
+            'success': True,
+            'total': total,
+            'dishes': dishes,
+            'facets': {'chef_id': chef_counts},
+            'next_offset': offset + limit if offset + limit < total else None
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@menu_bp.route('/popular', methods=['GET'])
+@read_only
+def get_popular():
+    """Most-ordered available dishes (?limit=, default 10)"""
+    try:
+        limit = clamp_limit(request.args.get('limit', type=int), default=10, maximum=50)
+        dishes = DishStatsService.get_popular(limit)
         
         return jsonify({
             'success': True,
             'dishes': [{
                 'id': d.id,
                 'name': d.name,
-                'description': d.description,
                 'price': float(d.price),
                 'image_url': d.image_url,
                 'is_vip_only': d.is_vip_only,
                 'avg_rating': float(d.avg_rating) if d.avg_rating else 0,
+                'total_orders': d.total_orders or 0,
                 'chef_id': d.chef_id
             } for d in dishes]
         }), 200
         
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@menu_bp.route('/cache-stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    """Hit rates for the menu snapshot and the row cache"""
+    return jsonify({
+        'success': True,
+        'menu_version': menu_cache.version,
+        'row_cache': get_row_cache().stats()
+    }), 200
\ No newline at end of file
@@ -1,6 +1,12 @@
-from flask import Blueprint, request, jsonify
-from app.services.order_service import OrderService
+import time
+from flask import Blueprint, Response, request, jsonify, json, current_app
+from app import db
+from app.models.user import User
+from app.services.order_service import OrderService, OrderConflict
+from app.services.order_events import get_order_broker, StreamsExhausted
+from app.services.delivery_scheduler import get_delivery_scheduler
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.decorators import read_only, statement_timeout
 
 orders_bp = Blueprint('orders', __name__)
 
@@ -43,13 +49,19 @@ def create_order():
 
 @orders_bp.route('/history', methods=['GET'])
 @jwt_required()
+@read_only
+@statement_timeout('DB_HEAVY_READ_TIMEOUT_MS')
 def get_order_history():
-    """Get customer's order history"""
+    """Get customer's order history
+    
+    Paginate with ?limit= and the returned next_cursor passed back as ?cursor=.
+    """
     try:
         customer_id = get_jwt_identity()
         limit = request.args.get('limit', 50, type=int)
+        cursor = request.args.get('cursor')
         
-        orders = OrderService.get_customer_orders(customer_id, limit)
+        orders, next_cursor = OrderService.get_customer_orders(customer_id, limit, cursor)
         
         return jsonify({
             'success': True,
@@ -58,15 +70,85 @@ def get_order_history():
                 'status': o.status,
                 'total': float(o.total),
                 'order_time': o.order_time.isoformat(),
-                'items_count': len(o.items)
-            } for o in orders]
+                'items_count': o.items_count
+            } for o in orders],
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@orders_bp.route('/stream', methods=['GET'])
+@jwt_required()
+def stream_order_events():
+    """Server-sent status changes for orders the caller placed, cooks or delivers
+    
+    Each event carries its id; reconnect with the Last-Event-ID header (or
+    ?last_event_id=) to receive what was missed. A 'reset' event means the
+    gap can't be replayed and the client should refetch its orders.
+    
+    Every open stream holds one of this worker's WEB_THREADS, so only
+    ORDER_STREAM_MAX_OPEN may be open at once; beyond that the caller gets
+    a 503 and should poll /history until a retry succeeds.
+    """
+    user_id = int(get_jwt_identity())
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid last event id'}), 400
+    
+    broker = get_order_broker()
+    heartbeat = current_app.config.get('ORDER_STREAM_HEARTBEAT_SECONDS', 15)
+    max_seconds = current_app.config.get('ORDER_STREAM_MAX_SECONDS', 300)
+    try:
+        subscription, missed, complete = broker.subscribe(user_id, last_event_id)
+    except StreamsExhausted as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(int(max_seconds))
+        return response
+    
+    def format_event(event):
+        data = json.dumps({
+            'order_id': event.order_id,
+            'status': event.status,
+            'timestamp': event.timestamp
+        })
+        return f"id: {event.id}\nevent: status\ndata: {data}\n\n"
+    
+    def events():
+        try:
+            # Reconnect quickly when the stream ends below
+            yield "retry: 1000\n\n"
+            if not complete:
+                yield "event: reset\ndata: {}\n\n"
+            for event in missed:
+                yield format_event(event)
+            
+            # Bounded so a request thread is eventually returned; the client
+            # reconnects with its Last-Event-ID and loses nothing
+            deadline = time.monotonic() + max_seconds
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=min(heartbeat, max(0.0, deadline - time.monotonic())))
+                if subscription.overflowed:
+                    # Fell too far behind; the reconnect replays from history
+                    return
+                yield format_event(event) if event is not None else ": heartbeat\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+    
+    response = Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Also frees the slot when the client leaves before the first event
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    return response
+
 @orders_bp.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
+@read_only
 def get_order(order_id):
     """Get order details"""
     try:
@@ -94,15 +176,27 @@ def get_order(order_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 404
 
+def _conflict(e):
+    return jsonify({
+        'success': False,
+        'error': str(e),
+        'order_id': e.order_id,
+        'current_status': e.current_status
+    }), 409
+
 @orders_bp.route('/<int:order_id>/status', methods=['PATCH'])
 @jwt_required()
 def update_order_status(order_id):
-    """Update order status (chef/delivery use this)"""
+    """Update order status (chef/delivery use this)
+    
+    Send expected_status to only apply the change if the order is still in
+    that status; a lost race returns 409 with the current status.
+    """
     try:
         data = request.get_json()
         new_status = data.get('status')
         
-        order = OrderService.update_order_status(order_id, new_status)
+        order = OrderService.update_order_status(order_id, new_status, data.get('expected_status'))
         
         return jsonify({
             'success': True,
@@ -110,5 +204,56 @@ def update_order_status(order_id):
             'status': order.status
         }), 200
         
+    except OrderConflict as e:
+        return _conflict(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+MAX_BULK_TRANSITIONS = 200
+
+@orders_bp.route('/status', methods=['PATCH'])
+@jwt_required()
+def update_order_statuses():
+    """Advance many orders in one request
+    
+    Body: {"transitions": [{"order_id": 1, "status": "READY_FOR_DELIVERY",
+    "expected_status": "IN_KITCHEN"}, ...]}. Each order is applied
+    independently; results map order ids to 'updated', 'conflict',
+    'not_found' or the reason the transition isn't allowed.
+    """
+    try:
+        data = request.get_json()
+        transitions = data.get('transitions')
+        if not transitions or not isinstance(transitions, list):
+            return jsonify({'success': False, 'error': 'transitions is required'}), 400
+        if len(transitions) > MAX_BULK_TRANSITIONS:
+            return jsonify({'success': False, 'error': f'At most {MAX_BULK_TRANSITIONS} transitions per request'}), 400
+        if not all(isinstance(t, dict) and isinstance(t.get('order_id'), int) and t.get('status') for t in transitions):
+            return jsonify({'success': False, 'error': 'Each transition needs an order_id and a status'}), 400
+        
+        results = OrderService.transition_orders(transitions)
+        
+        return jsonify({
+            'success': True,
+            'updated': sum(1 for result in results.values() if result == 'updated'),
+            'results': {str(order_id): result for order_id, result in results.items()}
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@orders_bp.route('/assign-deliveries', methods=['POST'])
+@jwt_required()
+def assign_deliveries():
+    """Run a delivery assignment batch now (managers only)"""
+    try:
+        user = db.session.get(User, get_jwt_identity())
+        if not user or user.user_type != 'manager':
+            return jsonify({'success': False, 'error': 'Only managers can assign deliveries'}), 403
+        
+        result = get_delivery_scheduler().run_once()
+        
+        return jsonify({'success': True, **result}), 200
+        
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 400
\ No newline at end of file
+        return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,104 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+
+class ChatOverloaded(Exception):
+    """Raised when the chat executor already has its full backlog"""
+
+
+class ChatExecutor:
+    """Runs chat work on a dedicated, bounded thread pool.
+
+    At most ``max_workers`` chats run at once and at most ``max_queue`` more
+    may wait. Anything beyond that is refused straight away, so a burst of
+    slow LLM calls is shed with a 503 instead of piling up on the web
+    workers that also serve orders and wallets.
+
+    The web thread that submitted a chat waits for it, so every running or
+    queued chat also holds a web thread; get_chat_executor sizes both
+    limits to leave some of WEB_THREADS free (see chat_limits).
+    """
+
+    def __init__(self, max_workers=4, max_queue=8):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.pid = os.getpid()
+
+    @property
+    def pending(self):
+        """Chats running or waiting for a slot"""
+        return self._pending
+
+    @property
+    def queue_depth(self):
+        """Chats waiting for a slot"""
+        return max(0, self._pending - self.max_workers)
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, app, fn, *args, **kwargs):
+        """Run fn inside an app context on the chat pool"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise ChatOverloaded("Chat is busy, please try again shortly")
+            self._pending += 1
+
+        def run():
+            with app.app_context():
+                return fn(*args, **kwargs)
+
+        try:
+            future = self._executor.submit(run)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+
+_create_lock = threading.Lock()
+
+
+def chat_limits(config):
+    """(max_workers, max_queue) for the chat executor, kept below WEB_THREADS
+
+    Chats may hold at most CHAT_WEB_THREADS web threads, running and queued
+    together; by default half of WEB_THREADS, and never all of them.
+    """
+    web_threads = config.get('WEB_THREADS', 4)
+    limit = config.get('CHAT_WEB_THREADS') or web_threads // 2
+    limit = max(1, min(limit, web_threads - 1))
+    max_workers = min(config.get('CHAT_MAX_CONCURRENCY', 4), limit)
+    max_queue = min(config.get('CHAT_MAX_QUEUE', 8), limit - max_workers)
+    return max_workers, max_queue
+
+
+def get_chat_executor():
+    """Return the app's chat executor, creating it from config on first use"""
+    app = current_app._get_current_object()
+    executor = app.extensions.get('chat_executor')
+    # Worker threads don't survive fork, so a child process builds its own pool
+    if executor is None or executor.pid != os.getpid():
+        with _create_lock:
+            executor = app.extensions.get('chat_executor')
+            if executor is None or executor.pid != os.getpid():
+                max_workers, max_queue = chat_limits(app.config)
+                executor = ChatExecutor(max_workers=max_workers, max_queue=max_queue)
+                app.extensions['chat_executor'] = executor
+    return executor
+
+
+def _reset_after_fork():
+    global _create_lock
+    _create_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
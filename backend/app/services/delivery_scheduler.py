@@ -0,0 +1,332 @@
+import os
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, text
+from app import db
+from app.models.order import Order, DELIVERY_ACTIVE_STATUSES
+from app.models.user import User
+from app.services.order_events import get_order_broker
+from app.services.order_service import OrderService
+from app.utils.database import use_primary
+
+
+class WaitAndLoadCost:
+    """Default assignment cost: serve the longest-waiting orders first, spread
+    them across drivers, and prefer a driver already collecting from the
+    same kitchen.
+
+    matrix() returns the cost of giving each order to each driver as their
+    next delivery; every further order in the same batch adds
+    ``load_weight``. Any object with the same two members can replace it.
+    """
+
+    def __init__(self, wait_weight=1.0, load_weight=5.0, pickup_weight=3.0):
+        self.wait_weight = wait_weight
+        self.load_weight = load_weight
+        self.pickup_weight = pickup_weight
+
+    def matrix(self, orders, drivers, now):
+        import numpy as np
+
+        wait_minutes = np.array([(now - order.order_time).total_seconds() / 60 for order in orders])
+        load = np.array([driver.load for driver in drivers], dtype=float)
+
+        # drivers x kitchens, then one column per order's kitchen
+        kitchens = {chef_id: k for k, chef_id in enumerate(dict.fromkeys(order.chef_id for order in orders))}
+        collecting = np.zeros((len(drivers), len(kitchens)))
+        for d, driver in enumerate(drivers):
+            for chef_id in driver.chefs:
+                if chef_id in kitchens:
+                    collecting[d, kitchens[chef_id]] = 1.0
+        same_kitchen = collecting[:, [kitchens[order.chef_id] for order in orders]].T
+        return (
+            self.load_weight * load[np.newaxis, :]
+            - self.wait_weight * wait_minutes[:, np.newaxis]
+            - self.pickup_weight * same_kitchen
+        )
+
+
+def solve_greedy(cost, capacity, load_weight):
+    """Oldest order first, each to its cheapest driver with room left
+
+    cost is orders x drivers, with orders sorted oldest first. Returns
+    (order index, driver index) pairs.
+    """
+    import numpy as np
+
+    remaining = np.array(capacity)
+    taken = np.zeros(len(capacity))
+    pairs = []
+    for i in range(cost.shape[0]):
+        if not remaining.any():
+            break
+        row = np.where(remaining > 0, cost[i] + load_weight * taken, np.inf)
+        j = int(np.argmin(row))
+        pairs.append((i, j))
+        remaining[j] -= 1
+        taken[j] += 1
+    return pairs
+
+
+def solve_hungarian(cost, capacity, load_weight):
+    """Minimum total cost assignment (Hungarian method)
+
+    Each driver is expanded into one column per free slot, the k-th slot
+    costing k * load_weight more, so the optimum spreads load exactly as
+    the greedy solver approximates it.
+    """
+    import numpy as np
+
+    slots = np.repeat(np.arange(len(capacity)), capacity)
+    if not len(slots) or not cost.shape[0]:
+        return []
+    rank = np.concatenate([np.arange(c) for c in capacity if c])
+    expanded = cost[:, slots] + load_weight * rank[np.newaxis, :]
+
+    # With more orders than slots, drop orders that at least len(slots) others
+    # strictly beat on every slot: one of those is always left over, and
+    # swapping it in costs less. Ties don't count, or two equally good orders
+    # would knock each other out.
+    orders = np.arange(cost.shape[0])
+    if len(orders) > len(slots):
+        worst = expanded.max(axis=1)
+        best = expanded.min(axis=1)
+        beaten_by = np.searchsorted(np.sort(worst), best, side='left')
+        orders = orders[beaten_by < len(slots)]
+        expanded = expanded[orders]
+
+    transposed = expanded.shape[0] > expanded.shape[1]
+    rows_to_cols = _hungarian(expanded.T if transposed else expanded)
+    if transposed:
+        return sorted((int(orders[col]), int(slots[row])) for row, col in enumerate(rows_to_cols))
+    return [(int(orders[row]), int(slots[col])) for row, col in enumerate(rows_to_cols)]
+
+
+def _hungarian(cost):
+    """Column assigned to each row of an n x m cost matrix, n <= m
+
+    Shortest augmenting paths with row/column potentials, O(n^2 m), with
+    the inner scan over columns vectorized. The matrix is padded to square
+    with zero-cost rows so every column is matched, which lets column
+    potentials start at each column's minimum: rows then stop competing for
+    the same globally cheap columns and most augmenting paths are short.
+    """
+    import numpy as np
+
+    n, m = cost.shape
+    cost = np.vstack([cost, np.zeros((m - n, m))]) if m > n else cost
+    u = np.zeros(m + 1)
+    v = np.concatenate([[0.0], cost.min(axis=0)])
+    owner = np.zeros(m + 1, dtype=int)  # row (1-based) holding each column, 0 = free
+    way = np.zeros(m + 1, dtype=int)
+    for i in range(1, m + 1):
+        owner[0] = i
+        j0 = 0
+        min_reduced = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            free = ~used[1:]
+            better = free & (reduced < min_reduced[1:])
+            min_reduced[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, min_reduced[1:], np.inf)
+            delta = candidates.min()
+            # Among equally cheap columns take an unmatched one: it ends the
+            # path now instead of after walking every tied column
+            ties = candidates == delta
+            unmatched = np.flatnonzero(ties & (owner[1:] == 0))
+            j1 = int(unmatched[0] if len(unmatched) else np.argmax(ties)) + 1
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_reduced[~used] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    assignment = np.zeros(n, dtype=int)
+    for j in range(1, m + 1):
+        if owner[j] <= n:
+            assignment[owner[j] - 1] = j - 1
+    return assignment
+
+
+SOLVERS = {'greedy': solve_greedy, 'hungarian': solve_hungarian}
+
+
+class DriverState:
+    """A delivery person's current load and the kitchens they're collecting from"""
+
+    def __init__(self, driver_id):
+        self.id = driver_id
+        self.load = 0
+        self.chefs = set()
+
+
+# pg_try_advisory_xact_lock key shared by every process running the scheduler
+ADVISORY_LOCK_KEY = 0x74727565  # 'true'
+
+
+class DeliveryScheduler:
+    """Assigns READY_FOR_DELIVERY orders to delivery people in batches.
+
+    Each run reads the delivery people, their current loads and the waiting
+    orders (three queries, the last two through partial indexes), solves the
+    whole batch at once, and commits it with a single conditional UPDATE.
+    Orders assigned by hand in the meantime are skipped by that UPDATE and
+    their driver's slot is simply left for the next run.
+
+    Every worker process runs its own scheduler. On Postgres a run first
+    takes a transaction-level advisory lock and is skipped if another
+    process holds it; everywhere, the UPDATE itself refuses to take a
+    driver past ``max_active``.
+
+    NumPy is only imported once a batch is solved, so creating the app
+    doesn't load it when the scheduler is off.
+    """
+
+    def __init__(self, solver='greedy', max_active=3, cost=None):
+        if solver not in SOLVERS:
+            raise ValueError(f"Unknown delivery solver: {solver}")
+        self.solver = solver
+        self.max_active = max_active
+        self.cost = cost or WaitAndLoadCost()
+        self._run_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread_pid = None
+
+    def _load(self):
+        drivers = {
+            driver_id: DriverState(driver_id)
+            for driver_id in db.session.execute(
+                select(User.id).where(User.user_type == 'delivery', User.is_blacklisted.isnot(True))
+                .order_by(User.id)
+            ).scalars()
+        }
+        for driver_id, chef_id in db.session.execute(
+            select(Order.delivery_person_id, Order.chef_id)
+            .where(Order.status.in_(DELIVERY_ACTIVE_STATUSES), Order.delivery_person_id.isnot(None))
+        ).all():
+            if driver_id in drivers:
+                drivers[driver_id].load += 1
+                drivers[driver_id].chefs.add(chef_id)
+        available = [driver for driver in drivers.values() if driver.load < self.max_active]
+
+        orders = []
+        if available:
+            orders = db.session.execute(
+                select(Order.id, Order.chef_id, Order.order_time)
+                .where(Order.status == 'READY_FOR_DELIVERY')
+                .order_by(Order.order_time, Order.id)
+            ).all()
+        return orders, available
+
+    def _lock_batch(self):
+        """Take the cross-process batch lock until the transaction ends; False if another run holds it"""
+        if db.session.get_bind().dialect.name != 'postgresql':
+            return True
+        return db.session.execute(text('SELECT pg_try_advisory_xact_lock(:key)'), {'key': ADVISORY_LOCK_KEY}).scalar()
+
+    def run_once(self, now=None):
+        """Run one assignment batch and return what it did and how long each step took"""
+        with self._run_lock:
+            started = time.perf_counter()
+            # Assignments are written to the primary, so plan from it too
+            with use_primary():
+                if not self._lock_batch():
+                    db.session.rollback()
+                    return {'orders': 0, 'drivers': 0, 'assigned': 0, 'skipped': True}
+                orders, drivers = self._load()
+            loaded = time.perf_counter()
+
+            pairs = []
+            if orders and drivers:
+                cost = self.cost.matrix(orders, drivers, now or datetime.utcnow())
+                capacity = [self.max_active - driver.load for driver in drivers]
+                pairs = SOLVERS[self.solver](cost, capacity, self.cost.load_weight)
+            solved = time.perf_counter()
+
+            # Commits, releasing the advisory lock; with nothing to assign, end the transaction here
+            rows = OrderService.assign_deliveries({orders[i].id: drivers[j].id for i, j in pairs}, self.max_active)
+            if not rows:
+                db.session.rollback()
+            committed = time.perf_counter()
+
+            return {
+                'orders': len(orders),
+                'drivers': len(drivers),
+                'assigned': len(rows),
+                'load_ms': round((loaded - started) * 1000, 2),
+                'solve_ms': round((solved - loaded) * 1000, 2),
+                'commit_ms': round((committed - solved) * 1000, 2)
+            }
+
+    def trigger(self):
+        """Run the background loop's next batch now instead of at the next tick"""
+        self._wake.set()
+
+    def start(self, app, interval):
+        """Run a batch every interval seconds, or sooner when triggered, on a daemon thread"""
+        # Threads don't survive fork; each worker process starts its own
+        if self._thread_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+
+        def loop():
+            while True:
+                self._wake.wait(interval)
+                self._wake.clear()
+                with app.app_context():
+                    try:
+                        self.run_once()
+                    except Exception as e:
+                        app.logger.error(f"Error in delivery scheduler: {str(e)}")
+                    finally:
+                        db.session.remove()
+
+        threading.Thread(target=loop, name='delivery-scheduler', daemon=True).start()
+
+
+def get_delivery_scheduler(app=None):
+    """Return the app's delivery scheduler, creating it from config on first use"""
+    app = app or current_app._get_current_object()
+    scheduler = app.extensions.get('delivery_scheduler')
+    if scheduler is None:
+        scheduler = app.extensions.setdefault('delivery_scheduler', DeliveryScheduler(
+            solver=app.config.get('DELIVERY_SOLVER', 'greedy'),
+            max_active=app.config.get('DELIVERY_MAX_ACTIVE_ORDERS', 3)
+        ))
+    return scheduler
+
+
+def schedule_deliveries(app):
+    """Start the background scheduler with the first request, if DELIVERY_SCHEDULER_INTERVAL is set
+
+    Orders becoming READY_FOR_DELIVERY wake it early.
+    """
+    interval = app.config.get('DELIVERY_SCHEDULER_INTERVAL')
+    if not interval:
+        return
+
+    scheduler = get_delivery_scheduler(app)
+
+    @get_order_broker(app).listen
+    def _wake_on_ready(event):
+        if event.status == 'READY_FOR_DELIVERY':
+            scheduler.trigger()
+
+    @app.before_request
+    def _start_delivery_scheduler():
+        scheduler.start(app, interval)
@@ -0,0 +1,62 @@
+from app import db
+from app.models.dish import Dish
+from app.models.order import OrderItem
+from flask import current_app
+from sqlalchemy import update, select, func
+
+# Statistics writes don't change anything the menu snapshot, search index or
+# knowledge base hold, so they're tagged to skip the Dish change hooks
+STATS_ONLY = {'dish_stats_only': True}
+
+
+class DishStatsService:
+    
+    @staticmethod
+    def record_order(dish_ids):
+        """Count one more order for each dish, in the caller's transaction
+        
+        dish_ids must be distinct: an order bumps each of its dishes once, so
+        a single UPDATE ... WHERE id IN (...) covers the whole order.
+        """
+        if not dish_ids:
+            return
+        db.session.execute(
+            update(Dish)
+            .where(Dish.id.in_(dish_ids))
+            .values(total_orders=func.coalesce(Dish.total_orders, 0) + 1)
+            .execution_options(synchronize_session=False, **STATS_ONLY)
+        )
+    
+    @staticmethod
+    def reconcile():
+        """Recompute total_orders from order_items and repair any drift
+        
+        Returns the number of dishes whose counter was corrected.
+        """
+        try:
+            counts = dict(db.session.execute(
+                select(OrderItem.dish_id, func.count(func.distinct(OrderItem.order_id)))
+                .group_by(OrderItem.dish_id)
+            ).all())
+            
+            fixes = [
+                {'id': dish_id, 'total_orders': counts.get(dish_id, 0)}
+                for dish_id, total_orders in db.session.execute(select(Dish.id, Dish.total_orders)).all()
+                if total_orders != counts.get(dish_id, 0)
+            ]
+            if fixes:
+                db.session.execute(update(Dish).execution_options(**STATS_ONLY), fixes)
+            db.session.commit()
+            return len(fixes)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error reconciling dish statistics: {str(e)}")
+            raise
+    
+    @staticmethod
+    def get_popular(limit=10):
+        """Most-ordered available dishes, read through ix_dishes_popular"""
+        return Dish.query.filter_by(is_available=True)\
+            .order_by(Dish.total_orders.desc(), Dish.id)\
+            .limit(limit)\
+            .all()
@@ -0,0 +1,204 @@
+import hashlib
+import math
+import random
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from flask import current_app
+
+EMBEDDING_MODEL = "models/embedding-001"
+
+
+class GeminiEmbedder:
+    """Embeds text through Gemini's batch embedding endpoint"""
+
+    # Gemini rejects batch embedding requests with more than 100 inputs
+    max_batch_size = 100
+    requires_api_key = True
+
+    def __init__(self, genai):
+        self.genai = genai
+
+    def embed_documents(self, texts):
+        result = self.genai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=list(texts),
+            task_type="retrieval_document",
+            title="Menu Item"
+        )
+        return result['embedding']
+
+    def embed_query(self, text):
+        result = self.genai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=text,
+            task_type="retrieval_query"
+        )
+        return result['embedding']
+
+
+class FakeEmbedder:
+    """Deterministic offline embedder for benchmarks and local development.
+
+    Vectors are derived from a hash of the text, so identical text always maps
+    to the same vector. An optional per-call latency simulates a remote model.
+    """
+
+    max_batch_size = None
+    requires_api_key = False
+
+    def __init__(self, dimensions=64, latency=0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+        rng = random.Random(seed)
+        vector = [rng.gauss(0, 1) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._vector(text)
+
+
+class HashingEmbedder:
+    """Local, network-free embedder using hashed term frequencies.
+
+    Words and adjacent word pairs are hashed into a fixed number of signed
+    buckets with sublinear term-frequency weights. It needs no model download
+    or fitting, so documents and queries embed consistently in any process.
+    """
+
+    max_batch_size = None
+    requires_api_key = False
+
+    _token_re = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    def _features(self, text):
+        words = self._token_re.findall(text.lower())
+        features = {}
+        for term in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            features[term] = features.get(term, 0) + 1
+        return features
+
+    def _vector(self, text):
+        vector = [0.0] * self.dimensions
+        for term, count in self._features(text).items():
+            h = zlib.crc32(term.encode('utf-8'))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dimensions] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def create_embedder(backend, genai=None):
+    """Build the embedder named by the EMBEDDING_BACKEND setting"""
+    if backend == 'fake':
+        return FakeEmbedder()
+    if backend == 'hashing':
+        return HashingEmbedder()
+    if backend == 'gemini':
+        return GeminiEmbedder(genai)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+class EmbeddingPipeline:
+    """Embeds documents in batches on a bounded pool of worker threads.
+
+    Documents are pulled lazily from the input iterable and each finished
+    batch is handed to the sink straight away, so at most
+    ``concurrency`` batches are held in memory at once.
+    """
+
+    def __init__(self, embedder, batch_size=100, concurrency=4, max_retries=3, backoff=0.5):
+        if embedder.max_batch_size:
+            batch_size = min(batch_size, embedder.max_batch_size)
+        self.embedder = embedder
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def _batches(self, documents):
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _embed_batch(self, batch):
+        texts = [text for _, text, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                return batch, self.embedder.embed_documents(texts)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                # Exponential backoff with jitter so parallel batches don't retry in lockstep
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    def run(self, documents, sink):
+        """Embed (id, text, metadata) tuples and pass each batch to sink.
+
+        sink is called as sink(ids, texts, embeddings, metadatas) from the
+        calling thread. Returns the number of documents processed.
+        """
+        processed = 0
+
+        def drain(futures, return_when):
+            nonlocal processed
+            done, pending = wait(futures, return_when=return_when)
+            for future in done:
+                batch, embeddings = future.result()
+                sink(
+                    [doc_id for doc_id, _, _ in batch],
+                    [text for _, text, _ in batch],
+                    embeddings,
+                    [metadata for _, _, metadata in batch]
+                )
+                processed += len(batch)
+            return pending
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = set()
+            for batch in self._batches(documents):
+                if len(in_flight) >= self.concurrency:
+                    in_flight = drain(in_flight, FIRST_COMPLETED)
+                in_flight.add(executor.submit(self._embed_batch, batch))
+            if in_flight:
+                drain(in_flight, ALL_COMPLETED)
+
+        return processed
+
+
+def pipeline_from_config(embedder, config=None):
+    """Build an EmbeddingPipeline sized from the app config"""
+    config = config or current_app.config
+    return EmbeddingPipeline(
+        embedder,
+        batch_size=config.get('EMBEDDING_BATCH_SIZE', 100),
+        concurrency=config.get('EMBEDDING_CONCURRENCY', 4),
+        max_retries=config.get('EMBEDDING_MAX_RETRIES', 3),
+        backoff=config.get('EMBEDDING_RETRY_BACKOFF', 0.5)
+    )
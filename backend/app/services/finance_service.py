@@ -2,6 +2,11 @@ from app import db
 from app.models.finance import Wallet, Transaction
 from app.models.user import User
 from flask import current_app
+from app.utils.pagination import encode_cursor, decode_cursor, clamp_limit
+from app.services.row_cache import get_row_cache
+from sqlalchemy import update, select, tuple_
+from sqlalchemy.orm.attributes import set_committed_value
+from decimal import Decimal
 
 class FinanceService:
     
@@ -21,7 +26,7 @@ class FinanceService:
     @staticmethod
     def get_wallet(user_id):
         """Get user's wallet"""
-        wallet = Wallet.query.filter_by(user_id=user_id).first()
+        wallet = get_row_cache().get_wallet(user_id)
         if not wallet:
             raise ValueError(f"Wallet not found for user {user_id}")
         return wallet
@@ -32,9 +37,11 @@ class FinanceService:
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
+        amount = FinanceService._to_money(amount)
+        
         try:
             wallet = FinanceService.get_wallet(user_id)
-            wallet.add_funds(amount)
+            FinanceService._apply_balance_change(wallet, amount)
             
             transaction = Transaction(
                 wallet_id=wallet.id,
@@ -53,19 +60,67 @@ class FinanceService:
             raise
     
     @staticmethod
-    def process_payment(user_id, order_id, amount, description="Order payment"):
-        """Deduct money from wallet for an order"""
+    def _to_money(amount):
+        """Normalize an amount to a two-place Decimal for SQL arithmetic"""
+        return Decimal(str(amount)).quantize(Decimal('0.01'))
+    
+    @staticmethod
+    def _apply_balance_change(wallet, delta):
+        """Atomically add delta to the wallet balance in SQL.
+        
+        Debits only apply when the balance covers them. The new balance is
+        read back with UPDATE ... RETURNING, or with a follow-up SELECT in the
+        same transaction on databases without it, and stored on the wallet
+        without a reload. Returns False when the debit was refused.
+        """
+        stmt = update(Wallet).where(Wallet.id == wallet.id).values(balance=Wallet.balance + delta)
+        if delta < 0:
+            stmt = stmt.where(Wallet.balance >= -delta)
+        stmt = stmt.execution_options(synchronize_session=False)
+        
+        if db.session.get_bind().dialect.update_returning:
+            row = db.session.execute(stmt.returning(Wallet.balance, Wallet.updated_at)).first()
+        else:
+            if db.session.execute(stmt).rowcount != 1:
+                return False
+            row = db.session.execute(
+                select(Wallet.balance, Wallet.updated_at).where(Wallet.id == wallet.id)
+            ).first()
+        
+        if row is None:
+            return False
+        set_committed_value(wallet, 'balance', row.balance)
+        set_committed_value(wallet, 'updated_at', row.updated_at)
+        return True
+    
+    @staticmethod
+    def debit_wallet(wallet, amount):
+        """Atomically deduct amount if the balance covers it.
+        
+        The conditional UPDATE holds the row lock until the surrounding
+        transaction ends, so concurrent payments cannot overdraw the wallet.
+        Returns False when funds are insufficient.
+        """
+        return FinanceService._apply_balance_change(wallet, -FinanceService._to_money(amount))
+    
+    @staticmethod
+    def process_payment(user_id, order_id, amount, description="Order payment", commit=True):
+        """Deduct money from wallet for an order
+        
+        With commit=False the debit and ledger row are only flushed, leaving
+        the caller to commit them together with its own changes.
+        """
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
+        amount = FinanceService._to_money(amount)
+        
         try:
             wallet = FinanceService.get_wallet(user_id)
             
-            if not wallet.has_sufficient_funds(amount):
+            if not FinanceService.debit_wallet(wallet, amount):
                 raise ValueError("Insufficient funds")
             
-            wallet.deduct_funds(amount)
-            
             transaction = Transaction(
                 wallet_id=wallet.id,
                 order_id=order_id,
@@ -75,11 +130,15 @@ class FinanceService:
             )
             
             db.session.add(transaction)
-            db.session.commit()
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             
             return wallet, transaction
         except Exception as e:
-            db.session.rollback()
+            if commit:
+                db.session.rollback()
             current_app.logger.error(f"Error processing payment: {str(e)}")
             raise
     
@@ -89,9 +148,11 @@ class FinanceService:
         if amount <= 0:
             raise ValueError("Amount must be positive")
         
+        amount = FinanceService._to_money(amount)
+        
         try:
             wallet = FinanceService.get_wallet(user_id)
-            wallet.add_funds(amount)
+            FinanceService._apply_balance_change(wallet, amount)
             
             transaction = Transaction(
                 wallet_id=wallet.id,
@@ -111,11 +172,56 @@ class FinanceService:
             raise
     
     @staticmethod
-    def get_transaction_history(user_id, limit=50):
-        """Get user's transaction history"""
+    def _transaction_history_query(wallet_id):
+        """Column-only select of a wallet's ledger, newest first"""
+        return select(
+            Transaction.id,
+            Transaction.amount,
+            Transaction.transaction_type,
+            Transaction.description,
+            Transaction.created_at
+        ).where(Transaction.wallet_id == wallet_id)\
+            .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+    
+    @staticmethod
+    def get_transaction_history(user_id, limit=50, cursor=None):
+        """Get one page of user's transaction history
+        
+        Pages are keyed on (created_at, id), so deep pages cost the same as
+        the first. Returns the rows and the cursor for the next page, or
+        None when there are no more rows.
+        """
+        limit = clamp_limit(limit)
+        wallet = FinanceService.get_wallet(user_id)
+        
+        query = FinanceService._transaction_history_query(wallet.id)
+        if cursor:
+            created_at, transaction_id = decode_cursor(cursor)
+            query = query.where(tuple_(Transaction.created_at, Transaction.id) < (created_at, transaction_id))
+        
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+    
+    @staticmethod
+    def iter_transaction_history(user_id, batch_size=500):
+        """Iterate over user's full transaction history from a server-side cursor
+        
+        The wallet is resolved up front so a missing wallet raises here rather
+        than halfway through a streamed response.
+        """
         wallet = FinanceService.get_wallet(user_id)
-        transactions = Transaction.query.filter_by(wallet_id=wallet.id)\
-            .order_by(Transaction.created_at.desc())\
-            .limit(limit)\
-            .all()
-        return transactions
\ No newline at end of file
+        query = FinanceService._transaction_history_query(wallet.id)
+        
+        def rows():
+            result = db.session.execute(query.execution_options(yield_per=batch_size))
+            try:
+                yield from result
+            finally:
+                result.close()
+        
+        return rows()
@@ -0,0 +1,59 @@
+import os
+import threading
+from flask import current_app
+from app.services.menu_cache import menu_cache
+
+
+class DebouncedSyncQueue:
+    """Coalesces bursts of menu changes into one background KB sync.
+
+    Every request pushes the deadline back by ``delay`` seconds, so editing a
+    dozen dishes in a row triggers a single incremental sync once the edits
+    settle.
+    """
+
+    def __init__(self, delay=5.0):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def request_sync(self, app):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self._run, args=(app,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _run(self, app):
+        with self._lock:
+            self._timer = None
+
+        from app.services.llm import ChatService
+
+        with app.app_context():
+            try:
+                ChatService.get_instance().sync_knowledge_base()
+            except Exception as e:
+                app.logger.error(f"Error in background knowledge base sync: {str(e)}")
+
+
+sync_queue = DebouncedSyncQueue()
+
+
+def _reset_after_fork():
+    # The parent's timer thread doesn't exist in the child
+    sync_queue._lock = threading.Lock()
+    sync_queue._timer = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+@menu_cache.subscribe
+def _schedule_kb_sync(version, dish_ids):
+    if not current_app.config.get('KB_AUTO_SYNC'):
+        return
+    sync_queue.delay = current_app.config.get('KB_SYNC_DEBOUNCE_SECONDS', 5.0)
+    sync_queue.request_sync(current_app._get_current_object())
@@ -0,0 +1,206 @@
+import heapq
+import threading
+import time
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models.order import Order, KITCHEN_OPEN_STATUSES
+from app.services.order_events import get_order_broker
+from app.services.order_service import OrderService, OrderConflict
+from app.utils.database import use_primary
+
+
+class ChefTickets:
+    """One chef's open tickets, as a min-heap of (order_time, order_id) per status.
+
+    ``status`` is the source of truth for which tickets are open; heap
+    entries that disagree with it are stale and get dropped once they reach
+    the top, so every change is O(log n) or better.
+    """
+
+    def __init__(self, loaded_at):
+        self.loaded_at = loaded_at
+        self.status = {}
+        self.heaps = {status: [] for status in KITCHEN_OPEN_STATUSES}
+        self.counts = dict.fromkeys(KITCHEN_OPEN_STATUSES, 0)
+
+    def put(self, order_id, status, order_time):
+        previous = self.status.get(order_id)
+        if previous == status:
+            return
+        if previous is not None:
+            self.counts[previous] -= 1
+        self.status[order_id] = status
+        self.counts[status] += 1
+        heapq.heappush(self.heaps[status], (order_time, order_id))
+
+    def discard(self, order_id):
+        previous = self.status.pop(order_id, None)
+        if previous is not None:
+            self.counts[previous] -= 1
+
+    def pop_oldest(self, status):
+        heap = self.heaps[status]
+        while heap:
+            order_time, order_id = heapq.heappop(heap)
+            if self.status.get(order_id) == status:
+                return order_time, order_id
+        return None
+
+    def oldest(self, status, limit):
+        entries = (entry for entry in self.heaps[status] if self.status.get(entry[1]) == status)
+        return heapq.nsmallest(limit, entries)
+
+
+class KitchenQueue:
+    """Per-chef views of open kitchen tickets, kept current from order events.
+
+    A chef's tickets are loaded once through ix_orders_chef_open and then
+    updated in place from the order event broker, so refreshing a kitchen
+    display doesn't query the database. Views are reloaded after ``ttl``
+    seconds to pick up changes made by other worker processes.
+
+    Loads run outside the lock, so one chef's reload never stalls another
+    chef's display or event delivery. Events for a chef that arrive while
+    its view loads are replayed onto the new view before it is swapped in.
+    """
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._chefs = {}
+        # chef_id -> one list of missed events per load in progress
+        self._loading = {}
+
+    @staticmethod
+    def _load_rows(chef_id):
+        # The view outlives the request, so never load it from a lagging replica
+        with use_primary():
+            return db.session.execute(
+                select(Order.id, Order.status, Order.order_time)
+                .where(Order.chef_id == chef_id, Order.status.in_(KITCHEN_OPEN_STATUSES))
+                .order_by(Order.order_time, Order.id)
+            ).all()
+
+    def _tickets(self, chef_id):
+        """Return chef_id's view, loading it if missing or expired"""
+        with self._lock:
+            tickets = self._chefs.get(chef_id)
+            if tickets is not None and time.monotonic() - tickets.loaded_at < self.ttl:
+                return tickets
+            missed = []
+            self._loading.setdefault(chef_id, []).append(missed)
+
+        loaded_at = time.monotonic()
+        try:
+            rows = self._load_rows(chef_id)
+        except Exception:
+            with self._lock:
+                self._end_load(chef_id, missed)
+            raise
+
+        tickets = ChefTickets(loaded_at)
+        for order_id, status, order_time in rows:
+            tickets.put(order_id, status, order_time)
+        with self._lock:
+            self._end_load(chef_id, missed)
+            # Events published after the load began may or may not be in its
+            # rows; replaying them in order leaves each ticket's latest status
+            for event in missed:
+                self._apply(tickets, event)
+            self._chefs[chef_id] = tickets
+        return tickets
+
+    def _end_load(self, chef_id, missed):
+        loads = self._loading[chef_id]
+        loads.remove(missed)
+        if not loads:
+            del self._loading[chef_id]
+
+    @staticmethod
+    def _apply(tickets, event):
+        if event.status in KITCHEN_OPEN_STATUSES:
+            tickets.put(event.order_id, event.status, event.order_time)
+        else:
+            tickets.discard(event.order_id)
+
+    def apply(self, event):
+        """Order event listener: move the ticket in its chef's view, if loaded or loading"""
+        with self._lock:
+            for missed in self._loading.get(event.chef_id, ()):
+                missed.append(event)
+            tickets = self._chefs.get(event.chef_id)
+            if tickets is not None:
+                self._apply(tickets, event)
+
+    def view(self, chef_id, limit=50):
+        """Oldest waiting and in-progress tickets for chef_id, plus totals"""
+        tickets = self._tickets(chef_id)
+        with self._lock:
+            return {
+                status: tickets.oldest(status, limit) for status in KITCHEN_OPEN_STATUSES
+            }, dict(tickets.counts)
+
+    def claim(self, chef_id, order_id=None, attempts=5):
+        """Start cooking order_id, or the chef's oldest waiting ticket
+
+        Returns the updated order row, or None if nothing is waiting. The
+        claim is persisted with one conditional UPDATE; when another worker
+        took the ticket first, the view is reloaded and the next one tried.
+        """
+        conflict = None
+        for _ in range(attempts):
+            candidate = order_id
+            if candidate is None:
+                tickets = self._tickets(chef_id)
+                with self._lock:
+                    entry = tickets.pop_oldest('CREATED')
+                if entry is None:
+                    return None
+                candidate = entry[1]
+            try:
+                return OrderService.update_order_status(
+                    candidate, 'IN_KITCHEN', expected_status='CREATED', chef_id=chef_id
+                )
+            except OrderConflict as e:
+                # The popped ticket is gone from the view either way; reload it
+                self.forget(chef_id)
+                if order_id is not None:
+                    raise
+                conflict = e
+            except Exception:
+                self.forget(chef_id)
+                raise
+        raise conflict
+
+    def complete(self, chef_id, order_id):
+        """Mark an in-progress ticket ready for delivery"""
+        try:
+            return OrderService.update_order_status(
+                order_id, 'READY_FOR_DELIVERY', expected_status='IN_KITCHEN', chef_id=chef_id
+            )
+        except OrderConflict:
+            self.forget(chef_id)
+            raise
+
+    def forget(self, chef_id):
+        """Drop chef_id's view so the next access reloads it"""
+        with self._lock:
+            self._chefs.pop(chef_id, None)
+
+
+_create_lock = threading.Lock()
+
+
+def get_kitchen_queue(app=None):
+    """Return the app's kitchen queue, creating it and subscribing it to order events on first use"""
+    app = app or current_app._get_current_object()
+    kitchen = app.extensions.get('kitchen_queue')
+    if kitchen is None:
+        with _create_lock:
+            kitchen = app.extensions.get('kitchen_queue')
+            if kitchen is None:
+                kitchen = KitchenQueue(ttl=app.config.get('KITCHEN_QUEUE_TTL', 5.0))
+                get_order_broker(app).listen(kitchen.apply)
+                app.extensions['kitchen_queue'] = kitchen
+    return kitchen
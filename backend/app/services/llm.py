@@ -1,127 +1,390 @@
 import os
-import google.generativeai as genai
-import chromadb
-from chromadb.utils import embedding_functions
+import re
+import json
+import hashlib
+import threading
+import time
 from flask import current_app
 from app.models.dish import Dish
+from app.services.embeddings import create_embedder, pipeline_from_config
+from app.services import kb_sync  # registers the Dish change hook
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
 from app import db
 
 class ChatService:
+    """Menu-aware chat assistant.
+    
+    Importing this module is cheap: the Gemini SDK, the vector index and NumPy
+    are only imported when the service is first built, which happens on a
+    background warm-up thread (see schedule_warm_up) or on the first chat.
+    """
     _instance = None
+    _instance_pid = None
+    _instance_lock = threading.Lock()
+    _sync_lock = threading.Lock()
+    _state = 'cold'
+    _last_error = None
+    
+    NOT_CONFIGURED_REPLY = "I'm sorry, but I'm not configured correctly to answer questions right now."
+    ERROR_REPLY = "I'm sorry, I encountered an error processing your request."
+    # Metadata flags retrieval filters on
+    FILTER_FIELDS = frozenset({"is_available", "is_vip_only"})
     
     def __init__(self):
-        api_key = current_app.config.get('GOOGLE_API_KEY')
-        if not api_key:
-            print("Warning: GOOGLE_API_KEY not set. Chat features will not work.")
-            return
-            
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Initialize ChromaDB (in-memory for now, or persistent)
-        # Using a local folder for persistence so we don't re-index every restart
-        self.chroma_client = chromadb.PersistentClient(path="./instance/knowledge_base")
-        
-        # Use Gemini for embeddings if possible, or default to a lightweight local model
-        # For simplicity in this implementation, we'll use Gemini's embedding model manually
-        # or use Chroma's default which downloads a small model.
-        # Let's use Gemini embeddings for consistency.
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="menu_items",
-            metadata={"hnsw:space": "cosine"}
+        config = current_app.config
+        self.kb_version = 0
+        self.query_embedding_cache = TTLCache(config.get('CHAT_EMBEDDING_CACHE_SIZE', 2048), config.get('CHAT_EMBEDDING_CACHE_TTL', 86400))
+        self.answer_cache = TTLCache(config.get('CHAT_ANSWER_CACHE_SIZE', 512), config.get('CHAT_ANSWER_CACHE_TTL', 600))
+        
+        from app.services.vector_index import create_vector_index
+        from app.services.retrieval import HybridRetriever
+        
+        api_key = config.get('GOOGLE_API_KEY')
+        embedding_backend = config.get('EMBEDDING_BACKEND', 'gemini')
+        genai = None
+        if api_key or embedding_backend == 'gemini':
+            import google.generativeai as genai
+        
+        self.model = None
+        if genai is not None:
+            # The SDK keeps one client (and its keep-alive channel) per process;
+            # configuring here, once per pid, gives each forked worker its own
+            genai.configure(api_key=api_key, transport=config.get('GEMINI_TRANSPORT') or None)
+        if api_key:
+            self.model = genai.GenerativeModel('gemini-2.5-flash')
+        else:
+            print("Warning: GOOGLE_API_KEY not set. Chat answers will not work.")
+        
+        # Retrieval works without the API key when both the embedder and the
+        # index are local ('hashing' + 'local')
+        self.embedder = create_embedder(embedding_backend, genai)
+        self.index = create_vector_index(config)
+        self.retriever = HybridRetriever(
+            self.index,
+            rrf_k=config.get('CHAT_RRF_K', 60),
+            candidates=config.get('CHAT_RETRIEVAL_CANDIDATES', 4)
         )
+        # (count, digest) of the index contents the name index was built
+        # from, and when that was last compared with the index
+        self._lexical_signature = None
+        self._lexical_checked_at = None
+        self._lexical_lock = threading.Lock()
+        # The FILTER_FIELDS every indexed document carries. Documents indexed
+        # before the flags were stored lack them, and a filter on a missing
+        # field would match none of them
+        self.filter_fields = self.FILTER_FIELDS
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
+        """Return this process's service, building and warming it on first use.
+        
+        Construction is serialized so concurrent requests build it once, and
+        an instance inherited across fork is discarded so worker processes
+        never share index handles or model connections. The state stays
+        'warming' until warm_up() has opened the index and built the name
+        index, and only then becomes 'ready'.
+        """
+        pid = os.getpid()
+        if cls._instance is None or cls._instance_pid != pid:
+            with cls._instance_lock:
+                if cls._instance is None or cls._instance_pid != pid:
+                    cls._state = 'warming'
+                    try:
+                        instance = cls()
+                        instance.warm_up()
+                    except Exception as e:
+                        cls._state = 'failed'
+                        cls._last_error = str(e)
+                        raise
+                    cls._instance, cls._instance_pid = instance, pid
+                    cls._state = 'ready'
+                    cls._last_error = None
         return cls._instance
 
+    @classmethod
+    def _reset_after_fork(cls):
+        cls._instance = None
+        cls._instance_pid = None
+        cls._instance_lock = threading.Lock()
+        cls._sync_lock = threading.Lock()
+        cls._state = 'cold'
+        cls._last_error = None
+
+    @classmethod
+    def status(cls):
+        """Health report that never builds the service itself"""
+        instance = cls._instance if cls._instance_pid == os.getpid() else None
+        report = {
+            'state': cls._state,
+            'pid': os.getpid(),
+            'last_error': cls._last_error
+        }
+        if instance is not None:
+            report.update({
+                'model_configured': instance.model is not None,
+                'embedder': type(instance.embedder).__name__,
+                'index': type(instance.index).__name__,
+                'kb_version': instance.kb_version
+            })
+            try:
+                report['documents'] = instance.index.count()
+            except Exception as e:
+                report['state'] = 'degraded'
+                report['last_error'] = str(e)
+        return report
+
+    @classmethod
+    def schedule_warm_up(cls, app):
+        """Build the service off the request path, as set by CHAT_WARMUP.
+        
+        'startup' warms up as soon as the app is created, 'first_request'
+        (the default) once the first request arrives, and 'off' leaves it to
+        the first chat.
+        """
+        mode = app.config.get('CHAT_WARMUP', 'first_request')
+        
+        def start():
+            threading.Thread(target=cls._warm_up, args=(app,), name='chat-warmup', daemon=True).start()
+        
+        if mode == 'startup':
+            start()
+        elif mode == 'first_request':
+            started = threading.Event()
+            
+            @app.before_request
+            def _start_chat_warm_up():
+                if not started.is_set():
+                    started.set()
+                    start()
+
+    @classmethod
+    def _warm_up(cls, app):
+        with app.app_context():
+            try:
+                cls.get_instance()
+            except Exception as e:
+                app.logger.error(f"Error warming up chat service: {str(e)}")
+
+    def warm_up(self):
+        """Open the index and build the name index ahead of the first question
+        
+        A knowledge base indexed by an older version is re-synced here, so
+        its documents gain the metadata the retrieval filters need.
+        """
+        self.index.count()
+        self._ensure_lexical()
+        if self.filter_fields != self.FILTER_FIELDS and self.sync_knowledge_base():
+            self._ensure_lexical()
+
+    def _check_metadata(self):
+        """Only filter on flags that every indexed document records"""
+        fields = set(self.FILTER_FIELDS)
+        for _, _, metadata in self.index.entries():
+            fields &= (metadata or {}).keys()
+            if not fields:
+                break
+        self.filter_fields = fields
+
+    def _index_signature(self):
+        """(count, digest of every content hash): changes whenever any process edits the index"""
+        hashes = self.index.content_hashes()
+        digest = hashlib.sha256()
+        for doc_id in sorted(hashes):
+            digest.update(f"{doc_id}:{hashes[doc_id]}\n".encode('utf-8'))
+        return len(hashes), digest.hexdigest()
+
+    def _ensure_lexical(self):
+        """Rebuild the name index when the vector index contents changed
+        
+        The index may be shared with other worker processes (Chroma), whose
+        syncs this process never sees, so its contents are compared at most
+        every CHAT_INDEX_CHECK_SECONDS. A change also invalidates cached
+        answers. One thread checks at a time; the others keep using the
+        current name index.
+        """
+        checked_at = self._lexical_checked_at
+        interval = current_app.config.get('CHAT_INDEX_CHECK_SECONDS', 5)
+        if checked_at is not None and time.monotonic() - checked_at < interval:
+            return
+        if not self._lexical_lock.acquire(blocking=self._lexical_signature is None):
+            return
+        try:
+            if self._lexical_checked_at is not checked_at:
+                return
+            signature = self._index_signature()
+            if signature != self._lexical_signature:
+                self.retriever.refresh()
+                self._check_metadata()
+                if self._lexical_signature is not None:
+                    self.bump_kb_version()
+                self._lexical_signature = signature
+            self._lexical_checked_at = time.monotonic()
+        finally:
+            self._lexical_lock.release()
+
     def generate_embedding(self, text):
-        """Generate embedding using Gemini"""
-        result = genai.embed_content(
-            model="models/embedding-001",
-            content=text,
-            task_type="retrieval_document",
-            title="Menu Item"
-        )
-        return result['embedding']
+        """Generate a document embedding for a single text"""
+        return self.embedder.embed_documents([text])[0]
+
+    @staticmethod
+    def render_document(dish):
+        """Render the text we embed and store for a dish"""
+        content = f"Dish: {dish.name}. Price: ${dish.price}. Description: {dish.description}. "
+        if dish.is_vip_only:
+            content += "This is a VIP exclusive dish. "
+        return content
+
+    @staticmethod
+    def content_hash(document, metadata):
+        """Hash of everything we store for a dish, so any change triggers a re-index"""
+        payload = json.dumps([document, metadata], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _iter_documents(self):
+        """Stream (id, document, metadata) for every available dish"""
+        dishes = Dish.query.filter_by(is_available=True)\
+            .order_by(Dish.id)\
+            .yield_per(500)
+        for dish in dishes:
+            document = self.render_document(dish)
+            metadata = {
+                "name": dish.name,
+                "price": float(dish.price),
+                "id": dish.id,
+                "is_vip_only": bool(dish.is_vip_only),
+                "is_available": bool(dish.is_available)
+            }
+            metadata["content_hash"] = self.content_hash(document, metadata)
+            yield str(dish.id), document, metadata
+
+    def can_embed(self):
+        return bool(current_app.config.get('GOOGLE_API_KEY')) or not self.embedder.requires_api_key
 
     def sync_knowledge_base(self):
-        """Re-index all menu items into the vector store"""
-        if not current_app.config.get('GOOGLE_API_KEY'):
+        """Bring the vector store in line with the available menu items
+        
+        Only new or changed dishes are embedded; dishes that were removed or
+        became unavailable are deleted from the index.
+        """
+        if not self.can_embed():
             return False
 
-        try:
-            # Clear existing
-            # self.chroma_client.delete_collection("menu_items") 
-            # self.collection = self.chroma_client.create_collection("menu_items")
-            # Better: just upsert
-            
-            dishes = Dish.query.filter_by(is_available=True).all()
-            
-            ids = []
-            documents = []
-            metadatas = []
-            embeddings = []
-
-            for dish in dishes:
-                # Create a rich description for the vector store
-                content = f"Dish: {dish.name}. Price: ${dish.price}. Description: {dish.description}. "
-                if dish.is_vip_only:
-                    content += "This is a VIP exclusive dish. "
-                
-                ids.append(str(dish.id))
-                documents.append(content)
-                metadatas.append({
-                    "name": dish.name,
-                    "price": float(dish.price),
-                    "id": dish.id
-                })
-                
-                # Generate embedding
-                # Note: In production, batch this to avoid rate limits
-                emb = self.generate_embedding(content)
-                embeddings.append(emb)
-
-            if ids:
-                self.collection.upsert(
-                    ids=ids,
-                    documents=documents,
-                    embeddings=embeddings,
-                    metadatas=metadatas
+        with self._sync_lock:
+            try:
+                chunk_size = current_app.config.get('KB_UPSERT_CHUNK_SIZE', 500)
+                pending = {'ids': [], 'documents': [], 'embeddings': [], 'metadatas': []}
+
+                def flush():
+                    if pending['ids']:
+                        self.index.upsert(**pending)
+                        for values in pending.values():
+                            values.clear()
+
+                def sink(ids, documents, embeddings, metadatas):
+                    pending['ids'].extend(ids)
+                    pending['documents'].extend(documents)
+                    pending['embeddings'].extend(embeddings)
+                    pending['metadatas'].extend(metadatas)
+                    if len(pending['ids']) >= chunk_size:
+                        flush()
+
+                indexed = self.index.content_hashes()
+                current = set()
+
+                def changed_documents():
+                    for doc_id, document, metadata in self._iter_documents():
+                        current.add(doc_id)
+                        if indexed.get(doc_id) != metadata["content_hash"]:
+                            yield doc_id, document, metadata
+
+                pipeline = pipeline_from_config(self.embedder)
+                embedded = pipeline.run(changed_documents(), sink)
+                flush()
+
+                stale = [doc_id for doc_id in indexed if doc_id not in current]
+                if stale:
+                    self.index.delete(stale)
+                self.index.persist()
+                # Compare the name index with the index again on the next
+                # question, even if another process made these changes first
+                self._lexical_checked_at = None
+
+                current_app.logger.info(
+                    f"Knowledge base synced: {embedded} embedded, {len(stale)} removed, "
+                    f"{len(current) - embedded} unchanged"
                 )
-            return True
-        except Exception as e:
-            print(f"Error syncing knowledge base: {e}")
-            return False
+                return True
+            except Exception as e:
+                print(f"Error syncing knowledge base: {e}")
+                return False
 
-    def get_response(self, user_query):
-        """RAG flow: Retrieve -> Generate"""
-        if not current_app.config.get('GOOGLE_API_KEY'):
-            return "I'm sorry, but I'm not configured correctly to answer questions right now."
+    def bump_kb_version(self):
+        """Invalidate cached answers after the knowledge base changed"""
+        self.kb_version += 1
+        self.answer_cache.clear()
 
-        try:
-            # 1. Embed the query
-            query_embedding = genai.embed_content(
-                model="models/embedding-001",
-                content=user_query,
-                task_type="retrieval_query"
-            )
-
-            # 2. Search Knowledge Base
-            results = self.collection.query(
-                query_embeddings=[query_embedding['embedding']],
-                n_results=3
-            )
-
-            # 3. Construct Context
-            context = ""
-            if results['documents']:
-                context = "\n".join(results['documents'][0])
+    @staticmethod
+    def normalize_query(user_query):
+        """Collapse case, whitespace and trailing punctuation so repeats share cache entries"""
+        return re.sub(r'\s+', ' ', user_query).strip().rstrip('?!. ').lower()
 
-            # 4. Generate Response
-            system_prompt = f"""You are a helpful customer service assistant for TrueBite restaurant.
+    def embed_query(self, user_query):
+        """Embed a query, reusing the embedding for repeated questions"""
+        key = self.normalize_query(user_query)
+        embedding = self.query_embedding_cache.get(key)
+        if embedding is None:
+            with metrics.time_external('embedder', 'embed_query'):
+                embedding = self.embedder.embed_query(user_query)
+            self.query_embedding_cache.set(key, embedding)
+        return embedding
+
+    def cache_stats(self):
+        return {
+            'kb_version': self.kb_version,
+            'query_embeddings': self.query_embedding_cache.stats(),
+            'answers': self.answer_cache.stats()
+        }
+
+    @staticmethod
+    def _price_filter(user_query):
+        from app.services.retrieval import price_filter
+        return price_filter(user_query)
+
+    def _retrieve(self, user_query, include_vip=False):
+        """Embed and search the knowledge base.
+        
+        VIP-only dishes are filtered out for everyone else, and price limits
+        in the question ("under $15") become part of the filter. Returns the
+        answer cache key and the context to ground the answer in.
+        """
+        # 1. Embed the query
+        query_embedding = self.embed_query(user_query)
+
+        # 2. Search Knowledge Base
+        self._ensure_lexical()
+        
+        where = {"is_available": True}
+        if not include_vip:
+            where["is_vip_only"] = False
+        # Until a re-sync adds the flags, older documents are matched on price only
+        where = {field: value for field, value in where.items() if field in self.filter_fields}
+        where.update(self._price_filter(user_query))
+        
+        k = current_app.config.get('CHAT_RETRIEVAL_K', 3)
+        results = self.retriever.retrieve(user_query, query_embedding, k=k, where=where)
+
+        # Same question over the same documents and KB version -> same answer
+        doc_ids = tuple(doc_id for doc_id, _, _ in results)
+        answer_key = (self.normalize_query(user_query), doc_ids, self.kb_version)
+
+        # 3. Construct Context
+        context = "\n".join(document for _, document, _ in results)
+        return answer_key, context
+
+    @staticmethod
+    def _build_prompt(context, user_query):
+        system_prompt = f"""You are a helpful customer service assistant for TrueBite restaurant.
             Use the following context about our menu to answer the user's question.
             If the answer is not in the context, politely say you don't know and offer to connect them with a human manager.
             Do not make up menu items or prices.
@@ -129,14 +392,68 @@ class ChatService:
             Context:
             {context}
             """
-            
-            chat = self.model.start_chat(history=[
-                {"role": "user", "parts": [system_prompt + f"\n\nUser Question: {user_query}"]}
-            ])
-            
-            response = chat.last.text
+        return system_prompt + f"\n\nUser Question: {user_query}"
+
+    def get_response(self, user_query, include_vip=False, cancelled=None):
+        """RAG flow: Retrieve -> Generate
+        
+        cancelled is an optional threading.Event; once the caller sets it
+        (e.g. after giving up waiting), no generation is started and None is
+        returned.
+        """
+        if self.model is None:
+            return self.NOT_CONFIGURED_REPLY
+
+        try:
+            answer_key, context = self._retrieve(user_query, include_vip)
+            cached = self.answer_cache.get(answer_key)
+            if cached is not None:
+                return cached
+            if cancelled is not None and cancelled.is_set():
+                return None
+
+            # 4. Generate Response
+            with metrics.time_external('gemini', 'generate'):
+                response = self.model.generate_content(self._build_prompt(context, user_query)).text
+            self.answer_cache.set(answer_key, response)
             return response
 
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "I'm sorry, I encountered an error processing your request."
+            return self.ERROR_REPLY
+
+    def stream_response(self, user_query, include_vip=False, cancelled=None):
+        """RAG flow that yields the answer in chunks as the model produces them
+        
+        Stops pulling from the model as soon as the optional cancelled event
+        is set, e.g. because the client went away.
+        """
+        if self.model is None:
+            yield self.NOT_CONFIGURED_REPLY
+            return
+
+        try:
+            answer_key, context = self._retrieve(user_query, include_vip)
+            cached = self.answer_cache.get(answer_key)
+            if cached is not None:
+                yield cached
+                return
+
+            parts = []
+            # Covers the whole stream, including time the consumer spends between chunks
+            with metrics.time_external('gemini', 'generate_stream'):
+                for chunk in self.model.generate_content(self._build_prompt(context, user_query), stream=True):
+                    if cancelled is not None and cancelled.is_set():
+                        return
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+            self.answer_cache.set(answer_key, "".join(parts))
+
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            yield self.ERROR_REPLY
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=ChatService._reset_after_fork)
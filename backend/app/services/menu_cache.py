@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from flask import current_app
+from app.models.dish import Dish
+from app.utils.database import use_primary
+
+
+class MenuSnapshot:
+    """Pre-serialized menu payload for one cache version"""
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()
+        self.built_at = time.monotonic()
+
+
+class MenuCache:
+    """Process-wide cache of the serialized public menu.
+
+    Any flushed write to a Dish bumps the version once the transaction commits,
+    so the next read rebuilds the snapshot. Reads of a current snapshot never
+    touch the database. Other components can subscribe to the same committed
+    Dish changes.
+
+    Writes from other processes don't fire this process's session events, so
+    a snapshot is also rebuilt once it is MENU_CACHE_TTL seconds old. If the
+    menu turns out to have changed, that counts as a change of unknown
+    dishes: the version is bumped, the new snapshot is kept under it and
+    subscribers are notified.
+
+    Only one thread rebuilds at a time; the others keep serving the previous
+    snapshot rather than each serializing the whole menu, unless there is
+    none yet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._version = 0
+        self._snapshot = None
+        self._subscribers = []
+
+    @property
+    def version(self):
+        return self._version
+
+    def subscribe(self, callback):
+        """Call callback(version, dish_ids) after each committed Dish change.
+
+        dish_ids is the set of changed dish ids, or None when a bulk statement
+        changed an unknown set of rows.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def invalidate(self, dish_ids=None):
+        """Mark the current snapshot as stale and notify subscribers"""
+        with self._lock:
+            self._version += 1
+            version = self._version
+        self._notify(version, dish_ids)
+
+    def _notify(self, version, dish_ids):
+        for callback in self._subscribers:
+            try:
+                callback(version, dish_ids)
+            except Exception as e:
+                current_app.logger.error(f"Error in menu change subscriber: {str(e)}")
+
+    def _is_stale(self, snapshot):
+        if snapshot is None or snapshot.version != self._version:
+            return True
+        ttl = current_app.config.get('MENU_CACHE_TTL', 30)
+        return bool(ttl) and time.monotonic() - snapshot.built_at >= ttl
+
+    def get_snapshot(self):
+        """Return the current snapshot, rebuilding it if the menu changed or it expired"""
+        snapshot = self._snapshot
+        if not self._is_stale(snapshot):
+            return snapshot
+        if not self._build_lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            expired = self._snapshot
+            if not self._is_stale(expired):
+                return expired
+
+            version = self._version
+            # A snapshot outlives the request, so never build it from a lagging replica
+            with use_primary():
+                snapshot = MenuSnapshot(version, self._serialize())
+
+            changed_elsewhere = False
+            with self._lock:
+                # A write committed while we were building; keep the old version
+                # so the next request rebuilds from fresh data
+                if version == self._version:
+                    if expired is not None and expired.version == version and expired.etag != snapshot.etag:
+                        # Changed by another process: this build already has it
+                        self._version += 1
+                        snapshot.version = self._version
+                        changed_elsewhere = True
+                    self._snapshot = snapshot
+            if changed_elsewhere:
+                self._notify(snapshot.version, None)
+            return snapshot
+        finally:
+            self._build_lock.release()
+
+    @staticmethod
+    def _serialize():
+        dishes = Dish.query.filter_by(is_available=True).order_by(Dish.id).all()
+
+        payload = {
+            'success': True,
+            'dishes': [{
+                'id': d.id,
+                'name': d.name,
+                'description': d.description,
+                'price': float(d.price),
+                'image_url': d.image_url,
+                'is_vip_only': d.is_vip_only,
+                'avg_rating': float(d.avg_rating) if d.avg_rating else 0,
+                'chef_id': d.chef_id
+            } for d in dishes]
+        }
+        return current_app.json.dumps(payload).encode('utf-8')
+
+
+menu_cache = MenuCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_dish_writes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Dish):
+            session.info.setdefault('dish_changes', set()).add(obj.id)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_dish_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        if orm_execute_state.execution_options.get('dish_stats_only'):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is Dish:
+            orm_execute_state.session.info['dish_changes_unknown'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_menu_on_commit(session):
+    dish_ids = session.info.pop('dish_changes', None)
+    unknown = session.info.pop('dish_changes_unknown', False)
+    if dish_ids or unknown:
+        menu_cache.invalidate(None if unknown else dish_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dish_changes(session):
+    session.info.pop('dish_changes', None)
+    session.info.pop('dish_changes_unknown', None)
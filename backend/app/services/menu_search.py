@@ -0,0 +1,371 @@
+import heapq
+import threading
+import time
+from collections import Counter
+from bisect import bisect_left, bisect_right, insort
+from flask import current_app
+from app.models.dish import Dish
+from app.services.menu_cache import menu_cache
+from app.utils.database import use_primary
+from app.utils.text import tokenize
+
+# Per query term: how much each kind of match contributes to a dish's score
+_WEIGHTS = {
+    ('name', 'exact'): 3.0, ('name', 'prefix'): 2.0, ('name', 'typo'): 1.5,
+    ('description', 'exact'): 1.0, ('description', 'prefix'): 0.5, ('description', 'typo'): 0.5,
+}
+
+SORTS = ('relevance', 'price', '-price', 'rating')
+
+
+def _deletes(term):
+    """term with each single character removed (symmetric-delete typo lookup)"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class _MenuIndex:
+    """One immutable build of the search structures over a set of dish records
+
+    updated() derives the next build from this one, patching only what the
+    changed dishes touch; the structures it shares are never modified.
+    """
+
+    def __init__(self, dishes):
+        self.built_at = time.monotonic()
+        self.dishes = dishes
+        self.postings = {'name': {}, 'description': {}}
+        for dish_id, record in dishes.items():
+            for field, postings in self.postings.items():
+                for term in set(tokenize(record[field] or '')):
+                    postings.setdefault(term, set()).add(dish_id)
+        self.vocabulary = sorted(self.postings['name'].keys() | self.postings['description'].keys())
+        self.typos = {}
+        for term in self.vocabulary:
+            if len(term) >= 4:
+                for variant in _deletes(term) | {term}:
+                    self.typos.setdefault(variant, set()).add(term)
+
+        self.by_price = sorted((record['price'], dish_id) for dish_id, record in dishes.items())
+        self.by_rating = sorted((record['avg_rating'], dish_id) for dish_id, record in dishes.items())
+        self.chef_of = {dish_id: record['chef_id'] for dish_id, record in dishes.items()}
+        self.by_chef = {}
+        for dish_id, chef_id in self.chef_of.items():
+            self.by_chef.setdefault(chef_id, set()).add(dish_id)
+        self.vip_ids = frozenset(dish_id for dish_id, record in dishes.items() if record['is_vip_only'])
+        self._rank()
+
+    def _rank(self):
+        # dish id -> position in each order
+        self.ranks = {
+            'price': {dish_id: i for i, (_, dish_id) in enumerate(self.by_price)},
+            '-price': {dish_id: -i for i, (_, dish_id) in enumerate(self.by_price)},
+            'rating': {dish_id: -i for i, (_, dish_id) in enumerate(self.by_rating)},
+        }
+
+    def updated(self, changed, records):
+        """A new build with the dishes in changed replaced by records (absent = removed)
+
+        Postings, vocabulary and typo neighbourhoods are patched for the
+        terms of the old and new records only, copying just the sets that
+        change; the sorted price and rating lists are copied and patched by
+        bisection. Only the rank maps are recomputed in full.
+        """
+        index = object.__new__(_MenuIndex)
+        index.built_at = time.monotonic()
+        index.dishes = dict(self.dishes)
+        index.postings = {field: dict(postings) for field, postings in self.postings.items()}
+        index.by_price = list(self.by_price)
+        index.by_rating = list(self.by_rating)
+        index.chef_of = dict(self.chef_of)
+        index.by_chef = dict(self.by_chef)
+        vip_ids = set(self.vip_ids)
+        copied = set()
+        touched = set()
+
+        def postings_for(field, term):
+            if (field, term) not in copied:
+                copied.add((field, term))
+                index.postings[field][term] = set(index.postings[field].get(term, ()))
+            touched.add(term)
+            return index.postings[field][term]
+
+        def set_chef(chef_id, dish_id, add):
+            dish_ids = set(index.by_chef.get(chef_id, ()))
+            if add:
+                dish_ids.add(dish_id)
+            else:
+                dish_ids.discard(dish_id)
+            if dish_ids:
+                index.by_chef[chef_id] = dish_ids
+            else:
+                index.by_chef.pop(chef_id, None)
+
+        for dish_id in changed:
+            old = index.dishes.pop(dish_id, None)
+            if old is not None:
+                for field in index.postings:
+                    for term in set(tokenize(old[field] or '')):
+                        postings_for(field, term).discard(dish_id)
+                for pairs, key in ((index.by_price, 'price'), (index.by_rating, 'avg_rating')):
+                    del pairs[bisect_left(pairs, (old[key], dish_id))]
+                set_chef(index.chef_of.pop(dish_id), dish_id, add=False)
+                vip_ids.discard(dish_id)
+
+            record = records.get(dish_id)
+            if record is not None:
+                index.dishes[dish_id] = record
+                for field in index.postings:
+                    for term in set(tokenize(record[field] or '')):
+                        postings_for(field, term).add(dish_id)
+                for pairs, key in ((index.by_price, 'price'), (index.by_rating, 'avg_rating')):
+                    insort(pairs, (record[key], dish_id))
+                index.chef_of[dish_id] = record['chef_id']
+                set_chef(record['chef_id'], dish_id, add=True)
+                if record['is_vip_only']:
+                    vip_ids.add(dish_id)
+
+        for field, term in copied:
+            if not index.postings[field][term]:
+                del index.postings[field][term]
+        index.vip_ids = frozenset(vip_ids)
+
+        index.vocabulary = list(self.vocabulary)
+        index.typos = dict(self.typos)
+        for term in touched:
+            indexed = term in index.postings['name'] or term in index.postings['description']
+            position = bisect_left(index.vocabulary, term)
+            listed = position < len(index.vocabulary) and index.vocabulary[position] == term
+            if indexed == listed:
+                continue
+            if indexed:
+                index.vocabulary.insert(position, term)
+            else:
+                del index.vocabulary[position]
+            if len(term) >= 4:
+                for variant in _deletes(term) | {term}:
+                    terms = index.typos.get(variant, frozenset())
+                    terms = terms | {term} if indexed else terms - {term}
+                    if terms:
+                        index.typos[variant] = terms
+                    else:
+                        index.typos.pop(variant, None)
+
+        index._rank()
+        return index
+
+    def term_matches(self, token):
+        """(field, kind, dish ids) for every way token matches the index"""
+        matches = []
+        for field, postings in self.postings.items():
+            if token in postings:
+                matches.append((field, 'exact', postings[token]))
+
+        # Terms are [a-z0-9]+, and '{' sorts right after 'z'
+        start = bisect_left(self.vocabulary, token)
+        end = bisect_left(self.vocabulary, token + '{')
+        for term in self.vocabulary[start:end]:
+            if term != token:
+                for field, postings in self.postings.items():
+                    if term in postings:
+                        matches.append((field, 'prefix', postings[term]))
+
+        if len(token) >= 4:
+            candidates = set()
+            for variant in _deletes(token) | {token}:
+                candidates |= self.typos.get(variant, set())
+            candidates.discard(token)
+            for term in candidates:
+                for field, postings in self.postings.items():
+                    if term in postings:
+                        matches.append((field, 'typo', postings[term]))
+        return matches
+
+    def filter_range(self, candidates, sorted_pairs, field, low, high):
+        """Narrow candidates (None = all dishes) to low <= field <= high"""
+        if low is None and high is None:
+            return candidates
+        start = 0 if low is None else bisect_left(sorted_pairs, (low, -1))
+        end = len(sorted_pairs) if high is None else bisect_right(sorted_pairs, (high, float('inf')))
+        if candidates is not None and len(candidates) < end - start:
+            # Cheaper to check the few candidates than to materialize the range
+            return {
+                dish_id for dish_id in candidates
+                if (low is None or self.dishes[dish_id][field] >= low)
+                and (high is None or self.dishes[dish_id][field] <= high)
+            }
+        in_range = {dish_id for _, dish_id in sorted_pairs[start:end]}
+        return in_range if candidates is None else candidates & in_range
+
+
+class MenuSearchIndex:
+    """In-process search over available dishes.
+
+    Keeps inverted indexes over dish names and descriptions, a sorted
+    vocabulary for prefix matches, a one-deletion neighbourhood of every term
+    for typo matches (edit distance 1, terms of 4+ characters), and dishes
+    sorted by price and by rating for range filters.
+
+    Searches read the current build without locking. Committed Dish changes
+    only mark ids as pending; the next search re-reads just those dishes and
+    derives a new build from the current one, patching the postings, typo
+    neighbourhoods and sorted lists for those dishes alone, then swaps it
+    in while concurrent searches keep using the previous build. Every
+    MENU_CACHE_TTL seconds everything is re-read and rebuilt, to pick up
+    changes made by other worker processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._pending = set()
+        self._reload_all = True
+        self._index = None
+
+    def mark_changed(self, dish_ids=None):
+        with self._lock:
+            if dish_ids is None:
+                self._reload_all = True
+            else:
+                self._pending.update(dish_ids)
+
+    @staticmethod
+    def _record(dish):
+        return {
+            'id': dish.id,
+            'name': dish.name,
+            'description': dish.description,
+            'price': float(dish.price),
+            'image_url': dish.image_url,
+            'is_vip_only': bool(dish.is_vip_only),
+            'avg_rating': float(dish.avg_rating) if dish.avg_rating else 0,
+            'chef_id': dish.chef_id
+        }
+
+    def _is_stale(self, index):
+        if index is None or self._reload_all or self._pending:
+            return True
+        ttl = current_app.config.get('MENU_CACHE_TTL', 30)
+        return bool(ttl) and time.monotonic() - index.built_at >= ttl
+
+    def _current(self):
+        """Return the index to search, first rebuilding it if it is stale
+
+        Only one thread rebuilds at a time; the others keep searching the
+        previous build rather than waiting, unless there is none yet.
+        """
+        index = self._index
+        if not self._is_stale(index):
+            return index
+        if not self._build_lock.acquire(blocking=index is None):
+            return index
+        try:
+            index = self._index
+            if not self._is_stale(index):
+                return index
+            with self._lock:
+                expired = index is not None and not self._reload_all and not self._pending
+                reload_all = self._reload_all or index is None or expired
+                changed = self._pending
+                self._reload_all = False
+                self._pending = set()
+            try:
+                # The index outlives the request, so never load it from a lagging replica
+                with use_primary():
+                    if reload_all:
+                        index = _MenuIndex({
+                            dish.id: self._record(dish)
+                            for dish in Dish.query.filter_by(is_available=True).yield_per(500)
+                        })
+                    else:
+                        index = index.updated(changed, {
+                            dish.id: self._record(dish)
+                            for dish in Dish.query.filter(Dish.id.in_(changed), Dish.is_available.is_(True))
+                        })
+            except Exception:
+                self.mark_changed(None if reload_all else changed)
+                raise
+            self._index = index
+            return index
+        finally:
+            self._build_lock.release()
+
+    def search(self, query='', min_price=None, max_price=None, min_rating=None, max_rating=None,
+               vip_only=None, chef_id=None, sort='relevance', limit=20, offset=0):
+        """Return (page of dish dicts, total matches, {chef_id: count}).
+
+        Every query term must match the name or description exactly, as a
+        prefix or with one typo. Chef facet counts cover all other filters,
+        so they show what selecting another chef would return.
+        """
+        index = self._current()
+        dishes = index.dishes
+
+        # Intersect with set operations first; only the survivors get scored
+        term_matches = [index.term_matches(token) for token in dict.fromkeys(tokenize(query or ''))]
+        candidates = None
+        for matches in term_matches:
+            matched = set().union(*(ids for _, _, ids in matches))
+            candidates = matched if candidates is None else candidates & matched
+
+        candidates = index.filter_range(candidates, index.by_price, 'price', min_price, max_price)
+        candidates = index.filter_range(candidates, index.by_rating, 'avg_rating', min_rating, max_rating)
+        if candidates is None:
+            candidates = dishes.keys()
+        if vip_only is not None:
+            candidates = candidates & index.vip_ids if vip_only else candidates - index.vip_ids
+
+        facets = Counter(map(index.chef_of.__getitem__, candidates))
+        if chef_id is not None:
+            candidates = candidates & index.by_chef.get(chef_id, set())
+
+        needed = offset + limit
+        if sort != 'relevance' or not term_matches:
+            rank = index.ranks['rating' if sort == 'relevance' else sort]
+            ordered = heapq.nsmallest(needed, candidates, key=rank.__getitem__)
+        else:
+            ordered = []
+            rank = index.ranks['rating']
+            # Best score first, ties by rating; only the buckets that reach the page are sorted
+            for _, bucket in sorted(self._score_buckets(term_matches, candidates).items(), reverse=True):
+                ordered.extend(heapq.nsmallest(needed - len(ordered), bucket, key=rank.__getitem__))
+                if len(ordered) >= needed:
+                    break
+
+        page = [dict(dishes[dish_id]) for dish_id in ordered[offset:]]
+        return page, len(candidates), dict(facets)
+
+    @staticmethod
+    def _score_buckets(term_matches, candidates):
+        """Group candidates by relevance score; a dish takes its best match per term"""
+        if len(term_matches) == 1:
+            buckets = {}
+            unscored = set(candidates)
+            for weight, ids in sorted(((_WEIGHTS[(f, k)], ids) for f, k, ids in term_matches[0]), key=lambda m: -m[0]):
+                hit = unscored & ids
+                if hit:
+                    buckets.setdefault(weight, set()).update(hit)
+                    unscored -= hit
+            return buckets
+
+        scores = dict.fromkeys(candidates, 0.0)
+        for matches in term_matches:
+            unscored = set(candidates)
+            for weight, ids in sorted(((_WEIGHTS[(f, k)], ids) for f, k, ids in matches), key=lambda m: -m[0]):
+                hit = unscored & ids
+                for dish_id in hit:
+                    scores[dish_id] += weight
+                unscored -= hit
+                if not unscored:
+                    break
+        buckets = {}
+        for dish_id, score in scores.items():
+            buckets.setdefault(score, []).append(dish_id)
+        return buckets
+
+
+menu_search = MenuSearchIndex()
+
+
+@menu_cache.subscribe
+def _mark_search_changes(version, dish_ids):
+    menu_search.mark_changed(dish_ids)
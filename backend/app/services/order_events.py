@@ -0,0 +1,173 @@
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from flask import current_app
+
+# One order status change, delivered to the order's customer, chef and driver
+OrderEvent = namedtuple('OrderEvent', 'id order_id status customer_id chef_id delivery_person_id order_time timestamp')
+
+
+class StreamsExhausted(Exception):
+    """Raised when this process already serves its maximum number of open streams"""
+
+
+def _audience(event):
+    return {user_id for user_id in (event.customer_id, event.chef_id, event.delivery_person_id) if user_id is not None}
+
+
+class Subscription:
+    """One stream's view of the broker: a bounded queue of events for user_id.
+
+    A subscriber that falls more than ``maxsize`` events behind is marked
+    ``overflowed`` instead of blocking publishers; it should end the stream
+    and let the client resume from its last event id.
+    """
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.events = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within timeout seconds"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalOrderBroker:
+    """In-process fan-out of order events to the users they concern.
+
+    Subscribers are indexed by user id, so publishing costs one queue put per
+    connected stream of the order's customer, chef and driver. The last
+    ``history`` events are kept so a reconnecting client can resume from its
+    Last-Event-ID.
+
+    Only streams served by the same process see an event; with several
+    workers, a shared broker with the same publish/subscribe interface takes
+    its place (see ORDER_EVENTS_BACKEND).
+
+    Each open stream holds a web thread on sync workers, so at most
+    ``max_subscribers`` may be open at once; subscribe() refuses the rest.
+    """
+
+    def __init__(self, history=1000, subscriber_queue=100, max_subscribers=None):
+        self.subscriber_queue = subscriber_queue
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        self._last_id = 0
+        self._subscribers = {}
+        self._count = 0
+        self._listeners = []
+
+    def listen(self, callback):
+        """Call callback(event) for every published event, e.g. to keep a view current"""
+        self._listeners.append(callback)
+        return callback
+
+    def publish(self, order):
+        with self._lock:
+            self._last_id += 1
+            event = OrderEvent(
+                self._last_id, order.id, order.status, order.customer_id,
+                order.chef_id, order.delivery_person_id, order.order_time, time.time()
+            )
+            self._history.append(event)
+            targets = [sub for user_id in _audience(event) for sub in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.deliver(event)
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                current_app.logger.error(f"Error in order event listener: {str(e)}")
+        return event
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Return (subscription, missed events, complete).
+
+        complete is False when last_event_id is older than the retained
+        history, or from before this broker started, so the client has to
+        refetch its orders instead of replaying. Raises StreamsExhausted
+        when max_subscribers streams are already open.
+        """
+        subscription = Subscription(user_id, self.subscriber_queue)
+        with self._lock:
+            if self.max_subscribers is not None and self._count >= self.max_subscribers:
+                raise StreamsExhausted("Too many open order streams, poll /api/orders/history instead")
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+            if last_event_id is None:
+                return subscription, [], True
+            oldest = self._history[0].id if self._history else self._last_id + 1
+            complete = oldest <= last_event_id + 1 and last_event_id <= self._last_id
+            missed = [
+                event for event in self._history
+                if event.id > last_event_id and user_id in _audience(event)
+            ] if complete else []
+        return subscription, missed, complete
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'last_event_id': self._last_id,
+                'subscribers': self._count,
+                'max_subscribers': self.max_subscribers
+            }
+
+
+def stream_limit(config):
+    """Open order streams allowed per worker process
+
+    ORDER_STREAM_MAX_OPEN, by default a quarter of WEB_THREADS. Together with
+    the chat limit (half) that leaves request threads for everything else.
+    """
+    return config.get('ORDER_STREAM_MAX_OPEN') or max(1, config.get('WEB_THREADS', 4) // 4)
+
+
+def create_order_broker(config):
+    """Build the broker named by the ORDER_EVENTS_BACKEND setting"""
+    backend = config.get('ORDER_EVENTS_BACKEND', 'local')
+    if backend == 'local':
+        return LocalOrderBroker(
+            history=config.get('ORDER_EVENTS_HISTORY', 1000),
+            subscriber_queue=config.get('ORDER_EVENTS_QUEUE_SIZE', 100),
+            max_subscribers=stream_limit(config)
+        )
+    raise ValueError(f"Unknown order events backend: {backend}")
+
+
+def get_order_broker(app=None):
+    """Return the app's order event broker, creating it from config on first use"""
+    app = app or current_app._get_current_object()
+    broker = app.extensions.get('order_broker')
+    if broker is None:
+        broker = app.extensions.setdefault('order_broker', create_order_broker(app.config))
+    return broker
+
+
+def publish_order_event(order):
+    """Publish order's current status; a broker failure never fails the caller"""
+    try:
+        return get_order_broker().publish(order)
+    except Exception as e:
+        current_app.logger.error(f"Error publishing order event: {str(e)}")
+        return None
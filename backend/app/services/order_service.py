@@ -1,9 +1,23 @@
 from app import db
-from app.models.order import Order, OrderItem
+from app.models.order import Order, OrderItem, ORDER_TRANSITIONS, DELIVERY_ACTIVE_STATUSES
 from app.models.dish import Dish
 from app.models.user import User
 from app.services.finance_service import FinanceService
+from app.services.dish_stats import DishStatsService
+from app.services.order_events import publish_order_event
+from app.utils.pagination import encode_cursor, decode_cursor, clamp_limit
 from flask import current_app
+from sqlalchemy import select, update, case, func, tuple_
+from sqlalchemy.orm import selectinload, joinedload, aliased
+
+class OrderConflict(Exception):
+    """The order was no longer in the expected status when the update ran"""
+    
+    def __init__(self, order_id, current_status):
+        super().__init__(f"Order {order_id} is {current_status}")
+        self.order_id = order_id
+        self.current_status = current_status
+
 
 class OrderService:
     
@@ -11,7 +25,7 @@ class OrderService:
     def create_order(customer_id, cart_items):
         """Create a new order from cart items"""
         try:
-            customer = User.query.get(customer_id)
+            customer = db.session.get(User, customer_id)
             if not customer:
                 raise ValueError("Customer not found")
             
@@ -24,8 +38,20 @@ class OrderService:
             order = Order(customer_id=customer_id)
             subtotal = 0
             
+            # Price and flags are charged as the database has them now: one
+            # query for the whole cart, reading only the columns checkout needs
+            dish_ids = list(dict.fromkeys(item['dish_id'] for item in cart_items))
+            dishes = {
+                row.id: row for row in db.session.execute(
+                    select(Dish.id, Dish.name, Dish.price, Dish.is_available, Dish.is_vip_only, Dish.chef_id)
+                    .where(Dish.id.in_(dish_ids))
+                )
+            }
+            
+            # Validate in cart order so the first failing line reports the same error as before
+            quantities = {}
             for item in cart_items:
-                dish = Dish.query.get(item['dish_id'])
+                dish = dishes.get(item['dish_id'])
                 if not dish:
                     raise ValueError(f"Dish {item['dish_id']} not found")
                 
@@ -39,6 +65,11 @@ class OrderService:
                 if quantity <= 0:
                     raise ValueError("Quantity must be positive")
                 
+                quantities[dish.id] = quantities.get(dish.id, 0) + quantity
+            
+            # Duplicate cart lines for the same dish collapse into one order item
+            for dish_id, quantity in quantities.items():
+                dish = dishes[dish_id]
                 order_item = OrderItem(
                     order=order,
                     dish_id=dish.id,
@@ -51,6 +82,13 @@ class OrderService:
             
             order.subtotal = subtotal
             
+            # Route the ticket to the chef who cooks most of it; ties go to the first line's chef
+            chef_load = {}
+            for dish_id, quantity in quantities.items():
+                chef_id = dishes[dish_id].chef_id
+                chef_load[chef_id] = chef_load.get(chef_id, 0) + quantity
+            order.chef_id = max(chef_load, key=chef_load.get)
+            
             is_vip = customer.is_vip()
             order.calculate_total(is_vip, customer.order_count)
             
@@ -58,19 +96,18 @@ class OrderService:
             if not wallet.has_sufficient_funds(order.total):
                 raise ValueError("Insufficient funds. Please add money to your wallet.")
             
-            FinanceService.process_payment(customer_id, None, order.total, f"Order payment")
-            
+            # Debit, order, items, ledger row, customer and dish counters all land in one commit
             db.session.add(order)
-            db.session.commit()
+            db.session.flush()
             
-            if order.transaction:
-                order.transaction.order_id = order.id
-                db.session.commit()
+            FinanceService.process_payment(customer_id, order.id, order.total, "Order payment", commit=False)
+            DishStatsService.record_order(list(quantities))
             
-            customer.order_count += 1
-            customer.total_spent += order.total
+            customer.order_count = User.order_count + 1
+            customer.total_spent = User.total_spent + order.total
             db.session.commit()
             
+            publish_order_event(order)
             return order
             
         except Exception as e:
@@ -80,38 +117,201 @@ class OrderService:
     
     @staticmethod
     def get_order(order_id):
-        """Get order by ID"""
-        order = Order.query.get(order_id)
+        """Get order by ID with its items and dish names preloaded"""
+        order = Order.query.options(
+            selectinload(Order.items).joinedload(OrderItem.dish).load_only(Dish.name)
+        ).filter_by(id=order_id).first()
         if not order:
             raise ValueError("Order not found")
         return order
     
     @staticmethod
-    def get_customer_orders(customer_id, limit=50):
-        """Get customer's order history"""
-        orders = Order.query.filter_by(customer_id=customer_id)\
-            .order_by(Order.order_time.desc())\
-            .limit(limit)\
-            .all()
-        return orders
+    def get_customer_orders(customer_id, limit=50, cursor=None):
+        """Get one page of customer's order history
+        
+        Each row carries its item count from a GROUP BY, so a page is a single
+        query. Pages are keyed on (order_time, id); returns the rows and the
+        cursor for the next page, or None when there are no more rows.
+        """
+        limit = clamp_limit(limit)
+        
+        query = select(
+            Order.id,
+            Order.status,
+            Order.total,
+            Order.order_time,
+            func.count(OrderItem.id).label('items_count')
+        ).outerjoin(OrderItem, OrderItem.order_id == Order.id)\
+            .where(Order.customer_id == customer_id)\
+            .group_by(Order.id, Order.status, Order.total, Order.order_time)\
+            .order_by(Order.order_time.desc(), Order.id.desc())
+        
+        if cursor:
+            order_time, order_id = decode_cursor(cursor)
+            query = query.where(tuple_(Order.order_time, Order.id) < (order_time, order_id))
+        
+        rows = db.session.execute(query.limit(limit + 1)).all()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].order_time, rows[-1].id)
+        return rows, next_cursor
     
     @staticmethod
-    def update_order_status(order_id, new_status):
-        """Update order status"""
-        valid_statuses = [
-            'CREATED', 'IN_KITCHEN', 'READY_FOR_DELIVERY',
-            'ASSIGNED', 'OUT_FOR_DELIVERY', 'DELIVERED', 'CANCELLED'
-        ]
-        
-        if new_status not in valid_statuses:
+    def _sources(new_status, expected_status=None):
+        """Statuses an order may be in for the change to new_status to apply"""
+        if new_status not in ORDER_TRANSITIONS:
             raise ValueError(f"Invalid status: {new_status}")
+        if expected_status is None:
+            sources = [status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets]
+            if not sources:
+                raise ValueError(f"Orders can't be changed to {new_status}")
+            return sources
+        if new_status not in ORDER_TRANSITIONS.get(expected_status, ()):
+            raise ValueError(f"Cannot change order from {expected_status} to {new_status}")
+        return [expected_status]
+    
+    @staticmethod
+    def _compare_and_set(order_ids, sources, new_status, chef_id=None, condition=None, **values):
+        """UPDATE orders SET status=new WHERE id IN ids AND status IN sources
         
+        Returns the rows that were changed; ids missing from the result are
+        gone, lost a race or weren't in a status the change applies to (or
+        failed the extra condition).
+        """
+        status_matches = Order.status == sources[0] if len(sources) == 1 else Order.status.in_(sources)
+        query = update(Order).where(Order.id.in_(order_ids), status_matches)
+        if chef_id is not None:
+            query = query.where(Order.chef_id == chef_id)
+        if condition is not None:
+            query = query.where(condition)
+        return db.session.execute(
+            query
+            .values(status=new_status, **values)
+            .returning(
+                Order.id, Order.status, Order.customer_id, Order.chef_id,
+                Order.delivery_person_id, Order.order_time
+            )
+        ).all()
+    
+    @staticmethod
+    def update_order_status(order_id, new_status, expected_status=None, chef_id=None):
+        """Move an order to new_status if the transition table allows it
+        
+        The change is a single conditional UPDATE, so of two concurrent
+        callers only one wins and the other gets OrderConflict, as does a
+        change the order's current status doesn't allow. Pass expected_status
+        to also fail unless the order is still in the status the caller saw,
+        and chef_id to only touch that chef's orders.
+        """
+        sources = OrderService._sources(new_status, expected_status)
         try:
-            order = OrderService.get_order(order_id)
-            order.status = new_status
+            rows = OrderService._compare_and_set([order_id], sources, new_status, chef_id)
+            if not rows:
+                query = select(Order.status).where(Order.id == order_id)
+                if chef_id is not None:
+                    query = query.where(Order.chef_id == chef_id)
+                current_status = db.session.execute(query).scalar()
+                if current_status is None:
+                    raise ValueError("Order not found")
+                raise OrderConflict(order_id, current_status)
             db.session.commit()
-            return order
+            
+            # Only committed changes reach open /stream connections
+            publish_order_event(rows[0])
+            return rows[0]
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"Error updating order status: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    @staticmethod
+    def transition_orders(transitions):
+        """Apply many status changes in one transaction
+        
+        transitions is a list of {'order_id', 'status', 'expected_status'?}.
+        Orders making the same change share one conditional UPDATE, and only
+        the orders that didn't change are read back to explain why. Each
+        order succeeds or fails on its own; returns {order_id: result} where
+        result is 'updated', 'conflict', 'not_found' or an error message.
+        """
+        order_ids = [t['order_id'] for t in transitions]
+        if len(set(order_ids)) != len(order_ids):
+            raise ValueError("Each order may appear only once")
+        
+        results = {}
+        groups = {}
+        for t in transitions:
+            try:
+                sources = OrderService._sources(t['status'], t.get('expected_status'))
+            except ValueError as e:
+                results[t['order_id']] = str(e)
+                continue
+            groups.setdefault((tuple(sources), t['status']), []).append(t['order_id'])
+        
+        try:
+            changed = []
+            for (sources, new_status), ids in groups.items():
+                rows = OrderService._compare_and_set(ids, sources, new_status)
+                changed.extend(rows)
+                results.update((row.id, 'updated') for row in rows)
+            
+            unchanged = [order_id for order_id in order_ids if order_id not in results]
+            existing = set(db.session.execute(
+                select(Order.id).where(Order.id.in_(unchanged))
+            ).scalars()) if unchanged else set()
+            for order_id in unchanged:
+                results[order_id] = 'conflict' if order_id in existing else 'not_found'
+            db.session.commit()
+            
+            for row in changed:
+                publish_order_event(row)
+            return {order_id: results[order_id] for order_id in order_ids}
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error updating order statuses: {str(e)}")
+            raise
+    
+    @staticmethod
+    def assign_deliveries(assignments, max_active=None):
+        """Assign READY_FOR_DELIVERY orders to delivery people in one statement
+        
+        assignments maps order id -> delivery person id. Orders that left
+        READY_FOR_DELIVERY in the meantime are skipped; returns the rows
+        that were assigned. With max_active, a driver's orders are also
+        skipped if they would take the driver's active orders, as counted
+        by the database at update time, past max_active.
+        """
+        if not assignments:
+            return []
+        try:
+            driver = case(assignments, value=Order.id)
+            condition = None
+            if max_active is not None:
+                batch = {}
+                for driver_id in assignments.values():
+                    batch[driver_id] = batch.get(driver_id, 0) + 1
+                # Drivers the batch would take over the limit, counted once for the whole statement
+                active = aliased(Order)
+                over_capacity = select(active.delivery_person_id).where(
+                    active.delivery_person_id.in_(list(batch)),
+                    active.status.in_(DELIVERY_ACTIVE_STATUSES)
+                ).group_by(active.delivery_person_id).having(
+                    func.count(active.id) + case(batch, value=active.delivery_person_id) > max_active
+                )
+                condition = driver.not_in(over_capacity)
+            
+            rows = OrderService._compare_and_set(
+                list(assignments), ['READY_FOR_DELIVERY'], 'ASSIGNED',
+                condition=condition, delivery_person_id=driver
+            )
+            db.session.commit()
+            
+            for row in rows:
+                publish_order_event(row)
+            return rows
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error assigning deliveries: {str(e)}")
+            raise
@@ -0,0 +1,100 @@
+import math
+import re
+from app.services.vector_index import matches
+from app.utils.text import tokenize
+
+_PRICE_MAX_RE = re.compile(r"\b(?:under|below|less than|cheaper than|at most|up to)\s*\$?(\d+(?:\.\d+)?)")
+_PRICE_MIN_RE = re.compile(r"\b(?:over|above|more than|at least)\s*\$?(\d+(?:\.\d+)?)")
+
+
+def price_filter(user_query):
+    """Turn "under $15" / "over $20" in a question into a price filter"""
+    text = user_query.lower()
+    condition = {}
+    match = _PRICE_MAX_RE.search(text)
+    if match:
+        condition["$lte"] = float(match.group(1))
+    match = _PRICE_MIN_RE.search(text)
+    if match:
+        condition["$gte"] = float(match.group(1))
+    return {"price": condition} if condition else {}
+
+
+class LexicalIndex:
+    """Inverted index over dish names, scored by summed IDF of matched terms"""
+
+    def __init__(self):
+        # (postings, entries) swapped as one value so readers never see a half-built index
+        self._state = ({}, {})
+
+    def build(self, entries):
+        postings = {}
+        stored = {}
+        for doc_id, document, metadata in entries:
+            stored[doc_id] = (document, metadata)
+            for term in set(tokenize(metadata.get("name", ""))):
+                postings.setdefault(term, set()).add(doc_id)
+        self._state = (postings, stored)
+
+    def search(self, text, limit, where=None):
+        """Return up to limit (id, document, metadata), best match first"""
+        postings, stored = self._state
+        total = len(stored)
+        scores = {}
+        for term in set(tokenize(text)):
+            doc_ids = postings.get(term)
+            if not doc_ids:
+                continue
+            idf = math.log(1 + (total - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for doc_id in doc_ids:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf
+
+        results = []
+        for doc_id in sorted(scores, key=lambda d: (-scores[d], d)):
+            document, metadata = stored[doc_id]
+            if matches(metadata, where):
+                results.append((doc_id, document, metadata))
+                if len(results) >= limit:
+                    break
+        return results
+
+
+class HybridRetriever:
+    """Combines vector similarity with name matching by reciprocal-rank fusion.
+
+    Both retrievers see the same metadata filter, so excluded dishes never
+    take a context slot. Each contributes ``candidates * k`` results and a
+    document scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+
+    The name index is a snapshot of the vector index, which other processes
+    may have changed since; name matches are re-read from the vector index
+    and dropped if they are gone or no longer pass the filter.
+    """
+
+    def __init__(self, index, rrf_k=60, candidates=4):
+        self.index = index
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.lexical = LexicalIndex()
+
+    def refresh(self):
+        """Rebuild the lexical side from the current vector index contents"""
+        self.lexical.build(self.index.entries())
+
+    def retrieve(self, text, embedding, k=3, where=None):
+        limit = k * self.candidates
+        lexical = self.lexical.search(text, limit, where=where)
+        if lexical:
+            current = {entry[0]: entry for entry in self.index.get([doc_id for doc_id, _, _ in lexical], where=where)}
+            lexical = [current[doc_id] for doc_id, _, _ in lexical if doc_id in current]
+        ranked_lists = [self.index.query(embedding, k=limit, where=where), lexical]
+
+        scores = {}
+        found = {}
+        for results in ranked_lists:
+            for rank, (doc_id, document, metadata) in enumerate(results):
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+                found[doc_id] = (doc_id, document, metadata)
+
+        best = sorted(scores, key=lambda d: (-scores[d], d))[:k]
+        return [found[doc_id] for doc_id in best]
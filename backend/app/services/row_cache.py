@@ -0,0 +1,54 @@
+from flask import current_app
+from app import db
+from app.models.finance import Wallet
+from app.utils.cache import TTLCache
+
+
+class RowCache:
+    """Process-wide read-through cache for hot single-row lookups.
+
+    Holds the user -> wallet id mapping, which never changes once a wallet
+    exists. Live rows still come from the session, which is the per-request
+    identity map: once a wallet id is known, repeat lookups in the same
+    request are answered by ``db.session.get`` without SQL.
+
+    Nothing else is cached here. Checkout reads dish price and flags, and
+    routes read user type, from the database on every request, because other
+    worker processes may have just changed them. Entries expire after
+    ``ttl`` seconds; a ttl of 0 turns caching off.
+    """
+
+    def __init__(self, maxsize=4096, ttl=60.0):
+        self.wallet_ids = TTLCache(maxsize, ttl)
+
+    def get_wallet(self, user_id):
+        """Return the user's Wallet, going through the session identity map when possible"""
+        user_id = int(user_id)
+        wallet_id = self.wallet_ids.get(user_id)
+        if wallet_id is not None:
+            wallet = db.session.get(Wallet, wallet_id)
+            if wallet is not None:
+                return wallet
+            self.wallet_ids.pop(user_id)
+
+        wallet = Wallet.query.filter_by(user_id=user_id).first()
+        if wallet is not None:
+            self.wallet_ids.set(user_id, wallet.id)
+        return wallet
+
+    def stats(self):
+        return {
+            'wallet_ids': self.wallet_ids.stats()
+        }
+
+
+def get_row_cache(app=None):
+    """Return the app's row cache, creating it from config on first use"""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get('row_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('row_cache', RowCache(
+            maxsize=app.config.get('ROW_CACHE_SIZE', 4096),
+            ttl=app.config.get('ROW_CACHE_TTL', 60.0)
+        ))
+    return cache
@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+from collections import namedtuple
+import numpy as np
+
+_OPERATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+}
+
+
+def matches(metadata, where):
+    """Evaluate a Chroma-style metadata filter against one metadata dict.
+
+    Supports {"field": value} equality and {"field": {"$op": value}} with the
+    comparison operators above; all fields must match.
+    """
+    if not where:
+        return True
+    for field, condition in where.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            if not all(_OPERATORS[op](value, operand) for op, operand in condition.items()):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class ChromaIndex:
+    """Vector index backed by a persistent Chroma collection"""
+
+    def __init__(self, path, name="menu_items"):
+        import chromadb
+
+        self.client = chromadb.PersistentClient(path=path)
+        self.collection = self.client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def count(self):
+        return self.collection.count()
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def content_hashes(self, page_size=1000):
+        """Map each indexed document id to its stored content hash"""
+        hashes = {}
+        offset = 0
+        while True:
+            page = self.collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+                hashes[doc_id] = (metadata or {}).get("content_hash")
+            if len(page["ids"]) < page_size:
+                return hashes
+            offset += page_size
+
+    def entries(self, page_size=1000):
+        """Yield (id, document, metadata) for every indexed document"""
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            yield from zip(page["ids"], page["documents"], page["metadatas"])
+            if len(page["ids"]) < page_size:
+                return
+            offset += page_size
+
+    def get(self, ids, where=None):
+        """(id, document, metadata) for those of ids still indexed and matching where"""
+        if not ids:
+            return []
+        page = self.collection.get(ids=list(ids), where=self._chroma_where(where), include=["documents", "metadatas"])
+        return list(zip(page["ids"], page["documents"], page["metadatas"]))
+
+    @staticmethod
+    def _chroma_where(where):
+        """Translate a filter for matches() into Chroma's syntax
+
+        Chroma allows one operator per field expression, so a range such as
+        {"price": {"$gte": 5, "$lte": 15}} becomes one clause per operator.
+        """
+        if not where:
+            return None
+        clauses = []
+        for field, condition in where.items():
+            if isinstance(condition, dict):
+                clauses.extend({field: {op: operand}} for op, operand in condition.items())
+            else:
+                clauses.append({field: condition})
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+    def query(self, embedding, k=3, where=None):
+        """Return (id, document, metadata) for the k nearest documents matching where"""
+        k = min(k, self.count())
+        if k <= 0:
+            return []
+        results = self.collection.query(query_embeddings=[embedding], n_results=k, where=self._chroma_where(where))
+        return list(zip(results["ids"][0], results["documents"][0], results["metadatas"][0]))
+
+    def persist(self):
+        """Chroma writes through on every call"""
+
+
+# One consistent version of a LocalVectorIndex; masks caches filter results for it
+_IndexState = namedtuple('_IndexState', 'ids documents metadatas vectors positions masks')
+
+
+class LocalVectorIndex:
+    """In-process exact cosine index over a NumPy matrix.
+
+    Vectors are stored L2-normalized, one row per document, so a query is a
+    single matrix-vector product followed by a partial sort. When ``path`` is
+    set the index is saved there and reopened memory-mapped, so a restart
+    doesn't need to re-embed or even read the whole matrix into memory.
+
+    Writers are serialized and publish a new state (ids, documents,
+    metadata and matrix together) in one assignment, so queries never lock
+    and never see rows and ids out of step. New rows go into spare capacity
+    at the end of the matrix instead of copying it on every upsert.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._state = _IndexState([], [], [], None, {}, {})
+        # Private, writable matrix with spare rows; the state's vectors are a view of it
+        self._buffer = None
+        if path and os.path.exists(self._meta_file):
+            self._load()
+
+    @property
+    def _meta_file(self):
+        return os.path.join(self.path, "index.json")
+
+    @property
+    def _vectors_file(self):
+        return os.path.join(self.path, "vectors.npy")
+
+    @property
+    def vectors(self):
+        return self._state.vectors
+
+    def _load(self):
+        with open(self._meta_file) as f:
+            meta = json.load(f)
+        ids = meta["ids"]
+        vectors = np.load(self._vectors_file, mmap_mode="r") if ids else None
+        self._state = _IndexState(
+            ids, meta["documents"], meta["metadatas"], vectors, {doc_id: i for i, doc_id in enumerate(ids)}, {}
+        )
+        self._buffer = None
+
+    def count(self):
+        return len(self._state.ids)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, current, rows, dim):
+        """The writable buffer, holding current's rows and room for at least rows in total"""
+        buffer = self._buffer
+        if buffer is None or buffer.shape[0] < rows:
+            # Writes materialize a memory-mapped matrix into a private copy,
+            # with capacity doubling so appends stay amortized O(1) per row
+            capacity = max(rows, 2 * (buffer.shape[0] if buffer is not None else 0), 64)
+            buffer = np.empty((capacity, dim), np.float32)
+            if current is not None:
+                buffer[:len(current)] = current
+            self._buffer = buffer
+        return buffer
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        vectors = self._normalize(embeddings)
+        with self._write_lock:
+            state = self._state
+            all_ids = list(state.ids)
+            all_documents = list(state.documents)
+            all_metadatas = list(state.metadatas)
+            positions = dict(state.positions)
+
+            rows = []
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                position = positions.get(doc_id)
+                if position is None:
+                    position = positions[doc_id] = len(all_ids)
+                    all_ids.append(doc_id)
+                    all_documents.append(document)
+                    all_metadatas.append(metadata)
+                else:
+                    all_documents[position] = document
+                    all_metadatas[position] = metadata
+                rows.append(position)
+
+            matrix = self._reserve(state.vectors, len(all_ids), vectors.shape[1])
+            # Replaced rows are overwritten in place: a query running right now
+            # may score those documents against their old or new vector
+            matrix[rows] = vectors
+            self._state = _IndexState(all_ids, all_documents, all_metadatas, matrix[:len(all_ids)], positions, {})
+
+    def delete(self, ids):
+        with self._write_lock:
+            state = self._state
+            doomed = {state.positions[doc_id] for doc_id in ids if doc_id in state.positions}
+            if not doomed:
+                return
+            keep = [i for i in range(len(state.ids)) if i not in doomed]
+            kept_ids = [state.ids[i] for i in keep]
+            self._buffer = np.array(state.vectors[keep]) if keep else None
+            self._state = _IndexState(
+                kept_ids,
+                [state.documents[i] for i in keep],
+                [state.metadatas[i] for i in keep],
+                self._buffer,
+                {doc_id: i for i, doc_id in enumerate(kept_ids)},
+                {}
+            )
+
+    def content_hashes(self):
+        state = self._state
+        return {doc_id: metadata.get("content_hash") for doc_id, metadata in zip(state.ids, state.metadatas)}
+
+    def entries(self):
+        """Yield (id, document, metadata) for every indexed document"""
+        state = self._state
+        yield from zip(state.ids, state.documents, state.metadatas)
+
+    def get(self, ids, where=None):
+        """(id, document, metadata) for those of ids still indexed and matching where"""
+        state = self._state
+        found = []
+        for doc_id in ids:
+            position = state.positions.get(doc_id)
+            if position is not None and matches(state.metadatas[position], where):
+                found.append((doc_id, state.documents[position], state.metadatas[position]))
+        return found
+
+    @staticmethod
+    def _mask(state, where):
+        """Boolean row mask for a metadata filter, cached with the state it was computed for"""
+        key = json.dumps(where, sort_keys=True)
+        mask = state.masks.get(key)
+        if mask is None:
+            mask = np.fromiter((matches(m, where) for m in state.metadatas), dtype=bool, count=len(state.metadatas))
+            if len(state.masks) >= 64:
+                state.masks.clear()
+            state.masks[key] = mask
+        return mask
+
+    def query(self, embedding, k=3, where=None):
+        """Return (id, document, metadata) for the k nearest documents matching where"""
+        state = self._state
+        if state.vectors is None or k <= 0:
+            return []
+        scores = state.vectors @ self._normalize(embedding)
+        if where:
+            scores = np.where(self._mask(state, where), scores, -np.inf)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(state.ids[i], state.documents[i], state.metadatas[i]) for i in top if scores[i] != -np.inf]
+
+    def persist(self):
+        """Write the index to disk and reopen the matrix memory-mapped"""
+        if not self.path:
+            return
+        with self._write_lock:
+            state = self._state
+            os.makedirs(self.path, exist_ok=True)
+
+            if state.vectors is not None:
+                tmp_vectors = self._vectors_file + ".tmp.npy"
+                np.save(tmp_vectors, np.asarray(state.vectors))
+                os.replace(tmp_vectors, self._vectors_file)
+
+            tmp_meta = self._meta_file + ".tmp"
+            with open(tmp_meta, "w") as f:
+                json.dump({"ids": state.ids, "documents": state.documents, "metadatas": state.metadatas}, f)
+            os.replace(tmp_meta, self._meta_file)
+
+            if state.vectors is not None:
+                self._state = state._replace(vectors=np.load(self._vectors_file, mmap_mode="r"))
+                self._buffer = None
+
+
+def create_vector_index(config):
+    """Build the index named by the RETRIEVAL_BACKEND setting"""
+    backend = config.get('RETRIEVAL_BACKEND', 'chroma')
+    if backend == 'chroma':
+        return ChromaIndex(config.get('CHROMA_PATH', './instance/knowledge_base'))
+    if backend == 'local':
+        return LocalVectorIndex(config.get('LOCAL_INDEX_PATH') or None)
+    raise ValueError(f"Unknown retrieval backend: {backend}")
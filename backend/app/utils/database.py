@@ -0,0 +1,260 @@
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request, current_app, has_app_context, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, Select
+from sqlalchemy.engine import make_url
+from app.utils.cache import TTLCache
+
+
+# Threads outside the request and chat pools that use the database:
+# knowledge-base sync/warm-up and the delivery scheduler
+BACKGROUND_THREADS = 2
+
+
+def _pool_size(config):
+    """Connections per worker process, trimmed to the server's budget.
+
+    By default each process keeps one connection for every thread that can
+    hold one at the same time: WEB_THREADS request threads,
+    CHAT_MAX_CONCURRENCY chat workers and the background threads, with
+    SQLAlchemy's default overflow on top. When DB_MAX_CONNECTIONS is set,
+    WEB_CONCURRENCY processes must fit in it together, so pools shrink
+    rather than exhaust the server.
+    """
+    pool_size = config.get('DB_POOL_SIZE') or (
+        config.get('WEB_THREADS', 4) + config.get('CHAT_MAX_CONCURRENCY', 4) + BACKGROUND_THREADS
+    )
+    max_overflow = config.get('DB_MAX_OVERFLOW', 10)
+    budget = config.get('DB_MAX_CONNECTIONS')
+    if budget:
+        per_worker = max(1, budget // max(1, config.get('WEB_CONCURRENCY', 1)))
+        pool_size = min(pool_size, per_worker)
+        max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+    return pool_size, max_overflow
+
+
+def build_engine_options(config, url):
+    """SQLALCHEMY_ENGINE_OPTIONS for the database at url, from the DB_* settings"""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        # SQLite pools are chosen by Flask-SQLAlchemy; sizing doesn't apply
+        return {}
+
+    pool_size, max_overflow = _pool_size(config)
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)
+    }
+    if config.get('DB_ISOLATION_LEVEL'):
+        options['isolation_level'] = config['DB_ISOLATION_LEVEL']
+
+    if url.get_backend_name() == 'postgresql':
+        connect_args = {}
+        timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+        if config.get('DB_PGBOUNCER'):
+            # Transaction poolers hand each transaction a different server
+            # connection: startup options are rejected and prepared statements
+            # would land on the wrong backend. The timeout is applied per
+            # transaction instead (see init_database)
+            if url.get_driver_name() == 'psycopg':
+                connect_args['prepare_threshold'] = None
+        elif timeout:
+            connect_args['options'] = f'-c statement_timeout={int(timeout)}'
+        if connect_args:
+            options['connect_args'] = connect_args
+    return options
+
+
+def configure_database(app):
+    """Fill in engine options and the replica bind before db.init_app"""
+    config = app.config
+    if config.get('SQLALCHEMY_ENGINE_OPTIONS') is None:
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = build_engine_options(config, config['SQLALCHEMY_DATABASE_URI'])
+
+    replica_url = config.get('DATABASE_REPLICA_URL')
+    if replica_url and 'replica' not in (config.get('SQLALCHEMY_BINDS') or {}):
+        config['SQLALCHEMY_BINDS'] = {
+            **(config.get('SQLALCHEMY_BINDS') or {}),
+            'replica': {'url': replica_url, **build_engine_options(config, replica_url)}
+        }
+
+
+def init_database(app, db):
+    """Install statement timeouts and, with a replica bind, the lag monitor"""
+    default_timeout = app.config.get('DB_STATEMENT_TIMEOUT_MS') if app.config.get('DB_PGBOUNCER') else None
+
+    def apply_statement_timeout(conn):
+        # A route's statement_timeout() wins; behind pgbouncer the default is
+        # also applied here because it can't be set at connect time
+        timeout = g.get('statement_timeout_ms') if has_app_context() else None
+        timeout = timeout or default_timeout
+        if timeout:
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'postgresql':
+                event.listen(engine, 'begin', apply_statement_timeout)
+
+        replica = db.engines.get('replica')
+        if replica is not None:
+            app.extensions['replica_monitor'] = ReplicaMonitor(
+                replica,
+                max_lag=app.config.get('DB_REPLICA_MAX_LAG_SECONDS', 5.0),
+                interval=app.config.get('DB_REPLICA_LAG_CHECK_SECONDS', 1.0)
+            )
+            app.extensions['replica_recent_writers'] = TTLCache(
+                maxsize=100_000, ttl=app.config.get('DB_REPLICA_STICKY_SECONDS', 5.0)
+            )
+            app.after_request(_send_last_write)
+
+
+# Read-your-writes across worker processes: the client carries the time of
+# its last write back to whichever worker serves its next read
+LAST_WRITE_COOKIE = 'db_last_write'
+LAST_WRITE_HEADER = 'X-DB-Last-Write'
+
+
+def _send_last_write(response):
+    last_write = g.get('db_last_write')
+    if last_write is not None:
+        value = f'{last_write:.3f}'
+        response.set_cookie(
+            LAST_WRITE_COOKIE, value, httponly=True, samesite='Lax',
+            max_age=int(current_app.config.get('DB_REPLICA_STICKY_SECONDS', 5.0)) + 1
+        )
+        response.headers[LAST_WRITE_HEADER] = value
+    return response
+
+
+def _wrote_recently():
+    """Whether the client reports a write of its own within DB_REPLICA_STICKY_SECONDS"""
+    value = request.cookies.get(LAST_WRITE_COOKIE) or request.headers.get(LAST_WRITE_HEADER)
+    try:
+        last_write = float(value)
+    except (TypeError, ValueError):
+        return False
+    return time.time() - last_write < current_app.config.get('DB_REPLICA_STICKY_SECONDS', 5.0)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the 'replica' bind inside @read_only routes.
+
+    Flushes and explicit INSERT/UPDATE/DELETE statements always go to the
+    primary; only SELECTs issued while ``g.db_use_replica`` is set are routed.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('db_use_replica'):
+            replica = self._db.engines.get('replica')
+            if replica is not None and (clause is None or isinstance(clause, Select)):
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def use_primary():
+    """Run the enclosed queries on the primary even inside a @read_only route"""
+    previous = g.get('db_use_replica')
+    g.db_use_replica = False
+    try:
+        yield
+    finally:
+        g.db_use_replica = previous
+
+
+class ReplicaMonitor:
+    """Tracks replication lag, re-measuring at most every ``interval`` seconds.
+
+    The replica is only used while lag is within ``max_lag``; a failed
+    measurement counts as unbounded lag, so reads fall back to the primary.
+    """
+
+    def __init__(self, engine, max_lag=5.0, interval=1.0):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._lag = 0.0
+        self._checked_at = None
+
+    def measure(self):
+        if self.engine.dialect.name != 'postgresql':
+            return 0.0
+        with self.engine.connect() as conn:
+            # NULL when the server isn't replaying WAL, i.e. nothing to lag behind
+            lag = conn.exec_driver_sql(
+                "SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+            ).scalar()
+        return max(0.0, float(lag or 0.0))
+
+    def lag(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.interval:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at >= self.interval:
+                    try:
+                        self._lag = self.measure()
+                    except Exception as e:
+                        current_app.logger.error(f"Error measuring replica lag: {str(e)}")
+                        self._lag = float('inf')
+                    self._checked_at = now
+        return self._lag
+
+    def healthy(self):
+        return self.lag() <= self.max_lag
+
+
+def _current_user_id():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        return None
+
+
+def should_use_replica():
+    """Whether the current request's reads can go to the replica"""
+    monitor = current_app.extensions.get('replica_monitor')
+    if monitor is None:
+        return False
+    # Read-your-writes: a client that just wrote keeps reading the primary,
+    # whether it reports the write itself or this process served it
+    if has_request_context() and _wrote_recently():
+        return False
+    user_id = _current_user_id()
+    if user_id is not None and current_app.extensions['replica_recent_writers'].get(str(user_id)):
+        return False
+    return monitor.healthy()
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_flush_writes(session, flush_context):
+    session.info['has_writes'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['has_writes'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _remember_writer(session):
+    if not session.info.pop('has_writes', False) or not has_request_context():
+        return
+    g.db_last_write = time.time()
+    writers = current_app.extensions.get('replica_recent_writers')
+    user_id = _current_user_id()
+    if writers is not None and user_id is not None:
+        writers.set(str(user_id), True)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_writes(session):
+    session.info.pop('has_writes', None)
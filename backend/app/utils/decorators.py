@@ -0,0 +1,57 @@
+from functools import wraps
+from flask import g, current_app
+from app.utils.database import should_use_replica
+
+
+def statement_timeout(ms):
+    """Cap each SQL statement the decorated route runs at ms milliseconds (Postgres only)
+
+    ms may also name a config key holding the limit; when that is unset the
+    DB_STATEMENT_TIMEOUT_MS default applies. The limit lasts for the rest of
+    the request, so it also covers a body streamed after the route returns.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            g.statement_timeout_ms = current_app.config.get(ms) if isinstance(ms, str) else ms
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def read_only(fn):
+    """Serve the decorated route's reads from the replica when it is safe to.
+    
+    Falls back to the primary when no replica is configured, when replication
+    lag is over DB_REPLICA_MAX_LAG_SECONDS, or when the caller wrote within
+    the last DB_REPLICA_STICKY_SECONDS. Place it below @jwt_required() so the
+    caller is known.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = g.get('db_use_replica')
+        g.db_use_replica = should_use_replica()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            g.db_use_replica = previous
+    return wrapper
+
+
+def read_only_stream(iterable):
+    """Keep a @read_only route's routing for the body it streams.
+
+    A streamed body is generated after the route has returned and read_only
+    has restored the previous routing, so its queries would otherwise go to
+    the primary. Wrap the iterable before stream_with_context.
+    """
+    use_replica = g.get('db_use_replica')
+
+    def generate():
+        previous = g.get('db_use_replica')
+        g.db_use_replica = use_replica
+        try:
+            yield from iterable
+        finally:
+            g.db_use_replica = previous
+    return generate()
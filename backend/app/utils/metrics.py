@@ -0,0 +1,219 @@
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, request, g, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), total, n) for labels, (counts, total, n) in self._series.items()}
+        for labels, (counts, total, n) in sorted(series.items()):
+            label_text = _labels(self.label_names, labels)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(_sample(f"{self.name}_bucket", f'{prefix}le="{bound}"', cumulative))
+            lines.append(_sample(f"{self.name}_bucket", f'{prefix}le="+Inf"', n))
+            lines.append(_sample(f"{self.name}_sum", label_text, total))
+            lines.append(_sample(f"{self.name}_count", label_text, n))
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(_sample(self.name, _labels(self.label_names, labels), value))
+        return lines
+
+
+def _labels(names, values):
+    return ",".join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+def _sample(name, label_text, value):
+    return f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+
+
+class Metrics:
+    """Process-wide request, SQL, commit and external-call metrics.
+
+    Each observation is a perf_counter read plus a short locked update, so
+    the collector is cheap enough to leave on. SQL text is only kept when
+    the slow-request log is enabled.
+    """
+
+    def __init__(self):
+        self.request_latency = Histogram(
+            'truebite_http_request_duration_seconds', 'Time from request start to response headers',
+            ('method', 'endpoint', 'status')
+        )
+        self.request_sql_count = Histogram(
+            'truebite_http_request_sql_statements', 'SQL statements executed per request',
+            ('method', 'endpoint'), buckets=COUNT_BUCKETS
+        )
+        self.request_sql_time = Histogram(
+            'truebite_http_request_sql_seconds', 'Time spent executing SQL per request',
+            ('method', 'endpoint')
+        )
+        self.sql_statements = Counter('truebite_sql_statements_total', 'SQL statements executed')
+        self.sql_seconds = Counter('truebite_sql_seconds_total', 'Time spent executing SQL')
+        self.commit_latency = Histogram('truebite_db_commit_duration_seconds', 'Session commit time, including the final flush', ())
+        self.external_latency = Histogram(
+            'truebite_external_call_duration_seconds', 'Time spent in calls to external services',
+            ('service', 'operation', 'outcome')
+        )
+
+    def render(self):
+        lines = []
+        for metric in (
+            self.request_latency, self.request_sql_count, self.request_sql_time,
+            self.sql_statements, self.sql_seconds, self.commit_latency, self.external_latency
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    @contextmanager
+    def time_external(self, service, operation):
+        """Record how long the wrapped external call took and whether it raised"""
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            self.external_latency.observe((service, operation, outcome), time.perf_counter() - start)
+
+
+metrics = Metrics()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    metrics.sql_statements.inc()
+    metrics.sql_seconds.inc(amount=elapsed)
+
+    # Attribute the statement to the request being served on this thread
+    if has_app_context() and 'metrics_sql_count' in g:
+        g.metrics_sql_count += 1
+        g.metrics_sql_time += elapsed
+        if g.metrics_sql_log is not None:
+            g.metrics_sql_log.append((elapsed, statement))
+
+
+@event.listens_for(Session, 'before_commit')
+def _before_commit(session):
+    session.info['metrics_commit_start'] = time.perf_counter()
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    start = session.info.pop('metrics_commit_start', None)
+    if start is not None:
+        metrics.commit_latency.observe((), time.perf_counter() - start)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_commit_timer(session):
+    session.info.pop('metrics_commit_start', None)
+
+
+def init_metrics(app):
+    """Instrument every request on app and serve the results at /metrics"""
+    slow_threshold = app.config.get('SLOW_REQUEST_MS')
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_time = 0.0
+        g.metrics_sql_log = [] if slow_threshold else None
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        # Route templates, not raw paths, keep the label set bounded
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.request_latency.observe((request.method, endpoint, str(response.status_code)), elapsed)
+        metrics.request_sql_count.observe((request.method, endpoint), g.metrics_sql_count)
+        metrics.request_sql_time.observe((request.method, endpoint), g.metrics_sql_time)
+
+        if slow_threshold and elapsed * 1000 >= slow_threshold:
+            statements = "".join(
+                f"\n  [{duration * 1000:.1f} ms] {' '.join(statement.split())}"
+                for duration, statement in g.metrics_sql_log
+            )
+            current_app.logger.warning(
+                f"Slow request {request.method} {request.path} -> {response.status_code}: "
+                f"{elapsed * 1000:.1f} ms, {g.metrics_sql_count} SQL statements "
+                f"in {g.metrics_sql_time * 1000:.1f} ms{statements}"
+            )
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        if app.config.get('METRICS_LOCAL_ONLY', True) and request.remote_addr not in ('127.0.0.1', '::1'):
+            return {'success': False, 'error': 'Not found'}, 404
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
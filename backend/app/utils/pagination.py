@@ -0,0 +1,25 @@
+import base64
+from datetime import datetime
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) keyset position as an opaque URL-safe token"""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a token from encode_cursor back into (timestamp, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, row_id = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def clamp_limit(limit, default=50, maximum=200):
+    """Keep a client-supplied page size within sane bounds"""
+    if not limit or limit <= 0:
+        return default
+    return min(limit, maximum)
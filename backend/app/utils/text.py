@@ -0,0 +1,8 @@
+import re
+
+_token_re = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Lower-cased alphanumeric terms, shared by menu search and chat retrieval"""
+    return _token_re.findall(text.lower())
@@ -0,0 +1,14 @@
+"""Assign every READY_FOR_DELIVERY order that has a free driver, once.
+
+For deployments that run the delivery scheduler from cron instead of
+setting DELIVERY_SCHEDULER_INTERVAL on a worker.
+"""
+from app import create_app
+from app.services.delivery_scheduler import get_delivery_scheduler
+
+app = create_app()
+
+with app.app_context():
+    result = get_delivery_scheduler().run_once()
+    print(f"Assigned {result['assigned']} of {result['orders']} ready order(s) "
+          f"across {result['drivers']} available driver(s).")
@@ -0,0 +1,99 @@
+"""Chat latency and worker utilization under mixed load, fully offline.
+
+A fixed pool of threads stands in for the WSGI workers. Each round sends a
+burst of slow chat requests mixed with menu reads and reports:
+
+- time to first byte for /api/chat/stream versus /api/chat/ask
+- menu latency while chats are in flight
+- how many chats were shed with 503
+- the share of worker time spent on chat
+
+Run from backend/: python -m benchmarks.bench_chat_load [workers] [chats] [menu_reads]
+"""
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import db
+from app.models import User, Dish
+from app.services.llm import ChatService
+from benchmarks.common import BenchConfig, make_app, percentile
+from benchmarks.fakes import FakeChatModel
+
+
+class ChatBenchConfig(BenchConfig):
+    GOOGLE_API_KEY = 'offline'
+    EMBEDDING_BACKEND = 'fake'
+    # In-memory index so benchmark runs never touch instance/
+    RETRIEVAL_BACKEND = 'local'
+    LOCAL_INDEX_PATH = ''
+    CHAT_MAX_CONCURRENCY = 4
+    CHAT_MAX_QUEUE = 4
+    # Every question is distinct, so caching doesn't hide the model latency
+    CHAT_ANSWER_CACHE_SIZE = 1
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    menu_reads = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    app = make_app(ChatBenchConfig)
+    # The thread pool stands in for the web threads chats must leave room on
+    app.config['WEB_THREADS'] = workers
+    with app.app_context():
+        chef = User(email='chef@bench', name='Chef', user_type='chef', password_hash='x')
+        db.session.add(chef)
+        db.session.flush()
+        db.session.add_all([
+            Dish(chef_id=chef.id, name=f'Dish {i}', description='Bench dish', price=10 + i % 20)
+            for i in range(50)
+        ])
+        db.session.commit()
+        service = ChatService.get_instance()
+        service.model = FakeChatModel()
+        service.sync_knowledge_base()
+
+    client = app.test_client()
+    busy = {'chat': 0.0, 'menu': 0.0}
+
+    def chat(path, i):
+        start = time.perf_counter()
+        response = client.post(path, json={'message': f'question {i}'}, buffered=False)
+        ttfb = None
+        for _ in response.response:
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+        response.close()
+        busy['chat'] += time.perf_counter() - start
+        return response.status_code, ttfb
+
+    def menu(_):
+        start = time.perf_counter()
+        client.get('/api/menu/dishes')
+        elapsed = time.perf_counter() - start
+        busy['menu'] += elapsed
+        return elapsed
+
+    for path in ('/api/chat/ask', '/api/chat/stream'):
+        busy['chat'] = busy['menu'] = 0.0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            start = time.perf_counter()
+            chat_futures = [pool.submit(chat, path, i) for i in range(chats)]
+            menu_futures = [pool.submit(menu, i) for i in range(menu_reads)]
+            results = [f.result() for f in chat_futures]
+            menu_latency = [f.result() for f in menu_futures]
+            wall = time.perf_counter() - start
+
+        served = [ttfb for status, ttfb in results if status == 200 and ttfb is not None]
+        shed = sum(1 for status, _ in results if status == 503)
+        capacity = wall * workers
+        print(f"{path}: workers={workers} chats={chats} menu_reads={menu_reads}")
+        print(f"  chat ttfb p50={percentile(served, 50) * 1000:.0f}ms p99={percentile(served, 99) * 1000:.0f}ms "
+              f"served={len(served)} shed_503={shed}")
+        print(f"  menu p50={statistics.median(menu_latency) * 1000:.2f}ms p99={percentile(menu_latency, 99) * 1000:.2f}ms")
+        print(f"  worker time on chat={busy['chat'] / capacity:.0%} on menu={busy['menu'] / capacity:.0%} wall={wall:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Query count and wall time of OrderService.create_order by cart size.
+
+Selects should stay flat as the cart grows; the remaining per-line statements
+are the order_items INSERTs.
+
+Run from backend/: python -m benchmarks.bench_create_order
+"""
+import time
+from app import db
+from app.models import User, Wallet, Dish
+from app.services.order_service import OrderService
+from benchmarks.common import make_app, QueryCounter
+
+CART_SIZES = [1, 10, 100]
+REPEAT = 20
+
+
+def seed(dish_count):
+    chef = User(email='chef@bench', name='Chef', user_type='chef', password_hash='x')
+    customer = User(email='customer@bench', name='Customer', user_type='customer',
+                    password_hash='x', order_count=0, total_spent=0)
+    db.session.add_all([chef, customer])
+    db.session.flush()
+    db.session.add(Wallet(user_id=customer.id, balance=10_000_000))
+    db.session.add_all([
+        Dish(chef_id=chef.id, name=f'Dish {i}', description='Bench dish', price=10)
+        for i in range(dish_count)
+    ])
+    db.session.commit()
+    return customer.id, [d.id for d in Dish.query.all()]
+
+
+def main():
+    app = make_app()
+    with app.app_context():
+        customer_id, dish_ids = seed(max(CART_SIZES))
+
+        print(f"{'lines':>6} {'selects':>8} {'queries':>8} {'ms/order':>10}")
+        for size in CART_SIZES:
+            cart = [{'dish_id': dish_id, 'quantity': 1} for dish_id in dish_ids[:size]]
+
+            with QueryCounter(db.engine) as counter:
+                OrderService.create_order(customer_id, cart)
+            selects, queries = counter.selects, counter.count
+
+            start = time.perf_counter()
+            for _ in range(REPEAT):
+                OrderService.create_order(customer_id, cart)
+            elapsed = (time.perf_counter() - start) / REPEAT
+
+            print(f"{size:>6} {selects:>8} {queries:>8} {elapsed * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""Delivery scheduler batch time: 1k ready orders x 200 delivery people.
+
+Every run restores the same batch of READY_FOR_DELIVERY orders, then times
+one DeliveryScheduler.run_once per solver, split into loading the inputs,
+solving the assignment and committing it. A few drivers already carry
+orders, so load and kitchen affinity both shape the result. The whole run
+should fit comfortably inside a scheduler tick (DELIVERY_SCHEDULER_INTERVAL).
+
+Run from backend/: python -m benchmarks.bench_delivery_assign [--orders N] [--drivers N] [--runs N]
+"""
+import argparse
+import random
+import statistics
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import update
+from app import db
+from app.models import User, Order
+from app.services.delivery_scheduler import DeliveryScheduler, SOLVERS
+from benchmarks.common import BenchConfig, make_app, QueryCounter
+from benchmarks.seed import seed_database
+
+
+class DeliveryBenchConfig(BenchConfig):
+    CHAT_WARMUP = 'off'
+
+
+def seed_ready_orders(orders, drivers, seed=42):
+    """Seed enough users for the requested drivers, then the order batch; returns its ids"""
+    rng = random.Random(seed)
+    # seed_database makes 2% of users delivery staff
+    ids = seed_database(users=drivers * 50, dishes=200, orders=0, transactions=0, seed=seed)
+    chef_ids = [u.id for u in User.query.filter_by(user_type='chef').all()]
+    driver_ids = [u.id for u in User.query.filter_by(user_type='delivery').all()]
+    now = datetime.utcnow()
+
+    def row(order_id, status, driver_id=None):
+        subtotal = Decimal(rng.randint(1000, 6000)) / 100
+        return {
+            'id': order_id, 'customer_id': rng.choice(ids['customer_ids']), 'chef_id': rng.choice(chef_ids),
+            'delivery_person_id': driver_id, 'status': status, 'subtotal': subtotal,
+            'discount_amount': Decimal('0.00'), 'delivery_fee': Decimal('5.00'), 'total': subtotal + 5,
+            'order_time': now - timedelta(seconds=rng.randint(60, 3600))
+        }
+
+    ready = [row(i + 1, 'READY_FOR_DELIVERY') for i in range(orders)]
+    # A quarter of the drivers are already out with one or two orders
+    active = [
+        row(orders + i + 1, 'OUT_FOR_DELIVERY', driver_id)
+        for i, driver_id in enumerate(rng.sample(driver_ids, k=len(driver_ids) // 4) * 2)
+        if i < len(driver_ids) // 4 or rng.random() < 0.5
+    ]
+    db.session.execute(Order.__table__.insert(), ready + active)
+    db.session.commit()
+    return [r['id'] for r in ready], len(driver_ids)
+
+
+def reset(order_ids):
+    db.session.execute(
+        update(Order.__table__)
+        .where(Order.__table__.c.id.in_(order_ids))
+        .values(status='READY_FOR_DELIVERY', delivery_person_id=None)
+    )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--drivers', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app = make_app(DeliveryBenchConfig)
+    app.logger.disabled = True
+    with app.app_context():
+        order_ids, drivers = seed_ready_orders(args.orders, args.drivers)
+        print(f"{args.orders} ready orders, {drivers} delivery people")
+        print(f"{'solver':<10} {'assigned':>8} {'queries':>8} {'load ms':>9} {'solve ms':>9} {'commit ms':>10} {'total ms':>9}")
+
+        for solver in SOLVERS:
+            scheduler = DeliveryScheduler(solver=solver)
+            results = []
+            for _ in range(args.runs):
+                reset(order_ids)
+                with QueryCounter(db.engine) as counter:
+                    results.append(scheduler.run_once())
+
+            def median(key):
+                return statistics.median(result[key] for result in results)
+
+            total = median('load_ms') + median('solve_ms') + median('commit_ms')
+            print(f"{solver:<10} {results[-1]['assigned']:>8} {counter.count:>8} {median('load_ms'):>9.1f} "
+                  f"{median('solve_ms'):>9.1f} {median('commit_ms'):>10.1f} {total:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Offline throughput of the knowledge-base embedding pipeline.
+
+Uses FakeEmbedder with a simulated per-request latency in place of the remote
+model, so the numbers show what batching and concurrency buy without quota.
+
+Run from backend/: python -m benchmarks.bench_embedding_pipeline [docs] [latency_ms]
+"""
+import sys
+import time
+from app.services.embeddings import EmbeddingPipeline, FakeEmbedder
+
+CONFIGS = [
+    # (batch_size, concurrency)
+    (1, 1),
+    (25, 1),
+    (100, 1),
+    (100, 4),
+    (100, 8),
+]
+
+
+def documents(count):
+    for i in range(count):
+        yield str(i), f"Dish: Bench dish {i}. Price: ${10 + i % 30}. Description: A dish.", {"id": i}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+
+    embedder = FakeEmbedder(latency=latency)
+    print(f"docs={count} simulated latency={latency * 1000:.0f}ms/request")
+    print(f"{'batch':>6} {'workers':>8} {'seconds':>8} {'docs/sec':>10}")
+
+    for batch_size, concurrency in CONFIGS:
+        # Sequential single-document embedding is slow; cap its sample size
+        sample = min(count, 100) if batch_size == 1 else count
+        received = []
+        pipeline = EmbeddingPipeline(embedder, batch_size=batch_size, concurrency=concurrency)
+
+        start = time.perf_counter()
+        pipeline.run(documents(sample), lambda ids, *_: received.append(len(ids)))
+        elapsed = time.perf_counter() - start
+
+        assert sum(received) == sample
+        print(f"{batch_size:>6} {concurrency:>8} {elapsed:>8.2f} {sample / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
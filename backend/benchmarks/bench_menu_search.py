@@ -0,0 +1,63 @@
+"""Latency of /api/menu/search over a large multi-chef menu.
+
+Seeds the menu, then times queries straight against the index (no HTTP) and
+through the test client, for plain words, prefixes, typos and range-only
+filters.
+
+Run from backend/: python -m benchmarks.bench_menu_search [dishes]
+"""
+import sys
+import time
+from app.services.menu_search import menu_search
+from benchmarks.common import BenchConfig, make_app, percentile
+from benchmarks.seed import seed_database
+
+
+class SearchBenchConfig(BenchConfig):
+    # Keep the chat warm-up thread from competing for the GIL while timing
+    CHAT_WARMUP = 'off'
+
+QUERIES = [
+    {'query': 'chicken'},
+    {'query': 'chick'},
+    {'query': 'chiken curry'},
+    {'query': 'spicy bowl', 'max_price': 20},
+    {'min_rating': 4.5, 'sort': 'price'},
+]
+REPEAT = 500
+
+
+def main():
+    dishes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    app = make_app(SearchBenchConfig)
+    with app.app_context():
+        seed_database(users=500, dishes=dishes, orders=0, transactions=0)
+
+    client = app.test_client()
+    with app.test_request_context():
+        start = time.perf_counter()
+        menu_search.search()
+        print(f"dishes={dishes} index build={(time.perf_counter() - start) * 1000:.1f}ms")
+
+        print(f"{'query':<45} {'matches':>8} {'p50 us':>8} {'p99 us':>8} {'http p50 ms':>12}")
+        for params in QUERIES:
+            timings = []
+            for _ in range(REPEAT):
+                start = time.perf_counter()
+                _, total, _ = menu_search.search(**params)
+                timings.append(time.perf_counter() - start)
+
+            query_string = '&'.join(f"{'q' if k == 'query' else k}={v}" for k, v in params.items())
+            http = []
+            for _ in range(50):
+                start = time.perf_counter()
+                client.get(f'/api/menu/search?{query_string}')
+                http.append(time.perf_counter() - start)
+
+            print(f"{str(params):<45} {total:>8} {percentile(timings, 50) * 1e6:>8.0f} "
+                  f"{percentile(timings, 99) * 1e6:>8.0f} {percentile(http, 50) * 1000:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
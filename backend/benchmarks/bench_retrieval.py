@@ -0,0 +1,79 @@
+"""Latency and recall of the local NumPy index against the Chroma path.
+
+Builds a synthetic menu, embeds it once with the local HashingEmbedder and
+loads the same vectors into both indexes. Each query names one dish; recall@k
+is the share of queries whose dish comes back in the top k, and overlap is
+how often the two indexes agree on the top k.
+
+Run from backend/: python -m benchmarks.bench_retrieval [dishes] [queries]
+"""
+import random
+import statistics
+import sys
+import tempfile
+import time
+from app.services.embeddings import HashingEmbedder
+from app.services.vector_index import ChromaIndex, LocalVectorIndex
+
+K = 3
+ADJECTIVES = ["spicy", "smoky", "crispy", "creamy", "zesty", "roasted", "grilled", "sweet", "tangy", "herbed"]
+BASES = ["chicken", "tofu", "salmon", "beef", "lentil", "mushroom", "shrimp", "paneer", "lamb", "eggplant"]
+STYLES = ["curry", "bowl", "tacos", "salad", "noodles", "burger", "risotto", "skewers", "wrap", "stew"]
+
+
+def synthetic_menu(count, rng):
+    for i in range(count):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(BASES)} {rng.choice(STYLES)} no{i}"
+        description = f"{rng.choice(ADJECTIVES)} {rng.choice(BASES)} with {rng.choice(ADJECTIVES)} sauce"
+        yield str(i), f"Dish: {name}. Price: ${rng.randint(5, 40)}. Description: {description}. ", {"id": i}
+
+
+def measure(index, queries, embeddings):
+    latencies, hits, results = [], 0, []
+    for (target, _), embedding in zip(queries, embeddings):
+        start = time.perf_counter()
+        found = [doc_id for doc_id, _, _ in index.query(embedding, k=K)]
+        latencies.append(time.perf_counter() - start)
+        hits += target in found
+        results.append(set(found))
+    return latencies, hits / len(queries), results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(42)
+    embedder = HashingEmbedder()
+
+    menu = list(synthetic_menu(count, rng))
+    start = time.perf_counter()
+    vectors = embedder.embed_documents([document for _, document, _ in menu])
+    print(f"dishes={count} embedded in {time.perf_counter() - start:.2f}s (local, no network)")
+
+    local = LocalVectorIndex()
+    chroma = ChromaIndex(tempfile.mkdtemp(prefix="truebite_bench_chroma_"))
+    for offset in range(0, count, 1000):
+        batch = menu[offset:offset + 1000]
+        args = ([d[0] for d in batch], [d[1] for d in batch], vectors[offset:offset + 1000], [d[2] for d in batch])
+        local.upsert(*args)
+        chroma.upsert(*args)
+
+    # Query by the dish's name, as a customer would ask for it
+    sample = rng.sample(menu, min(query_count, count))
+    queries = [(doc_id, document.split(".")[0].replace("Dish: ", "")) for doc_id, document, _ in sample]
+    embeddings = [embedder.embed_query(text) for _, text in queries]
+
+    local_latency, local_recall, local_results = measure(local, queries, embeddings)
+    chroma_latency, chroma_recall, chroma_results = measure(chroma, queries, embeddings)
+    overlap = statistics.mean(len(a & b) / K for a, b in zip(local_results, chroma_results))
+
+    print(f"{'index':>8} {'p50 ms':>8} {'p99 ms':>8} {'recall@' + str(K):>9}")
+    for name, latency, recall in (("local", local_latency, local_recall), ("chroma", chroma_latency, chroma_recall)):
+        latency = sorted(latency)
+        p99 = latency[min(len(latency) - 1, int(0.99 * len(latency)))]
+        print(f"{name:>8} {statistics.median(latency) * 1000:>8.3f} {p99 * 1000:>8.3f} {recall:>9.2%}")
+    print(f"top-{K} overlap local vs chroma: {overlap:.2%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Cold-start cost of create_app(), measured with python -X importtime.
+
+Boots the app in a fresh interpreter, reports wall time and the slowest
+imports, and fails if any of the heavy chat dependencies were imported at
+boot. That makes it usable as a CI check. For comparison it also times a
+boot that eagerly imports the chat stack, as the app used to.
+
+Run from backend/: python -m benchmarks.bench_startup
+"""
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("google.generativeai", "chromadb", "numpy")
+
+BOOT = "from app import create_app; create_app()"
+EAGER_BOOT = "import google.generativeai, chromadb, numpy; " + BOOT
+
+
+def boot(code):
+    env = dict(os.environ, DATABASE_URL="sqlite://", CHAT_WARMUP="off")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imports[name.strip()] = int(cumulative) / 1e6
+    return elapsed, imports
+
+
+def main():
+    elapsed, imports = boot(BOOT)
+    top_level = {name: seconds for name, seconds in imports.items() if "." not in name}
+
+    print(f"create_app() cold start: {elapsed * 1000:.0f}ms wall")
+    print("slowest top-level imports:")
+    for name, seconds in sorted(top_level.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {seconds * 1000:>8.1f}ms  {name}")
+
+    try:
+        eager_elapsed, _ = boot(EAGER_BOOT)
+        print(f"with the chat stack imported eagerly: {eager_elapsed * 1000:.0f}ms wall")
+    except RuntimeError:
+        print("chat dependencies not installed; skipped eager comparison")
+
+    loaded = [name for name in HEAVY_MODULES if name in imports]
+    if loaded:
+        print(f"FAIL: heavy modules imported at boot: {', '.join(loaded)}")
+        sys.exit(1)
+    print("OK: no heavy chat dependencies imported at boot")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from sqlalchemy import event
+from app import create_app, db
+from app.config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.getenv('BENCH_DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'truebite_bench.db'))
+    JWT_SECRET_KEY = 'bench-secret-key-with-enough-length-for-hs256'
+    TESTING = True
+
+
+def make_app(config_class=BenchConfig):
+    """Create the app against a fresh benchmark database"""
+    app = create_app(config_class)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+class QueryCounter:
+    """Counts SQL statements sent through the engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+        self.selects = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.selects += 1
+
+    def __enter__(self):
+        self.count = 0
+        self.selects = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def timed(results, key):
+    start = time.perf_counter()
+    yield
+    results[key] = time.perf_counter() - start
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (0 for an empty list)"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
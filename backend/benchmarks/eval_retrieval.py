@@ -0,0 +1,122 @@
+"""Retrieval quality of vector-only search versus hybrid, filtered retrieval.
+
+Runs a labelled question set over a fixture menu and reports, per strategy:
+
+- recall: share of expected dishes that made it into the context
+- leaks: context slots taken by dishes the caller must not see (VIP-only for
+  regular customers, unavailable, or outside a requested price range)
+- mean latency per question
+
+Run from backend/: python -m benchmarks.eval_retrieval [k]
+"""
+import statistics
+import sys
+import time
+from app.services.embeddings import HashingEmbedder
+from app.services.retrieval import HybridRetriever, price_filter
+from app.services.vector_index import LocalVectorIndex, matches
+
+# (name, description, price, is_vip_only, is_available)
+MENU = [
+    ("Margherita Pizza", "tomato, mozzarella and basil on a thin crust", 12.0, False, True),
+    ("Truffle Pizza", "black truffle, fontina and wild mushrooms", 34.0, True, True),
+    ("Pepperoni Pizza", "spicy pepperoni and mozzarella", 14.0, False, True),
+    ("Vegan Buddha Bowl", "quinoa, chickpeas, roasted vegetables and tahini, fully vegan", 11.0, False, True),
+    ("Vegan Chili", "three-bean chili, vegan and gluten free", 9.0, False, False),
+    ("Wagyu Burger", "A5 wagyu beef with aged cheddar", 42.0, True, True),
+    ("Classic Cheeseburger", "beef patty, cheddar, pickles", 13.0, False, True),
+    ("Garden Salad", "mixed greens with a lemon vinaigrette, vegan", 8.0, False, True),
+    ("Caesar Salad", "romaine, parmesan, croutons and caesar dressing", 10.0, False, True),
+    ("Lobster Risotto", "arborio rice with butter-poached lobster", 38.0, True, True),
+    ("Mushroom Risotto", "arborio rice with porcini and parmesan", 18.0, False, True),
+    ("Chicken Tikka Masala", "spiced chicken in a creamy tomato sauce", 16.0, False, True),
+    ("Paneer Tikka Masala", "paneer in a creamy tomato sauce, vegetarian", 15.0, False, True),
+    ("Salmon Teriyaki", "grilled salmon with teriyaki glaze and rice", 22.0, False, True),
+    ("Caviar Blini", "buckwheat blini with sturgeon caviar", 60.0, True, True),
+    ("Fish Tacos", "crispy cod, slaw and chipotle crema", 12.0, False, True),
+    ("Chocolate Lava Cake", "warm chocolate cake with a molten centre", 9.0, False, True),
+    ("Tiramisu", "espresso-soaked ladyfingers and mascarpone", 8.0, False, True),
+    ("Pad Thai", "rice noodles, tamarind, peanuts and shrimp", 15.0, False, True),
+    ("Kids Chicken Nuggets", "breaded chicken with fries", 7.0, False, False),
+]
+
+# (question, caller is VIP, dish names a good answer needs)
+QUESTIONS = [
+    ("Do you have any pizza?", False, {"Margherita Pizza", "Pepperoni Pizza"}),
+    ("Do you have any pizza?", True, {"Margherita Pizza", "Pepperoni Pizza", "Truffle Pizza"}),
+    ("Is there anything vegan?", False, {"Vegan Buddha Bowl", "Garden Salad"}),
+    ("What burgers do you have?", False, {"Classic Cheeseburger"}),
+    ("What burgers do you have?", True, {"Classic Cheeseburger", "Wagyu Burger"}),
+    ("Tell me about the risotto", False, {"Mushroom Risotto"}),
+    ("Any salads under $9?", False, {"Garden Salad"}),
+    ("Which mains are under $13?", False, {"Margherita Pizza", "Fish Tacos", "Vegan Buddha Bowl"}),
+    ("What desserts do you have, like cake or tiramisu?", False, {"Chocolate Lava Cake", "Tiramisu"}),
+    ("Tikka masala", False, {"Chicken Tikka Masala", "Paneer Tikka Masala"}),
+    ("Do you serve caviar?", False, set()),
+    ("Do you serve caviar?", True, {"Caviar Blini"}),
+    ("Noodles with peanuts", False, {"Pad Thai"}),
+]
+
+
+def document(name, description, price, is_vip_only):
+    content = f"Dish: {name}. Price: ${price:.2f}. Description: {description}. "
+    if is_vip_only:
+        content += "This is a VIP exclusive dish. "
+    return content
+
+
+def build_index(embedder):
+    # Index every dish, as a stale or unfiltered knowledge base would contain them
+    index = LocalVectorIndex()
+    ids, docs, metas = [], [], []
+    for i, (name, description, price, vip, available) in enumerate(MENU):
+        ids.append(str(i))
+        docs.append(document(name, description, price, vip))
+        metas.append({"name": name, "price": price, "is_vip_only": vip, "is_available": available})
+    index.upsert(ids, docs, embedder.embed_documents(docs), metas)
+    return index
+
+
+def allowed_filter(question, is_vip):
+    where = {"is_available": True}
+    if not is_vip:
+        where["is_vip_only"] = False
+    where.update(price_filter(question))
+    return where
+
+
+def main():
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    embedder = HashingEmbedder()
+    index = build_index(embedder)
+    hybrid = HybridRetriever(index)
+    hybrid.refresh()
+
+    strategies = {
+        "vector, no filter": lambda q, emb, where: index.query(emb, k=k),
+        "vector + filter": lambda q, emb, where: index.query(emb, k=k, where=where),
+        "hybrid + filter": lambda q, emb, where: hybrid.retrieve(q, emb, k=k, where=where),
+    }
+
+    print(f"fixture: {len(MENU)} dishes, {len(QUESTIONS)} questions, k={k}")
+    print(f"{'strategy':>20} {'recall':>8} {'leaks':>6} {'ms/query':>9}")
+    for name, strategy in strategies.items():
+        found = expected = leaks = 0
+        latencies = []
+        for question, is_vip, wanted in QUESTIONS:
+            where = allowed_filter(question, is_vip)
+            start = time.perf_counter()
+            results = strategy(question, embedder.embed_query(question), where)
+            latencies.append(time.perf_counter() - start)
+
+            names = {metadata["name"] for _, _, metadata in results}
+            found += len(names & wanted)
+            expected += min(len(wanted), k)
+            leaks += sum(1 for _, _, metadata in results if not matches(metadata, where))
+
+        recall = found / expected if expected else 1.0
+        print(f"{name:>20} {recall:>8.0%} {leaks:>6} {statistics.mean(latencies) * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
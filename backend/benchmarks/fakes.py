@@ -0,0 +1,31 @@
+import time
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeChatModel:
+    """Stand-in for the Gemini GenerativeModel with configurable timing.
+
+    ``first_token`` is the delay before any output, ``token_delay`` the gap
+    between subsequent chunks.
+    """
+
+    def __init__(self, first_token=0.3, token_delay=0.02, tokens=20):
+        self.first_token = first_token
+        self.token_delay = token_delay
+        self.tokens = tokens
+
+    def _chunks(self):
+        time.sleep(self.first_token)
+        for i in range(self.tokens):
+            if i:
+                time.sleep(self.token_delay)
+            yield FakeChunk(f"token{i} ")
+
+    def generate_content(self, prompt, stream=False):
+        if stream:
+            return self._chunks()
+        return FakeChunk("".join(chunk.text for chunk in self._chunks()))
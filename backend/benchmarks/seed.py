@@ -0,0 +1,165 @@
+"""Seed a benchmark database with realistic volumes.
+
+Rows are written with chunked Core INSERTs rather than ORM objects, so a
+million transactions take seconds on SQLite and the same code runs against
+Postgres (set BENCH_DATABASE_URL). The data is derived from a fixed random
+seed, so every run measures the same database.
+
+Run from backend/: python -m benchmarks.seed [--users N] [--dishes N] [--orders N] [--transactions N]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app import db
+from app.models import User, Wallet, Transaction, Dish, Order, OrderItem
+from benchmarks.common import make_app
+
+DEFAULT_VOLUMES = {'users': 5000, 'dishes': 1000, 'orders': 20000, 'transactions': 1_000_000}
+
+CHUNK_SIZE = 10_000
+
+_ADJECTIVES = ['Spicy', 'Smoked', 'Crispy', 'Grilled', 'Roasted', 'Garlic', 'Lemon', 'Honey', 'Sesame', 'Herb']
+_BASES = ['Chicken', 'Tofu', 'Salmon', 'Beef', 'Shrimp', 'Mushroom', 'Lamb', 'Paneer', 'Duck', 'Eggplant']
+_STYLES = ['Curry', 'Tacos', 'Ramen', 'Bowl', 'Burger', 'Salad', 'Pasta', 'Skewers', 'Wrap', 'Stir Fry']
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(model.__table__.insert(), rows[start:start + CHUNK_SIZE])
+
+
+def _reset_sequences():
+    # Rows above were inserted with explicit ids; move Postgres sequences past them
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for model in (User, Wallet, Dish, Order, OrderItem, Transaction):
+        table = model.__tablename__
+        db.session.execute(db.text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+
+
+def seed_database(users=5000, dishes=1000, orders=20000, transactions=1_000_000, seed=42):
+    """Fill an empty database and return the ids the benchmarks drive.
+
+    About 4% of users are chefs, 2% delivery staff and 10% VIPs; everyone
+    else is a regular customer. Customers and VIPs get a wallet large enough
+    that checkouts never run dry.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+
+    chefs = max(1, users // 25)
+    drivers = max(1, users // 50)
+    vips = users // 10
+    user_rows = []
+    for i in range(users):
+        if i < chefs:
+            user_type = 'chef'
+        elif i < chefs + drivers:
+            user_type = 'delivery'
+        elif i < chefs + drivers + vips:
+            user_type = 'vip'
+        else:
+            user_type = 'customer'
+        user_rows.append({
+            'id': i + 1, 'email': f'user{i}@bench', 'name': f'User {i}', 'password_hash': 'x',
+            'user_type': user_type, 'is_blacklisted': False, 'warnings_count': 0,
+            'total_spent': Decimal('0.00'), 'order_count': 0, 'created_at': now - timedelta(days=365)
+        })
+    _insert(User, user_rows)
+
+    chef_ids = [row['id'] for row in user_rows if row['user_type'] == 'chef']
+    customer_ids = [row['id'] for row in user_rows if row['user_type'] in ('customer', 'vip')]
+
+    _insert(Wallet, [{
+        'id': index + 1, 'user_id': user_id, 'balance': Decimal('1000000.00'),
+        'created_at': now - timedelta(days=365), 'updated_at': now
+    } for index, user_id in enumerate(customer_ids)])
+    wallet_ids = list(range(1, len(customer_ids) + 1))
+
+    dish_rows = []
+    for i in range(dishes):
+        name = f"{rng.choice(_ADJECTIVES)} {rng.choice(_BASES)} {rng.choice(_STYLES)}"
+        dish_rows.append({
+            'id': i + 1, 'chef_id': rng.choice(chef_ids), 'name': f"{name} #{i}",
+            'description': f"{name} from the kitchen of chef {i % len(chef_ids)}",
+            'price': Decimal(rng.randint(600, 4500)) / 100, 'image_url': None,
+            'is_vip_only': rng.random() < 0.05, 'is_available': rng.random() < 0.95,
+            'avg_rating': Decimal(rng.randint(250, 500)) / 100, 'total_orders': 0,
+            'created_at': now - timedelta(days=rng.randint(0, 365))
+        })
+    _insert(Dish, dish_rows)
+    orderable = [row for row in dish_rows if row['is_available'] and not row['is_vip_only']]
+
+    order_rows = []
+    item_rows = []
+    for i in range(orders):
+        lines = rng.sample(orderable, k=min(len(orderable), rng.randint(1, 4)))
+        subtotal = Decimal('0.00')
+        for dish in lines:
+            quantity = rng.randint(1, 3)
+            subtotal += dish['price'] * quantity
+            item_rows.append({
+                'order_id': i + 1, 'dish_id': dish['id'], 'quantity': quantity, 'price_at_time': dish['price']
+            })
+        order_rows.append({
+            'id': i + 1, 'customer_id': rng.choice(customer_ids), 'chef_id': lines[0]['chef_id'],
+            'status': rng.choice(['CREATED', 'DELIVERED']),
+            'subtotal': subtotal, 'discount_amount': Decimal('0.00'), 'delivery_fee': Decimal('5.00'),
+            'total': subtotal + Decimal('5.00'), 'order_time': now - timedelta(seconds=rng.randint(0, 365 * 86400))
+        })
+    _insert(Order, order_rows)
+    _insert(OrderItem, item_rows)
+
+    # Generated chunk by chunk so millions of rows never sit in memory at once
+    for start in range(0, transactions, CHUNK_SIZE):
+        rows = []
+        for _ in range(min(CHUNK_SIZE, transactions - start)):
+            kind = rng.choices(['deposit', 'payment', 'refund'], weights=[30, 65, 5])[0]
+            rows.append({
+                'wallet_id': rng.choice(wallet_ids), 'order_id': None,
+                'amount': Decimal(rng.randint(500, 10000)) / 100, 'transaction_type': kind,
+                'description': kind.capitalize(), 'created_at': now - timedelta(seconds=rng.randint(0, 365 * 86400))
+            })
+        db.session.execute(Transaction.__table__.insert(), rows)
+
+    _reset_sequences()
+    db.session.commit()
+    return {
+        'customer_ids': customer_ids,
+        'dish_ids': [row['id'] for row in orderable]
+    }
+
+
+def load_ids():
+    """Read back the ids of an already seeded database"""
+    return {
+        'customer_ids': [u.id for u in User.query.filter(User.user_type.in_(['customer', 'vip'])).all()],
+        'dish_ids': [d.id for d in Dish.query.filter_by(is_available=True, is_vip_only=False).all()]
+    }
+
+
+def add_volume_arguments(parser):
+    for name, default in DEFAULT_VOLUMES.items():
+        parser.add_argument(f'--{name}', type=int, default=default)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_volume_arguments(parser)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        start = time.perf_counter()
+        seed_database(args.users, args.dishes, args.orders, args.transactions)
+        print(f"Seeded {args.users} users, {args.dishes} dishes, {args.orders} orders and "
+              f"{args.transactions} transactions in {time.perf_counter() - start:.1f}s "
+              f"into {app.config['SQLALCHEMY_DATABASE_URI']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Hammer one wallet from many threads and check it against its ledger.
+
+Every successful deposit, payment and refund must be reflected exactly once:
+the final balance has to equal the signed sum of the wallet's transactions.
+Payments that would overdraw are refused rather than applied.
+
+Run from backend/: python -m benchmarks.stress_wallet [threads] [ops_per_thread]
+"""
+import random
+import sys
+import threading
+import time
+from decimal import Decimal
+from sqlalchemy import func, case
+from app import db
+from app.models import User, Wallet, Transaction
+from app.services.finance_service import FinanceService
+from benchmarks.common import BenchConfig, make_app
+
+
+class StressConfig(BenchConfig):
+    # SQLite serializes writers; give them room to wait instead of failing
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}} if BenchConfig.SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {}
+
+
+def worker(app, user_id, ops, seed, stats):
+    rng = random.Random(seed)
+    with app.app_context():
+        for _ in range(ops):
+            amount = rng.choice([1, 2.5, 5, 10])
+            op = rng.random()
+            try:
+                if op < 0.5:
+                    FinanceService.add_funds(user_id, amount)
+                elif op < 0.9:
+                    FinanceService.process_payment(user_id, None, amount)
+                else:
+                    FinanceService.process_refund(user_id, None, amount)
+                stats['ok'] += 1
+            except ValueError:
+                stats['refused'] += 1
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    app = make_app(StressConfig)
+    app.logger.disabled = True
+    with app.app_context():
+        user = User(email='stress@bench', name='Stress', user_type='customer', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Wallet(user_id=user.id, balance=0))
+        db.session.commit()
+        user_id = user.id
+
+    stats = [{'ok': 0, 'refused': 0} for _ in range(threads)]
+    pool = [threading.Thread(target=worker, args=(app, user_id, ops, i, stats[i])) for i in range(threads)]
+
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        wallet = FinanceService.get_wallet(user_id)
+        signed = case((Transaction.transaction_type == 'payment', -Transaction.amount), else_=Transaction.amount)
+        ledger = db.session.query(func.coalesce(func.sum(signed), 0)).filter(Transaction.wallet_id == wallet.id).scalar()
+        balance = Decimal(wallet.balance)
+        ledger = Decimal(ledger).quantize(Decimal('0.01'))
+
+    ok = sum(s['ok'] for s in stats)
+    refused = sum(s['refused'] for s in stats)
+    print(f"threads={threads} ops={threads * ops} applied={ok} refused={refused} "
+          f"ops/sec={threads * ops / elapsed:.0f}")
+    print(f"balance={balance} ledger={ledger}")
+
+    if balance != ledger or balance < 0:
+        print("FAIL: wallet balance does not match its ledger")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""End-to-end API benchmark: latency percentiles and throughput per scenario.
+
+Seeds a database (see benchmarks.seed), then drives the real Flask app
+through its test client from a pool of threads. The chat model is replaced
+by the offline fake and the knowledge base uses the local embedder and
+index, so no network is touched. Each scenario reports p50/p99 latency and
+requests/sec, and the run is written to JSON together with the commit it
+measured so results can be compared across commits:
+
+    python -m benchmarks.suite --output before.json
+    git checkout my-branch
+    python -m benchmarks.suite --output after.json --compare before.json
+
+Pass --reuse to skip seeding and benchmark the database left by a previous
+run. Run from backend/: python -m benchmarks.suite [options]
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.services.llm import ChatService
+from benchmarks.common import BenchConfig, make_app, percentile
+from benchmarks.fakes import FakeChatModel
+from benchmarks.seed import add_volume_arguments, load_ids, seed_database
+
+SCENARIOS = ['menu', 'checkout', 'deposit', 'order_history', 'transaction_history', 'chat']
+
+
+class SuiteConfig(BenchConfig):
+    GOOGLE_API_KEY = 'offline'
+    EMBEDDING_BACKEND = 'hashing'
+    # In-memory index so benchmark runs never touch instance/
+    RETRIEVAL_BACKEND = 'local'
+    LOCAL_INDEX_PATH = ''
+    CHAT_WARMUP = 'off'
+    # Every question is distinct, so caching doesn't hide the model latency
+    CHAT_ANSWER_CACHE_SIZE = 1
+    CHAT_MAX_QUEUE = 64
+    # SQLite serializes writers; give them room to wait instead of failing
+    SQLALCHEMY_ENGINE_OPTIONS = {'connect_args': {'timeout': 30}} if BenchConfig.SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Workload:
+    """Builds one request per call for each scenario, from a fixed seed"""
+
+    def __init__(self, app, ids, seed=7):
+        self.ids = ids
+        self._local = threading.local()
+        self._seeds = iter(range(seed, seed + 1_000_000))
+        self._seed_lock = threading.Lock()
+        with app.app_context():
+            self.tokens = {user_id: create_access_token(identity=str(user_id)) for user_id in ids['customer_ids']}
+
+    @property
+    def rng(self):
+        rng = getattr(self._local, 'rng', None)
+        if rng is None:
+            with self._seed_lock:
+                rng = self._local.rng = random.Random(next(self._seeds))
+        return rng
+
+    def _auth(self):
+        token = self.tokens[self.rng.choice(self.ids['customer_ids'])]
+        return {'Authorization': f'Bearer {token}'}
+
+    def menu(self, client):
+        return client.get('/api/menu/dishes')
+
+    def checkout(self, client):
+        items = [{'dish_id': dish_id, 'quantity': self.rng.randint(1, 3)}
+                 for dish_id in self.rng.sample(self.ids['dish_ids'], k=self.rng.randint(1, 4))]
+        return client.post('/api/orders/create', json={'items': items}, headers=self._auth())
+
+    def deposit(self, client):
+        return client.post('/api/finance/deposit', json={'amount': self.rng.choice([10, 25, 50])}, headers=self._auth())
+
+    def order_history(self, client):
+        return client.get('/api/orders/history', headers=self._auth())
+
+    def transaction_history(self, client):
+        return client.get('/api/finance/transactions', headers=self._auth())
+
+    def chat(self, client):
+        return client.post('/api/chat/ask', json={'message': f'Anything spicy under ${self.rng.randint(10, 40)}? #{self.rng.random()}'})
+
+
+def run_scenario(client, request_fn, requests, concurrency, warmup=5):
+    """Send requests through request_fn and summarize latency and throughput"""
+    for _ in range(warmup):
+        request_fn(client)
+
+    def one(_):
+        start = time.perf_counter()
+        response = request_fn(client)
+        elapsed = time.perf_counter() - start
+        response.close()
+        return elapsed, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(one, range(requests)))
+        wall = time.perf_counter() - start
+
+    latencies = [elapsed for elapsed, _ in results]
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'rps': round(requests / wall, 1)
+    }
+
+
+def compare(previous, current):
+    """Print per-scenario change against an earlier results file"""
+    print(f"\nvs {previous.get('commit') or 'previous run'}:")
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        changes = []
+        for key in ('p50_ms', 'p99_ms', 'rps'):
+            if before[key]:
+                changes.append(f"{key} {(result[key] - before[key]) / before[key]:+.1%}")
+        print(f"  {name:<20} " + "  ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_volume_arguments(parser)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='fake model time to first token (s)')
+    parser.add_argument('--reuse', action='store_true', help='benchmark the existing database instead of reseeding')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='earlier results file to diff against')
+    args = parser.parse_args()
+
+    app = create_app(SuiteConfig) if args.reuse else make_app(SuiteConfig)
+    app.logger.disabled = True
+    # Scenarios run one at a time, so the chat scenario may use every client thread
+    app.config['CHAT_WEB_THREADS'] = args.concurrency
+    app.config['WEB_THREADS'] = args.concurrency + 1
+    with app.app_context():
+        seed_start = time.perf_counter()
+        if args.reuse:
+            ids = load_ids()
+        else:
+            ids = seed_database(args.users, args.dishes, args.orders, args.transactions)
+        seed_seconds = time.perf_counter() - seed_start
+
+        scenarios = args.scenarios.split(',')
+        if 'chat' in scenarios:
+            service = ChatService.get_instance()
+            service.model = FakeChatModel(first_token=args.llm_latency, token_delay=0, tokens=20)
+            service.sync_knowledge_base()
+        dialect = db.engine.dialect.name
+
+    workload = Workload(app, ids)
+    client = app.test_client()
+    results = {
+        'commit': _git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'database': dialect,
+        'volumes': {name: getattr(args, name) for name in ('users', 'dishes', 'orders', 'transactions')},
+        'reused_database': args.reuse,
+        'seed_seconds': round(seed_seconds, 1),
+        'concurrency': args.concurrency,
+        'scenarios': {}
+    }
+
+    print(f"{'scenario':<20} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'errors':>7}")
+    for name in scenarios:
+        result = run_scenario(client, getattr(workload, name), args.requests, args.concurrency)
+        results['scenarios'][name] = result
+        print(f"{name:<20} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['rps']:>8.1f} {result['errors']:>7}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
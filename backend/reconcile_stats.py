@@ -0,0 +1,13 @@
+"""Recompute Dish.total_orders from order_items and repair any drift.
+
+Checkout keeps the counters current; run this after imports, manual data
+fixes or restores, or periodically from cron.
+"""
+from app import create_app
+from app.services.dish_stats import DishStatsService
+
+app = create_app()
+
+with app.app_context():
+    fixed = DishStatsService.reconcile()
+    print(f"Reconciled dish statistics: {fixed} dish(es) corrected.")
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.config import Config
+from app.models import User, Wallet, Dish
+
+
+class TestConfig(Config):
+    TESTING = True
+    JWT_SECRET_KEY = 'test-secret-key-with-enough-length-for-hs256'
+    CHAT_WARMUP = 'off'
+    DATABASE_REPLICA_URL = None
+    DELIVERY_SCHEDULER_INTERVAL = 0
+
+
+@pytest.fixture
+def config(tmp_path):
+    class AppConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'truebite.db'}"
+
+    return AppConfig
+
+
+@pytest.fixture
+def app(config):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(app):
+    """A chef, a customer, a VIP, a delivery person and a manager, keyed by user type"""
+    users = {
+        user_type: User(email=f'{user_type}@truebite.test', name=user_type, user_type=user_type, password_hash='x')
+        for user_type in ('chef', 'customer', 'vip', 'delivery', 'manager')
+    }
+    db.session.add_all(users.values())
+    db.session.commit()
+    for user_type in ('customer', 'vip'):
+        db.session.add(Wallet(user_id=users[user_type].id, balance=10000))
+    db.session.commit()
+    return users
+
+
+@pytest.fixture
+def dishes(app, users):
+    dishes = [
+        Dish(chef_id=users['chef'].id, name=f'Dish {i}', description=f'House dish number {i}', price=10 + i)
+        for i in range(5)
+    ]
+    db.session.add_all(dishes)
+    db.session.commit()
+    return dishes
+
+
+def auth(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+class QueryCounter:
+    """Statements sent through the engine inside the with block"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@pytest.fixture
+def queries(app):
+    return QueryCounter(db.engine)
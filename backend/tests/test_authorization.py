@@ -0,0 +1,27 @@
+from sqlalchemy import update
+from app import db
+from app.models import User
+from tests.conftest import auth
+
+
+def edit_elsewhere(user, **values):
+    """Change a user the way another worker process would: no session events here"""
+    with db.engine.begin() as connection:
+        connection.execute(update(User.__table__).where(User.__table__.c.id == user.id).values(**values))
+    db.session.expire_all()
+
+
+def test_demoted_chef_loses_the_kitchen_at_once(client, users):
+    chef = users['chef']
+    assert client.get('/api/kitchen/queue', headers=auth(chef)).status_code == 200
+
+    edit_elsewhere(chef, user_type='customer')
+    assert client.get('/api/kitchen/queue', headers=auth(chef)).status_code == 403
+
+
+def test_demoted_manager_cannot_assign_deliveries(client, users):
+    manager = users['manager']
+    assert client.post('/api/orders/assign-deliveries', headers=auth(manager)).status_code == 200
+
+    edit_elsewhere(manager, user_type='customer')
+    assert client.post('/api/orders/assign-deliveries', headers=auth(manager)).status_code == 403
@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from app.services.chat_executor import get_chat_executor
+from app.services.llm import ChatService
+from benchmarks.fakes import FakeChatModel
+
+
+class CountingModel(FakeChatModel):
+    """Fake model that counts the chunks actually pulled from it"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.pulled = 0
+
+    def _chunks(self):
+        for chunk in super()._chunks():
+            self.pulled += 1
+            yield chunk
+
+
+@pytest.fixture
+def chat(app, dishes):
+    app.config.update(
+        EMBEDDING_BACKEND='hashing', RETRIEVAL_BACKEND='local', LOCAL_INDEX_PATH=None, GOOGLE_API_KEY=None,
+        CHAT_MAX_CONCURRENCY=1, CHAT_MAX_QUEUE=4, CHAT_TIMEOUT_SECONDS=0.2
+    )
+    service = ChatService.get_instance()
+    yield service
+    ChatService._reset_after_fork()
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_timed_out_ask_gives_back_its_queue_slot(app, client, chat):
+    chat.model = CountingModel(first_token=0, token_delay=0, tokens=1)
+    executor = get_chat_executor()
+    release = threading.Event()
+    executor.submit(app, release.wait)
+    try:
+        response = client.post('/api/chat/ask', json={'message': 'Dish 1'})
+
+        assert response.status_code == 504
+        assert executor.pending == 1
+    finally:
+        release.set()
+    assert wait_for(lambda: executor.pending == 0)
+    assert chat.model.pulled == 0
+
+
+def test_timed_out_ask_skips_generation(app, client, chat):
+    chat.model = CountingModel(first_token=0, token_delay=0, tokens=1)
+    slow_retrieve = chat._retrieve
+
+    def retrieve(*args):
+        time.sleep(0.4)
+        return slow_retrieve(*args)
+
+    chat._retrieve = retrieve
+    assert client.post('/api/chat/ask', json={'message': 'Dish 1'}).status_code == 504
+    assert wait_for(lambda: get_chat_executor().pending == 0)
+    assert chat.model.pulled == 0
+
+
+def test_stream_stops_generating_when_the_client_disconnects(client, chat):
+    chat.model = CountingModel(first_token=0, token_delay=0.02, tokens=200)
+
+    response = client.post('/api/chat/stream', json={'message': 'Dish 1'}, buffered=False)
+    events = iter(response.response)
+    assert next(events).startswith(b'data: ')
+    response.close()
+
+    assert wait_for(lambda: get_chat_executor().pending == 0)
+    assert chat.model.pulled < 20
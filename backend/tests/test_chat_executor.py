@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import pytest
+from app.services.chat_executor import chat_limits, get_chat_executor
+from app.services.llm import ChatService
+from benchmarks.fakes import FakeChunk
+from tests.conftest import auth
+
+
+@pytest.mark.parametrize('config, limits', [
+    ({'WEB_THREADS': 4, 'CHAT_MAX_CONCURRENCY': 4, 'CHAT_MAX_QUEUE': 8}, (2, 0)),
+    ({'WEB_THREADS': 16, 'CHAT_MAX_CONCURRENCY': 4, 'CHAT_MAX_QUEUE': 8}, (4, 4)),
+    ({'WEB_THREADS': 16, 'CHAT_MAX_CONCURRENCY': 2, 'CHAT_MAX_QUEUE': 1}, (2, 1)),
+    ({'WEB_THREADS': 8, 'CHAT_WEB_THREADS': 6, 'CHAT_MAX_CONCURRENCY': 4, 'CHAT_MAX_QUEUE': 8}, (4, 2)),
+    ({'WEB_THREADS': 4, 'CHAT_WEB_THREADS': 10, 'CHAT_MAX_CONCURRENCY': 4, 'CHAT_MAX_QUEUE': 8}, (3, 0)),
+    ({'WEB_THREADS': 1, 'CHAT_MAX_CONCURRENCY': 4, 'CHAT_MAX_QUEUE': 8}, (1, 0)),
+])
+def test_chats_hold_fewer_than_all_web_threads(config, limits):
+    assert chat_limits(config) == limits
+
+
+class BlockingModel:
+    """Fake model whose answers wait until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def generate_content(self, prompt, stream=False):
+        self.release.wait(5)
+        return FakeChunk("answer")
+
+
+@pytest.fixture
+def chat(app, dishes):
+    app.config.update(
+        EMBEDDING_BACKEND='hashing', RETRIEVAL_BACKEND='local', LOCAL_INDEX_PATH=None, GOOGLE_API_KEY=None,
+        WEB_THREADS=4, CHAT_MAX_CONCURRENCY=4, CHAT_MAX_QUEUE=8, CHAT_TIMEOUT_SECONDS=5
+    )
+    yield ChatService.get_instance()
+    ChatService._reset_after_fork()
+
+
+def test_orders_are_served_while_chats_are_saturated(app, users, chat):
+    model = chat.model = BlockingModel()
+    headers = auth(users['customer'])
+
+    def ask(i):
+        return app.test_client().post('/api/chat/ask', json={'message': f'question {i}'}).status_code
+
+    def history():
+        return app.test_client().get('/api/orders/history', headers=headers).status_code
+
+    # Stands in for a worker's WEB_THREADS request threads
+    with ThreadPoolExecutor(max_workers=4) as web:
+        try:
+            chats = [web.submit(ask, i) for i in range(8)]
+            order = web.submit(history)
+            assert order.result(timeout=3) == 200
+            assert get_chat_executor().pending < 4
+        except TimeoutError:
+            pytest.fail("order request starved by chats")
+        finally:
+            model.release.set()
+        statuses = [future.result(timeout=10) for future in chats]
+
+    assert statuses.count(200) == 2
+    assert statuses.count(503) == 6
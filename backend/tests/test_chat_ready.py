@@ -0,0 +1,51 @@
+import threading
+import pytest
+from app.services.llm import ChatService
+
+
+@pytest.fixture
+def chat_config(app, dishes):
+    app.config.update(EMBEDDING_BACKEND='hashing', RETRIEVAL_BACKEND='local', LOCAL_INDEX_PATH=None, GOOGLE_API_KEY=None)
+    ChatService._reset_after_fork()
+    yield app
+    ChatService._reset_after_fork()
+
+
+def test_ready_only_after_warm_up_finishes(chat_config, client, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    warm_up = ChatService.warm_up
+
+    def slow_warm_up(self):
+        started.set()
+        release.wait(5)
+        warm_up(self)
+
+    monkeypatch.setattr(ChatService, 'warm_up', slow_warm_up)
+    assert client.get('/api/chat/ready').status_code == 503
+
+    thread = threading.Thread(target=ChatService._warm_up, args=(chat_config,))
+    thread.start()
+    try:
+        assert started.wait(5)
+        response = client.get('/api/chat/ready')
+        assert response.status_code == 503
+        assert response.json['chat']['state'] == 'warming'
+    finally:
+        release.set()
+        thread.join(5)
+
+    response = client.get('/api/chat/ready')
+    assert response.status_code == 200
+    assert response.json['chat']['state'] == 'ready'
+
+
+def test_failed_warm_up_is_not_ready(chat_config, client, monkeypatch):
+    def broken_warm_up(self):
+        raise RuntimeError("index unreachable")
+
+    monkeypatch.setattr(ChatService, 'warm_up', broken_warm_up)
+    ChatService._warm_up(chat_config)
+
+    response = client.get('/api/chat/ready')
+    assert response.status_code == 503
+    assert response.json['chat'] == {**response.json['chat'], 'state': 'failed', 'last_error': 'index unreachable'}
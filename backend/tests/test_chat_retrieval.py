@@ -0,0 +1,81 @@
+import pytest
+from app.services.llm import ChatService
+
+
+@pytest.fixture
+def chat(app, dishes):
+    app.config.update(EMBEDDING_BACKEND='hashing', RETRIEVAL_BACKEND='local', LOCAL_INDEX_PATH=None, GOOGLE_API_KEY=None)
+    return ChatService()
+
+
+def index_legacy(chat, dishes):
+    """Index the dishes the way releases before availability filters did"""
+    documents = [chat.render_document(dish) for dish in dishes]
+    chat.index.upsert(
+        ids=[str(dish.id) for dish in dishes],
+        documents=documents,
+        embeddings=chat.embedder.embed_documents(documents),
+        metadatas=[{"name": dish.name, "price": float(dish.price), "id": dish.id} for dish in dishes]
+    )
+
+
+def test_legacy_documents_are_still_retrieved(chat, dishes):
+    index_legacy(chat, dishes)
+
+    _, context = chat._retrieve("Dish 2")
+    assert "Dish: Dish 2." in context
+    _, context = chat._retrieve("dish under $11")
+    assert "Dish: Dish 0." in context and "Dish: Dish 3." not in context
+
+
+def test_warm_up_resyncs_legacy_documents(chat, dishes):
+    dishes[2].is_vip_only = True
+    index_legacy(chat, dishes)
+
+    chat.warm_up()
+
+    assert chat.filter_fields == ChatService.FILTER_FIELDS
+    assert all("is_available" in metadata for _, _, metadata in chat.index.entries())
+    _, context = chat._retrieve("Dish 2")
+    assert "Dish: Dish 2." not in context
+    _, context = chat._retrieve("Dish 2", include_vip=True)
+    assert "Dish: Dish 2." in context
+
+
+def test_sync_by_another_worker_reaches_this_workers_name_index(app, dishes, tmp_path):
+    app.config.update(
+        EMBEDDING_BACKEND='hashing', RETRIEVAL_BACKEND='chroma', CHROMA_PATH=str(tmp_path / 'kb'),
+        GOOGLE_API_KEY=None, CHAT_INDEX_CHECK_SECONDS=0
+    )
+    worker_a, worker_b = ChatService(), ChatService()
+    assert worker_a.sync_knowledge_base() and worker_b.sync_knowledge_base()
+    _, context = worker_b._retrieve("Dish 2")
+    assert "Dish: Dish 2." in context
+    version = worker_b.kb_version
+
+    dishes[2].is_vip_only = True
+    assert worker_a.sync_knowledge_base()
+    # B's own sync finds nothing left to embed
+    assert worker_b.sync_knowledge_base()
+
+    _, context = worker_b._retrieve("Dish 2")
+    assert "Dish: Dish 2." not in context
+    assert worker_b.kb_version > version
+    _, context = worker_b._retrieve("Dish 2", include_vip=True)
+    assert "This is a VIP exclusive dish." in context.split("\n")[0]
+
+
+def test_name_matches_are_checked_against_the_vector_index(chat, dishes):
+    assert chat.sync_knowledge_base()
+    chat._retrieve("Dish 2")
+
+    # Changed behind the name index's back, e.g. by another process
+    document = chat.render_document(dishes[2])
+    metadata = dict(next(m for doc_id, _, m in chat.index.entries() if doc_id == str(dishes[2].id)), is_vip_only=True)
+    chat.index.upsert([str(dishes[2].id)], [document], chat.embedder.embed_documents([document]), [metadata])
+    chat.index.delete([str(dishes[3].id)])
+
+    lexical = chat.retriever.lexical.search("Dish 2 Dish 3", 10, where={"is_vip_only": False})
+    assert {str(dishes[2].id), str(dishes[3].id)} <= {doc_id for doc_id, _, _ in lexical}
+    results = chat.retriever.retrieve("Dish 2 Dish 3", chat.embed_query("Dish 2 Dish 3"), k=5, where={"is_vip_only": False})
+    assert not {str(dishes[2].id), str(dishes[3].id)} & {doc_id for doc_id, _, _ in results}
@@ -0,0 +1,26 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import update
+from app import db
+from app.models import Dish
+from app.services.order_service import OrderService
+
+
+def edit_elsewhere(dish, **values):
+    """Change a dish the way another worker process would: no session events here"""
+    with db.engine.begin() as connection:
+        connection.execute(update(Dish.__table__).where(Dish.__table__.c.id == dish.id).values(**values))
+
+
+def test_checkout_uses_current_price_and_availability(app, users, dishes):
+    customer, dish = users['customer'], dishes[0]
+    order = OrderService.create_order(customer.id, [{'dish_id': dish.id}])
+    assert order.items[0].price_at_time == Decimal('10.00')
+
+    edit_elsewhere(dish, price=Decimal('12.50'))
+    order = OrderService.create_order(customer.id, [{'dish_id': dish.id}])
+    assert order.items[0].price_at_time == Decimal('12.50')
+
+    edit_elsewhere(dish, is_available=False)
+    with pytest.raises(ValueError, match='not available'):
+        OrderService.create_order(customer.id, [{'dish_id': dish.id}])
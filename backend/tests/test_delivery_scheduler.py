@@ -0,0 +1,103 @@
+import itertools
+import numpy as np
+import pytest
+from app.services.delivery_scheduler import solve_greedy, solve_hungarian
+
+
+def brute_force(cost, capacity, load_weight):
+    """Cheapest total cost and number of orders placed, trying every assignment"""
+    slots = [(j, k) for j, c in enumerate(capacity) for k in range(c)]
+    placed = min(len(slots), cost.shape[0])
+    best = np.inf
+    for rows in itertools.permutations(range(cost.shape[0]), placed):
+        for cols in itertools.combinations(range(len(slots)), placed):
+            total = sum(cost[i, slots[c][0]] + load_weight * slots[c][1] for i, c in zip(rows, cols))
+            best = min(best, total)
+    return best, placed
+
+
+def total_cost(pairs, cost, load_weight):
+    taken = {}
+    total = 0.0
+    for i, j in pairs:
+        total += cost[i, j] + load_weight * taken.get(j, 0)
+        taken[j] = taken.get(j, 0) + 1
+    return total
+
+
+def check(pairs, cost, capacity):
+    assert len({i for i, _ in pairs}) == len(pairs)
+    for j, c in enumerate(capacity):
+        assert sum(1 for _, d in pairs if d == j) <= c
+
+
+def test_tied_orders_are_not_pruned():
+    # Two orders placed at the same moment, one free slot
+    cost = np.array([[-10.0], [-10.0]])
+    assert solve_hungarian(cost, [1], 5.0) in ([(0, 0)], [(1, 0)])
+    assert solve_greedy(cost, [1], 5.0) == [(0, 0)]
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_hungarian_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    orders = int(rng.integers(1, 6))
+    drivers = int(rng.integers(1, 4))
+    capacity = [int(c) for c in rng.integers(0, 3, size=drivers)]
+    # Few distinct values, so ties are common
+    cost = rng.integers(-3, 3, size=(orders, drivers)).astype(float)
+    load_weight = float(rng.integers(0, 3))
+
+    pairs = solve_hungarian(cost, capacity, load_weight)
+    check(pairs, cost, capacity)
+    optimum, placed = brute_force(cost, capacity, load_weight)
+    assert len(pairs) == placed
+    assert total_cost(pairs, cost, load_weight) == pytest.approx(optimum)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_greedy_fills_every_free_slot(seed):
+    rng = np.random.default_rng(seed)
+    cost = rng.integers(-3, 3, size=(int(rng.integers(1, 8)), 3)).astype(float)
+    capacity = [int(c) for c in rng.integers(0, 3, size=3)]
+
+    pairs = solve_greedy(cost, capacity, 1.0)
+    check(pairs, cost, capacity)
+    assert len(pairs) == min(sum(capacity), cost.shape[0])
+
+
+def test_assignment_respects_driver_capacity_at_update_time(app, users, dishes):
+    from app import db
+    from app.models import Order
+    from app.services.delivery_scheduler import DeliveryScheduler
+
+    customer, driver = users['customer'], users['delivery']
+    ready = [
+        Order(customer_id=customer.id, chef_id=users['chef'].id, status='READY_FOR_DELIVERY',
+              subtotal=10, total=15)
+        for _ in range(3)
+    ]
+    db.session.add_all(ready)
+    db.session.commit()
+
+    scheduler = DeliveryScheduler(max_active=2)
+    load = scheduler._load
+
+    def stale_load():
+        # Another worker assigns the driver an order after this run read the loads
+        orders, drivers = load()
+        db.session.add(Order(customer_id=customer.id, chef_id=users['chef'].id, status='ASSIGNED',
+                             delivery_person_id=driver.id, subtotal=10, total=15))
+        db.session.flush()
+        return orders, drivers
+
+    scheduler._load = stale_load
+    result = scheduler.run_once()
+
+    assert result['assigned'] == 0
+    active = Order.query.filter(Order.delivery_person_id == driver.id).count()
+    assert active == 1
+
+    scheduler._load = load
+    result = scheduler.run_once()
+    assert result['assigned'] == 1
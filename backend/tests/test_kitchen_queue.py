@@ -0,0 +1,47 @@
+import pytest
+from app.services.kitchen_queue import KitchenQueue
+from app.services.order_events import get_order_broker
+from app.services.order_service import OrderService
+
+
+def ids(view):
+    waiting, _ = view
+    return [order_id for _, order_id in waiting['CREATED']]
+
+
+def test_events_during_a_load_reach_the_new_view(app, users, dishes):
+    chef, customer = users['chef'], users['customer']
+    first = OrderService.create_order(customer.id, [{'dish_id': dishes[0].id}])
+    queue = KitchenQueue(ttl=60)
+    get_order_broker().listen(queue.apply)
+    load_rows = queue._load_rows
+    during_load = []
+
+    def slow_load(chef_id):
+        rows = load_rows(chef_id)
+        # The lock is free while the database is read...
+        assert queue._lock.acquire(blocking=False)
+        queue._lock.release()
+        # ...and an order committed after the read still lands in the view
+        during_load.append(OrderService.create_order(customer.id, [{'dish_id': dishes[1].id}]))
+        return rows
+
+    queue._load_rows = slow_load
+    assert ids(queue.view(chef.id)) == [first.id, during_load[0].id]
+
+    queue._load_rows = load_rows
+    OrderService.update_order_status(first.id, 'IN_KITCHEN')
+    assert ids(queue.view(chef.id)) == [during_load[0].id]
+    assert not queue._loading
+
+
+def test_failed_load_leaves_no_view(app, users):
+    queue = KitchenQueue()
+
+    def broken(chef_id):
+        raise RuntimeError('database unavailable')
+
+    queue._load_rows = broken
+    with pytest.raises(RuntimeError):
+        queue.view(users['chef'].id)
+    assert not queue._chefs and not queue._loading
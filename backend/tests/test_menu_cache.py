@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from sqlalchemy import update
+from app import db
+from app.models import Dish
+from app.services.menu_cache import MenuCache, menu_cache
+
+
+def expire_snapshot():
+    menu_cache._snapshot.built_at -= 3600
+
+
+def prices(response):
+    return {dish['id']: dish['price'] for dish in response.json['dishes']}
+
+
+def test_snapshot_picks_up_writes_from_other_processes(client, dishes):
+    menu_cache.invalidate()
+    first = client.get('/api/menu/dishes')
+    etag = first.headers['ETag']
+
+    # Another worker's write fires no session events here
+    with db.engine.begin() as connection:
+        connection.execute(update(Dish.__table__).where(Dish.__table__.c.id == dishes[0].id).values(price=Decimal('99.00')))
+    # Requests here share the fixture's session; in production each gets its own
+    db.session.expire_all()
+    assert prices(client.get('/api/menu/dishes'))[dishes[0].id] == 10.0
+
+    version = menu_cache.version
+    expire_snapshot()
+    second = client.get('/api/menu/dishes')
+    assert prices(second)[dishes[0].id] == 99.0
+    assert second.headers['ETag'] != etag
+    assert menu_cache.version == version + 1
+
+
+def test_unchanged_menu_keeps_its_etag_after_expiry(client, dishes):
+    menu_cache.invalidate()
+    etag = client.get('/api/menu/dishes').headers['ETag']
+    version = menu_cache.version
+
+    expire_snapshot()
+    response = client.get('/api/menu/dishes', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert menu_cache.version == version
+
+
+def count_serializes(monkeypatch, delay=0.0):
+    calls = []
+    serialize = MenuCache._serialize
+
+    def counting():
+        calls.append(1)
+        time.sleep(delay)
+        return serialize()
+
+    monkeypatch.setattr(MenuCache, '_serialize', staticmethod(counting))
+    return calls
+
+
+def test_concurrent_requests_rebuild_once(app, dishes, monkeypatch):
+    menu_cache.get_snapshot()
+    old = menu_cache._snapshot
+    menu_cache.invalidate()
+    calls = count_serializes(monkeypatch, delay=0.2)
+
+    def read(_):
+        with app.app_context():
+            return menu_cache.get_snapshot()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        snapshots = list(pool.map(read, range(8)))
+
+    assert len(calls) == 1
+    # Everyone else was served the previous snapshot meanwhile
+    assert {id(snapshot) for snapshot in snapshots} == {id(old), id(menu_cache._snapshot)}
+
+
+def test_change_found_on_expiry_is_kept(client, dishes, monkeypatch):
+    menu_cache.invalidate()
+    client.get('/api/menu/dishes')
+    with db.engine.begin() as connection:
+        connection.execute(update(Dish.__table__).where(Dish.__table__.c.id == dishes[1].id).values(price=Decimal('55.00')))
+    db.session.expire_all()
+    calls = count_serializes(monkeypatch)
+
+    expire_snapshot()
+    assert prices(client.get('/api/menu/dishes'))[dishes[1].id] == 55.0
+    assert prices(client.get('/api/menu/dishes'))[dishes[1].id] == 55.0
+    assert len(calls) == 1
+    assert menu_cache._snapshot.version == menu_cache.version
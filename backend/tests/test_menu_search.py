@@ -0,0 +1,87 @@
+import copy
+import random
+from sqlalchemy import update
+from app import db
+from app.models import Dish
+from app.services.menu_search import _MenuIndex, menu_search
+
+
+def names(result):
+    page, _, _ = result
+    return [dish['name'] for dish in page]
+
+
+def rename_elsewhere(dish, name):
+    with db.engine.begin() as connection:
+        connection.execute(update(Dish.__table__).where(Dish.__table__.c.id == dish.id).values(name=name))
+    # Searches here share the fixture's session; in production each request gets its own
+    db.session.expire_all()
+
+
+def test_local_edits_are_searchable_after_commit(app, dishes):
+    menu_search.mark_changed()
+    assert names(menu_search.search('dish 3'))[0] == 'Dish 3'
+
+    dishes[3].name = 'Saffron Risotto'
+    db.session.commit()
+    assert names(menu_search.search('risotto')) == ['Saffron Risotto']
+    assert names(menu_search.search('risoto')) == ['Saffron Risotto']
+
+
+def test_other_processes_edits_show_up_after_ttl(app, dishes):
+    menu_search.mark_changed()
+    menu_search.search()
+
+    rename_elsewhere(dishes[1], 'Lemon Tart')
+    assert names(menu_search.search('lemon')) == []
+
+    menu_search._index.built_at -= 3600
+    assert names(menu_search.search('lemon')) == ['Lemon Tart']
+
+
+def test_searches_do_not_wait_for_a_rebuild(app, dishes):
+    menu_search.mark_changed()
+    menu_search.search()
+    dishes[0].name = 'Plum Cake'
+    db.session.commit()
+
+    # Another thread is mid-rebuild: keep answering from the previous build
+    with menu_search._build_lock:
+        assert names(menu_search.search('plum')) == []
+    assert names(menu_search.search('plum')) == ['Plum Cake']
+
+
+def record(dish_id, name, price, rating, chef_id, vip=False):
+    return {'id': dish_id, 'name': name, 'description': f'{name} from the house kitchen', 'price': price,
+            'image_url': None, 'is_vip_only': vip, 'avg_rating': rating, 'chef_id': chef_id}
+
+
+def structures(index):
+    return (
+        index.dishes, index.postings, index.vocabulary, {variant: set(terms) for variant, terms in index.typos.items()},
+        index.by_price, index.by_rating, index.chef_of, index.by_chef, set(index.vip_ids), index.ranks
+    )
+
+
+def test_incremental_update_matches_a_full_build():
+    rng = random.Random(7)
+    words = ['spicy', 'chicken', 'curry', 'lemon', 'tart', 'saffron', 'risotto', 'bowl', 'noodle', 'garden']
+
+    def random_record(dish_id):
+        name = ' '.join(rng.sample(words, rng.randint(1, 3)))
+        return record(dish_id, name, rng.choice([9.5, 12.0, 15.0]), rng.choice([0, 3.5, 4.5]),
+                      rng.randint(1, 4), vip=rng.random() < 0.2)
+
+    dishes = {dish_id: random_record(dish_id) for dish_id in range(1, 60)}
+    index = _MenuIndex(dishes)
+    for _ in range(40):
+        changed = set(rng.sample(range(1, 80), rng.randint(1, 6)))
+        records = {dish_id: random_record(dish_id) for dish_id in changed if rng.random() < 0.7}
+        before = copy.deepcopy(structures(index))
+        updated = index.updated(changed, records)
+
+        dishes = {dish_id: r for dish_id, r in dishes.items() if dish_id not in changed} | records
+        assert structures(updated) == structures(_MenuIndex(dishes))
+        # The previous build, which searches may still be reading, is untouched
+        assert structures(index) == before
+        index = updated
@@ -0,0 +1,37 @@
+import pytest
+from app.services.order_service import OrderService
+from conftest import auth
+
+
+def place_orders(customer, dishes, orders, items):
+    cart = [{'dish_id': dish.id, 'quantity': 2} for dish in dishes[:items]]
+    return [OrderService.create_order(customer.id, cart) for _ in range(orders)]
+
+
+@pytest.mark.parametrize('orders', [1, 20])
+def test_history_page_is_one_query(client, users, dishes, queries, orders):
+    customer = users['customer']
+    place_orders(customer, dishes, orders, items=3)
+    headers = auth(customer)
+
+    with queries:
+        response = client.get('/api/orders/history', headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json['orders']) == orders
+    assert all(order['items_count'] == 3 for order in response.json['orders'])
+    assert queries.count == 1, queries.statements
+
+
+@pytest.mark.parametrize('items', [1, 5])
+def test_order_detail_is_two_queries(client, users, dishes, queries, items):
+    customer = users['customer']
+    order, = place_orders(customer, dishes, 1, items)
+    headers = auth(customer)
+
+    with queries:
+        response = client.get(f'/api/orders/{order.id}', headers=headers)
+
+    assert response.status_code == 200
+    assert [item['dish_name'] for item in response.json['order']['items']] == [dish.name for dish in dishes[:items]]
+    assert queries.count == 2, queries.statements
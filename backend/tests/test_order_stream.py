@@ -0,0 +1,80 @@
+import json
+from types import SimpleNamespace
+import pytest
+from app.services.order_events import get_order_broker
+from tests.conftest import auth
+
+
+@pytest.fixture
+def stream(app):
+    app.config.update(ORDER_STREAM_HEARTBEAT_SECONDS=0.05, ORDER_STREAM_MAX_SECONDS=0.3, ORDER_STREAM_MAX_OPEN=2)
+    return app
+
+
+def publish(customer, order_id, status):
+    order = SimpleNamespace(
+        id=order_id, status=status, customer_id=customer.id, chef_id=None, delivery_person_id=None, order_time=None
+    )
+    return get_order_broker().publish(order)
+
+
+def events(response):
+    """(event id, event name, data) for each event in a finished stream body"""
+    parsed = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":") and ": " in line)
+        if 'event' in fields:
+            parsed.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return parsed
+
+
+def test_idle_stream_sends_heartbeats(client, users, stream):
+    response = client.get('/api/orders/stream', headers=auth(users['customer']))
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True).count(": heartbeat\n\n") >= 2
+    assert get_order_broker().stats()['subscribers'] == 0
+
+
+def test_reconnect_resumes_after_last_event_id(client, users, stream):
+    customer = users['customer']
+    seen = publish(customer, 1, 'pending')
+    publish(users['vip'], 2, 'pending')
+    missed = [publish(customer, 1, 'preparing'), publish(customer, 3, 'pending')]
+
+    response = client.get('/api/orders/stream', headers={**auth(customer), 'Last-Event-ID': str(seen.id)})
+
+    assert [(int(event_id), data['order_id'], data['status']) for event_id, _, data in events(response)] == [
+        (event.id, event.order_id, event.status) for event in missed
+    ]
+
+
+def test_reconnect_past_the_history_asks_for_a_refetch(client, users, stream):
+    broker = get_order_broker()
+    broker._history = type(broker._history)(maxlen=2)
+    customer = users['customer']
+    seen = publish(customer, 1, 'pending')
+    for status in ('preparing', 'ready', 'delivered'):
+        publish(customer, 1, status)
+
+    response = client.get('/api/orders/stream', headers={**auth(customer), 'Last-Event-ID': str(seen.id)})
+
+    assert events(response)[0][1] == 'reset'
+
+
+def test_open_streams_are_capped_per_worker(client, users, stream):
+    open_streams = [
+        client.get('/api/orders/stream', headers=auth(users['customer']), buffered=False) for _ in range(2)
+    ]
+    assert all(response.status_code == 200 for response in open_streams)
+
+    refused = client.get('/api/orders/stream', headers=auth(users['vip']))
+    assert refused.status_code == 503
+    assert 'Retry-After' in refused.headers
+
+    # Closed before a single event was read, the slot still comes back
+    open_streams[0].close()
+    assert get_order_broker().stats()['subscribers'] == 1
+    response = client.get('/api/orders/stream', headers=auth(users['vip']))
+    assert response.status_code == 200
+    open_streams[1].close()
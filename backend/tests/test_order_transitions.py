@@ -0,0 +1,150 @@
+import pytest
+from sqlalchemy import update
+from app import db
+from app.models import Order
+from app.models.order import ORDER_TRANSITIONS
+from app.services.order_service import OrderService, OrderConflict
+from tests.conftest import auth
+
+
+@pytest.fixture
+def orders(app, users):
+    def make(*statuses):
+        created = [
+            Order(customer_id=users['customer'].id, chef_id=users['chef'].id, status=status, subtotal=10, total=15)
+            for status in statuses
+        ]
+        db.session.add_all(created)
+        db.session.commit()
+        return created
+
+    return make
+
+
+def status_of(order):
+    db.session.expire_all()
+    return db.session.get(Order, order.id).status
+
+
+def test_finished_orders_cannot_change():
+    assert ORDER_TRANSITIONS['DELIVERED'] == set() and ORDER_TRANSITIONS['CANCELLED'] == set()
+    # A delivery already on the road can only arrive
+    assert ORDER_TRANSITIONS['OUT_FOR_DELIVERY'] == {'DELIVERED'}
+    assert all(targets <= set(ORDER_TRANSITIONS) for targets in ORDER_TRANSITIONS.values())
+
+
+def test_allowed_change_is_applied(orders):
+    order, = orders('CREATED')
+
+    changed = OrderService.update_order_status(order.id, 'IN_KITCHEN', expected_status='CREATED')
+
+    assert changed.status == 'IN_KITCHEN'
+    assert status_of(order) == 'IN_KITCHEN'
+
+
+def test_disallowed_change_is_a_conflict(orders):
+    order, = orders('CREATED')
+
+    with pytest.raises(OrderConflict) as e:
+        OrderService.update_order_status(order.id, 'DELIVERED')
+    assert e.value.current_status == 'CREATED'
+    with pytest.raises(ValueError, match="Cannot change order from CREATED to DELIVERED"):
+        OrderService.update_order_status(order.id, 'DELIVERED', expected_status='CREATED')
+    assert status_of(order) == 'CREATED'
+
+
+@pytest.mark.parametrize('status, allowed', [
+    ('CREATED', True), ('IN_KITCHEN', True), ('READY_FOR_DELIVERY', True), ('ASSIGNED', True),
+    ('OUT_FOR_DELIVERY', False), ('DELIVERED', False), ('CANCELLED', False)
+])
+def test_cancelling_is_allowed_until_the_order_leaves(orders, status, allowed):
+    order, = orders(status)
+
+    if allowed:
+        OrderService.update_order_status(order.id, 'CANCELLED')
+        assert status_of(order) == 'CANCELLED'
+    else:
+        with pytest.raises(OrderConflict):
+            OrderService.update_order_status(order.id, 'CANCELLED')
+        assert status_of(order) == status
+
+
+def test_lost_race_reports_the_winners_status(orders):
+    order, = orders('CREATED')
+    # Another request moved the order after this caller read it as CREATED
+    with db.engine.begin() as connection:
+        connection.execute(update(Order.__table__).where(Order.__table__.c.id == order.id).values(status='CANCELLED'))
+
+    with pytest.raises(OrderConflict) as e:
+        OrderService.update_order_status(order.id, 'IN_KITCHEN', expected_status='CREATED')
+    assert e.value.current_status == 'CANCELLED'
+    assert status_of(order) == 'CANCELLED'
+
+
+def test_unknown_order_is_not_found(app):
+    with pytest.raises(ValueError, match="Order not found"):
+        OrderService.update_order_status(12345, 'IN_KITCHEN')
+
+
+def test_bulk_change_reports_each_order(orders):
+    created, kitchen, raced, delivered = orders('CREATED', 'IN_KITCHEN', 'CREATED', 'DELIVERED')
+    with db.engine.begin() as connection:
+        connection.execute(update(Order.__table__).where(Order.__table__.c.id == raced.id).values(status='IN_KITCHEN'))
+
+    results = OrderService.transition_orders([
+        {'order_id': created.id, 'status': 'IN_KITCHEN'},
+        {'order_id': kitchen.id, 'status': 'READY_FOR_DELIVERY', 'expected_status': 'IN_KITCHEN'},
+        {'order_id': raced.id, 'status': 'IN_KITCHEN', 'expected_status': 'CREATED'},
+        {'order_id': delivered.id, 'status': 'CANCELLED'},
+        {'order_id': 12345, 'status': 'IN_KITCHEN'},
+        {'order_id': 12346, 'status': 'IN_KITCHEN', 'expected_status': 'DELIVERED'},
+    ])
+
+    assert results == {
+        created.id: 'updated',
+        kitchen.id: 'updated',
+        raced.id: 'conflict',
+        delivered.id: 'conflict',
+        12345: 'not_found',
+        12346: "Cannot change order from DELIVERED to IN_KITCHEN",
+    }
+    assert [status_of(order) for order in (created, kitchen, raced, delivered)] == [
+        'IN_KITCHEN', 'READY_FOR_DELIVERY', 'IN_KITCHEN', 'DELIVERED'
+    ]
+
+
+def test_bulk_change_rejects_repeated_orders(orders):
+    order, = orders('CREATED')
+
+    with pytest.raises(ValueError, match="only once"):
+        OrderService.transition_orders([
+            {'order_id': order.id, 'status': 'IN_KITCHEN'},
+            {'order_id': order.id, 'status': 'CANCELLED'},
+        ])
+    assert status_of(order) == 'CREATED'
+
+
+def test_bulk_endpoint_returns_per_order_results(client, users, orders):
+    created, delivered = orders('CREATED', 'DELIVERED')
+
+    response = client.patch('/api/orders/status', headers=auth(users['chef']), json={'transitions': [
+        {'order_id': created.id, 'status': 'IN_KITCHEN'},
+        {'order_id': delivered.id, 'status': 'IN_KITCHEN'},
+    ]})
+
+    assert response.status_code == 200
+    assert response.json['updated'] == 1
+    assert response.json['results'] == {str(created.id): 'updated', str(delivered.id): 'conflict'}
+
+
+def test_single_endpoint_answers_a_lost_race_with_409(client, users, orders):
+    order, = orders('IN_KITCHEN')
+
+    response = client.patch(f'/api/orders/{order.id}/status', headers=auth(users['chef']),
+                            json={'status': 'READY_FOR_DELIVERY', 'expected_status': 'CREATED'})
+    assert response.status_code == 400
+
+    response = client.patch(f'/api/orders/{order.id}/status', headers=auth(users['chef']),
+                            json={'status': 'IN_KITCHEN', 'expected_status': 'CREATED'})
+    assert response.status_code == 409
+    assert response.json['current_status'] == 'IN_KITCHEN'
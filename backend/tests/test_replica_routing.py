@@ -0,0 +1,84 @@
+import json
+import shutil
+import pytest
+from app import create_app, db
+from app.models import Order, Transaction, Wallet
+from app.services.order_service import OrderService
+from app.utils.database import LAST_WRITE_COOKIE, LAST_WRITE_HEADER
+from conftest import TestConfig, auth
+
+
+@pytest.fixture
+def config(tmp_path):
+    """A primary SQLite file and a second file standing in for its replica"""
+    class ReplicaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        DATABASE_REPLICA_URL = f"sqlite:///{tmp_path / 'replica.db'}"
+
+    return ReplicaConfig
+
+
+@pytest.fixture
+def workers(app, config, tmp_path, users, dishes):
+    """Two app instances, as two worker processes, and a replica that stops after one order"""
+    customer = users['customer']
+    OrderService.create_order(customer.id, [{'dish_id': dishes[0].id}])
+    shutil.copy(tmp_path / 'primary.db', tmp_path / 'replica.db')
+    return app, create_app(config), auth(customer), dishes[1].id
+
+
+def history(worker, headers, last_write_cookie=None):
+    client = worker.test_client()
+    if last_write_cookie is not None:
+        client.set_cookie(LAST_WRITE_COOKIE, last_write_cookie)
+    response = client.get('/api/orders/history', headers=headers)
+    assert response.status_code == 200
+    return len(response.json['orders'])
+
+
+def test_reads_go_to_the_replica(workers, users):
+    worker_a, _, headers, _ = workers
+    db.session.add(Order(customer_id=users['customer'].id, subtotal=1, total=1))
+    db.session.commit()
+
+    assert history(worker_a, headers) == 1
+
+
+def test_writer_reads_its_write_on_another_worker(workers):
+    worker_a, worker_b, headers, dish_id = workers
+    response = worker_a.test_client().post('/api/orders/create', json={'items': [{'dish_id': dish_id}]}, headers=headers)
+    assert response.status_code == 201
+    last_write = response.headers[LAST_WRITE_HEADER]
+    assert f'{LAST_WRITE_COOKIE}={last_write}' in response.headers['Set-Cookie']
+
+    # Worker B never saw the write, so only the client's cookie or header keeps it on the primary
+    assert history(worker_b, headers) == 1
+    assert history(worker_b, headers, last_write_cookie=last_write) == 2
+    assert history(worker_b, {**headers, LAST_WRITE_HEADER: last_write}) == 2
+    # Expired or garbled values are ignored
+    assert history(worker_b, {**headers, LAST_WRITE_HEADER: '1.0'}) == 1
+    assert history(worker_b, {**headers, LAST_WRITE_HEADER: 'soon'}) == 1
+    # The worker that took the write remembers the writer either way
+    assert history(worker_a, headers) == 2
+
+
+def test_lagging_replica_falls_back_to_primary(workers):
+    worker_a, worker_b, headers, dish_id = workers
+    worker_a.test_client().post('/api/orders/create', json={'items': [{'dish_id': dish_id}]}, headers=headers)
+
+    monitor = worker_b.extensions['replica_monitor']
+    monitor.measure = lambda: monitor.max_lag + 1
+    assert history(worker_b, headers) == 2
+
+
+def test_streamed_transactions_come_from_the_replica(workers, users):
+    worker_a, _, headers, _ = workers
+    wallet = Wallet.query.filter_by(user_id=users['customer'].id).one()
+    db.session.add(Transaction(wallet_id=wallet.id, amount=5, transaction_type='deposit'))
+    db.session.commit()
+
+    client = worker_a.test_client()
+    paged = client.get('/api/finance/transactions', headers=headers).json['transactions']
+    streamed = client.get('/api/finance/transactions?format=ndjson', headers=headers).get_data(as_text=True).splitlines()
+    assert len(streamed) == len(paged)
+    assert [json.loads(line)['id'] for line in streamed] == [t['id'] for t in paged]
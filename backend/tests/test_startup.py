@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+from benchmarks.bench_startup import HEAVY_MODULES
+
+
+def test_create_app_does_not_import_heavy_modules():
+    code = (
+        "import sys; from app import create_app; create_app(); "
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=dict(os.environ, DATABASE_URL="sqlite://", CHAT_WARMUP="off"),
+        capture_output=True, text=True
+    )
+
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip() == ""
@@ -0,0 +1,109 @@
+import threading
+import numpy as np
+import pytest
+from app.services.vector_index import ChromaIndex, LocalVectorIndex
+
+PRICES = [4.0, 8.0, 12.0, 16.0, 20.0]
+
+
+def fill(index):
+    rng = np.random.default_rng(0)
+    index.upsert(
+        ids=[str(i) for i in range(len(PRICES))],
+        documents=[f"Dish {i}" for i in range(len(PRICES))],
+        embeddings=rng.normal(size=(len(PRICES), 8)).tolist(),
+        metadatas=[
+            {"price": price, "is_available": True, "is_vip_only": i == 2}
+            for i, price in enumerate(PRICES)
+        ]
+    )
+    return index
+
+
+@pytest.fixture(params=['chroma', 'local'])
+def index(request, tmp_path):
+    if request.param == 'chroma':
+        pytest.importorskip('chromadb')
+        return fill(ChromaIndex(str(tmp_path / 'chroma')))
+    return fill(LocalVectorIndex())
+
+
+@pytest.mark.parametrize('where, expected', [
+    ({"price": {"$gte": 5.0, "$lte": 15.0}}, {"1", "2"}),
+    ({"price": {"$gte": 5.0, "$lte": 15.0}, "is_vip_only": False}, {"1"}),
+    ({"is_available": True, "price": {"$lte": 10.0}}, {"0", "1"}),
+    ({"price": {"$gt": 100.0}}, set()),
+])
+def test_query_filters(index, where, expected):
+    results = index.query(np.ones(8).tolist(), k=5, where=where)
+    assert {doc_id for doc_id, _, _ in results} == expected
+
+
+def test_chroma_where_splits_ranges():
+    assert ChromaIndex._chroma_where({"price": {"$gte": 5.0, "$lte": 15.0}}) == {
+        "$and": [{"price": {"$gte": 5.0}}, {"price": {"$lte": 15.0}}]
+    }
+    assert ChromaIndex._chroma_where({"is_available": True}) == {"is_available": True}
+    assert ChromaIndex._chroma_where({}) is None
+
+
+def unit_vectors(count, offset=0, dim=16):
+    rng = np.random.default_rng(offset)
+    return rng.normal(size=(count, dim)).tolist()
+
+
+def test_local_index_keeps_rows_and_ids_together(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / 'index'))
+    vectors = dict(zip(map(str, range(10)), unit_vectors(10)))
+    index.upsert(list(vectors), [f'doc {i}' for i in vectors], list(vectors.values()), [{'n': int(i)} for i in vectors])
+    index.delete(['2', '5'])
+    vectors['3'] = unit_vectors(1, offset=99)[0]
+    index.upsert(['3', '10'], ['doc 3', 'doc 10'], [vectors['3'], unit_vectors(1, offset=100)[0]], [{'n': 3}, {'n': 10}])
+    index.persist()
+
+    for reopened in (index, LocalVectorIndex(str(tmp_path / 'index'))):
+        assert reopened.count() == 9
+        for doc_id, vector in vectors.items():
+            if doc_id in ('2', '5'):
+                continue
+            (top_id, document, metadata), = reopened.query(vector, k=1)
+            assert (top_id, document, metadata['n']) == (doc_id, f'doc {doc_id}', int(doc_id))
+
+
+def test_local_index_appends_without_copying_the_matrix():
+    index = LocalVectorIndex()
+    index.upsert(['0'], ['doc 0'], unit_vectors(1), [{}])
+    buffer = index._buffer
+    for i in range(1, 20):
+        index.upsert([str(i)], [f'doc {i}'], unit_vectors(1, offset=i), [{}])
+    assert index._buffer is buffer
+    assert index.count() == 20 and index.vectors.shape[0] == 20
+
+
+def test_local_index_queries_during_writes():
+    index = LocalVectorIndex()
+    stable = unit_vectors(20)
+    index.upsert([f's{i}' for i in range(20)], [f'doc s{i}' for i in range(20)], stable, [{}] * 20)
+    errors = []
+    done = threading.Event()
+
+    def write():
+        for n in range(200):
+            ids = [f'w{n}-{i}' for i in range(5)]
+            index.upsert(ids, ids, unit_vectors(5, offset=1000 + n), [{}] * 5)
+            index.delete(ids[:3])
+        done.set()
+
+    def read():
+        while not done.is_set():
+            for i in (0, 7, 19):
+                results = index.query(stable[i], k=1)
+                if results[0][0] != f's{i}':
+                    errors.append(results[0][0])
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors